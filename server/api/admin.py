@@ -1,6 +1,22 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
 from django.contrib.auth.admin import UserAdmin
-from .models import User, HealthProgram, Client, Enrollment
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Q
+from django.forms.models import BaseInlineFormSet
+from django.utils import timezone
+
+from . import events
+from .archive import restore_programs
+from .jobs import cancel
+from .models import User, HealthProgram, Client, Enrollment, Job, ArchivedHealthProgram
+from .pagination import EstimatedCountPaginator
+
+# Query string parameter holding the keyset cursor of a changelist page
+CURSOR_VAR = 'after'
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -21,10 +37,176 @@ class CustomUserAdmin(UserAdmin):
         ),
     )
 
-class EnrollmentInline(admin.TabularInline):
+def pk_batches(queryset, batch_size):
+    """Yield lists of at most ``batch_size`` primary keys of ``queryset``, seeking by pk"""
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    last = None
+    while True:
+        batch = list((pks if last is None else pks.filter(pk__gt=last))[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+
+class KeysetChangeList(ChangeList):
+    """
+    Changelist that pages with a cursor on the default ordering instead
+    of OFFSET, so the last page of a huge table costs the same as the
+    first. Sorting by a column, "show all" or ``list_editable`` fall back
+    to numbered pages.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        self.next_cursor = None
+        self.keyset = False
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Changing filters, search or ordering starts again from the first page
+        return super().get_query_string(new_params, [*(remove or []), CURSOR_VAR])
+
+    @property
+    def first_page_url(self):
+        return self.get_query_string()
+
+    @property
+    def next_page_url(self):
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+    def keyset_fields(self):
+        """Return [(field, descending), ...] to seek on, or None when the ordering can't be used"""
+        if ORDER_VAR in self.params or self.show_all or self.list_editable:
+            return None
+        fields = []
+        for name in self.queryset.query.order_by:
+            if not isinstance(name, str):
+                return None
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            try:
+                field = self.opts.pk if name == 'pk' else self.opts.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if field.is_relation or field.null:
+                return None
+            fields.append((field, descending))
+        if not fields or fields[-1][0] != self.opts.pk:
+            return None
+        return fields
+
+    @staticmethod
+    def encode_cursor(fields, obj):
+        return '~'.join(field.value_to_string(obj) for field, _ in fields)
+
+    @staticmethod
+    def decode_cursor(fields, cursor):
+        parts = cursor.split('~')
+        if len(parts) != len(fields):
+            raise ValueError(cursor)
+        return [field.to_python(part) for (field, _), part in zip(fields, parts)]
+
+    @staticmethod
+    def seek(fields, values):
+        """Rows after ``values`` in the ordering, bounded on the first column so an index can start there"""
+        after = Q()
+        for index, (field, descending) in enumerate(fields):
+            equal = {previous.attname: value for (previous, _), value in zip(fields[:index], values)}
+            after |= Q(**equal, **{f"{field.attname}__{'lt' if descending else 'gt'}": values[index]})
+        first, descending = fields[0]
+        return Q(**{f"{first.attname}__{'lte' if descending else 'gte'}": values[0]}) & after
+
+    def get_results(self, request):
+        fields = self.keyset_fields()
+        if fields is None:
+            return super().get_results(request)
+
+        queryset = self.queryset
+        if self.cursor:
+            try:
+                queryset = queryset.filter(self.seek(fields, self.decode_cursor(fields, self.cursor)))
+            except (ValueError, ValidationError) as exc:
+                raise IncorrectLookupParameters(exc)
+        results = list(queryset[:self.list_per_page + 1])
+        if len(results) > self.list_per_page:
+            results = results[:self.list_per_page]
+            self.next_cursor = self.encode_cursor(fields, results[-1])
+
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.keyset = True
+        self.result_count = paginator.count
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.result_list = results
+        self.can_show_all = False
+        self.multi_page = bool(self.cursor or self.next_cursor)
+        self.paginator = paginator
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin for tables with millions of rows: estimated result counts,
+    no unfiltered total, and cursor navigation through the changelist.
+    """
+    change_list_template = 'admin/api/keyset_change_list.html'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """Inline formset showing one page of the related objects, chosen by ``page_param``"""
+    request = None
+    per_page = 20
+    page_param = 'page'
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            self.paginator = Paginator(super().get_queryset(), self.per_page)
+            number = self.request.GET.get(self.page_param) if self.request else None
+            self.page = self.paginator.get_page(number)
+            self._queryset = self.page.object_list
+        return self._queryset
+
+    def page_url(self, number):
+        params = self.request.GET.copy()
+        params[self.page_param] = number
+        return f'?{params.urlencode()}'
+
+    @property
+    def previous_page_url(self):
+        return self.page_url(self.page.previous_page_number())
+
+    @property
+    def next_page_url(self):
+        return self.page_url(self.page.next_page_number())
+
+class PaginatedTabularInline(admin.TabularInline):
+    """Tabular inline that renders ``per_page`` related objects at a time"""
+    formset = PaginatedInlineFormSet
+    template = 'admin/api/edit_inline/paginated_tabular.html'
+    per_page = 20
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.request = request
+        formset.per_page = self.per_page
+        formset.page_param = f'{formset.get_default_prefix()}-page'
+        return formset
+
+class EnrollmentInline(PaginatedTabularInline):
     model = Enrollment
     extra = 1
-    autocomplete_fields = ('program',)
+    autocomplete_fields = ('client', 'program')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('client', 'program')
 
 @admin.register(HealthProgram)
 class HealthProgramAdmin(admin.ModelAdmin):
@@ -35,16 +217,20 @@ class HealthProgramAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at')
     inlines = [EnrollmentInline]
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_enrolled_counts()
+
+    @admin.display(description='Enrolled Clients', ordering='enrolled_clients_total')
     def enrolled_clients_count(self, obj):
         return obj.enrolled_clients_count
-    enrolled_clients_count.short_description = 'Enrolled Clients'
 
 @admin.register(Client)
-class ClientAdmin(admin.ModelAdmin):
+class ClientAdmin(LargeTableAdmin):
     list_display = ('first_name', 'last_name', 'gender', 'email', 'contact_number', 'registration_date')
     list_filter = ('gender', 'registration_date')
-    search_fields = ('first_name', 'last_name', 'email', 'contact_number')
-    date_hierarchy = 'registration_date'
+    # Prefix matches use the UPPER(...) text_pattern_ops indexes on Client
+    search_fields = ('^first_name', '^last_name', '^email', '^contact_number')
+    search_help_text = 'Matches the start of a name, email or contact number'
     readonly_fields = ('registration_date', 'created_at', 'updated_at')
     inlines = [EnrollmentInline]
     
@@ -62,10 +248,80 @@ class ClientAdmin(admin.ModelAdmin):
     )
 
 @admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin):
+class EnrollmentAdmin(LargeTableAdmin):
     list_display = ('client', 'program', 'enrollment_date', 'status')
     list_filter = ('status', 'enrollment_date')
-    search_fields = ('client__first_name', 'client__last_name', 'program__name')
-    date_hierarchy = 'enrollment_date'
+    list_select_related = ('client', 'program')
+    search_fields = ('^client__first_name', '^client__last_name', '^program__name')
+    search_help_text = 'Matches the start of a client name or program name'
     autocomplete_fields = ('client', 'program')
-    readonly_fields = ('created_at', 'updated_at')
\ No newline at end of file
+    readonly_fields = ('created_at', 'updated_at')
+    actions = ['mark_active', 'mark_completed', 'mark_suspended']
+    # Rows updated per transaction by the status actions
+    action_batch_size = 1000
+
+    def set_status(self, request, queryset, status):
+        """
+        Update the status of the selected enrollments in batches, each in
+        its own short transaction, publishing the same events a save would.
+        """
+        updated = 0
+        for batch in pk_batches(queryset, self.action_batch_size):
+            with transaction.atomic():
+                rows = list(
+                    Enrollment.objects.filter(pk__in=batch).exclude(status=status)
+                    .values_list('pk', 'client_id', 'program_id')
+                )
+                Enrollment.objects.filter(pk__in=[row[0] for row in rows]).update(
+                    status=status, updated_at=timezone.now()
+                )
+                for pk, client_id, program_id in rows:
+                    events.publish('enrollment', program_id, {
+                        'id': str(pk), 'client_id': str(client_id), 'status': status, 'created': False,
+                    })
+            updated += len(rows)
+        self.message_user(request, f'{updated} enrollment(s) marked {status}.')
+
+    @admin.action(description='Mark selected enrollments active')
+    def mark_active(self, request, queryset):
+        self.set_status(request, queryset, 'active')
+
+    @admin.action(description='Mark selected enrollments completed')
+    def mark_completed(self, request, queryset):
+        self.set_status(request, queryset, 'completed')
+
+    @admin.action(description='Mark selected enrollments suspended')
+    def mark_suspended(self, request, queryset):
+        self.set_status(request, queryset, 'suspended')
+
+@admin.register(ArchivedHealthProgram)
+class ArchivedHealthProgramAdmin(LargeTableAdmin):
+    list_display = ('name', 'start_date', 'end_date', 'archived_at')
+    search_fields = ('^name',)
+    actions = ['restore']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Restore selected programs and their enrollments')
+    def restore(self, request, queryset):
+        restored = restore_programs(queryset.values_list('id', flat=True))
+        self.message_user(
+            request, f"{restored['programs']} program(s) and {restored['enrollments']} enrollment(s) restored."
+        )
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ('id', 'task', 'status', 'priority', 'progress', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'task')
+    readonly_fields = ('attempts', 'progress', 'progress_message', 'result', 'error', 'worker',
+                       'heartbeat_at', 'created_at', 'started_at', 'finished_at')
+    actions = ['cancel_jobs']
+
+    @admin.action(description='Cancel selected jobs')
+    def cancel_jobs(self, request, queryset):
+        cancelled = sum(cancel(job) for job in queryset)
+        self.message_user(request, f'{cancelled} job(s) cancelled.')
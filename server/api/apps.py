@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+        from . import events, metrics, tracing
+        from .models import Enrollment, HealthProgram
+
+        post_save.connect(events.enrollment_saved, sender=Enrollment, dispatch_uid='events_enrollment_saved')
+        post_delete.connect(events.enrollment_deleted, sender=Enrollment, dispatch_uid='events_enrollment_deleted')
+        post_save.connect(events.program_saved, sender=HealthProgram, dispatch_uid='events_program_saved')
+        post_save.connect(metrics.enrollment_saved, sender=Enrollment, dispatch_uid='metrics_enrollment_saved')
+        connection_created.connect(metrics.instrument_connection, dispatch_uid='metrics_instrument_connection')
+        if settings.TRACING_ENABLED:
+            connection_created.connect(tracing.instrument_connection, dispatch_uid='tracing_instrument_connection')
@@ -0,0 +1,129 @@
+"""
+Archival of completed programs and their enrollments.
+
+Completed programs that ended more than ``ARCHIVE_RETENTION_DAYS`` ago are
+moved, with their enrollments, from the live tables into
+``ArchivedHealthProgram`` and ``ArchivedEnrollment``, so the indexes read
+by every list and capacity check only cover current data. Rows move
+``batch_size`` programs at a time; each batch is one short transaction
+that locks its programs (skipping any already locked), so enrollments
+cannot be added to a program while it is being moved.
+
+Each table is moved with one ``DELETE ... RETURNING`` feeding an
+``INSERT``, so rows keep their ids and timestamps. Archiving is not
+deletion, so archive batches set the ``api.skip_change_log`` setting,
+which the change log trigger checks, and sync clients keep the rows they
+have. Restoring records the rows as changed again, so clients that
+first synced while they were archived receive them.
+
+Reads that pass ``include_archived=true`` go through the
+``api_healthprogram_all`` and ``api_enrollment_all`` views instead; see
+``HealthProgramRecord`` and ``EnrollmentRecord``.
+"""
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedEnrollment, ArchivedHealthProgram, Enrollment, HealthProgram
+
+# Views over the live and archive tables, recreated when the enrollment table is rebuilt
+ARCHIVE_VIEWS = ('api_healthprogram_all', 'api_enrollment_all')
+
+
+def _columns(model):
+    return ', '.join(connection.ops.quote_name(field.column) for field in model._meta.concrete_fields)
+
+
+def _move(source, target, key, ids, archived_at=None):
+    """Move the rows of ``source`` whose ``key`` column is in ``ids`` to ``target``; returns the row count"""
+    # The live table's columns; archive tables add archived_at, set when archiving
+    columns = _columns(source if archived_at is not None else target)
+    if archived_at is not None:
+        insert_columns, select_columns, params = f'{columns}, archived_at', f'{columns}, %s', [ids, archived_at]
+    else:
+        insert_columns, select_columns, params = columns, columns, [ids]
+    sql = (
+        f'WITH moved AS (DELETE FROM {source._meta.db_table} WHERE {key} = ANY(%s::uuid[]) RETURNING {columns}) '
+        f'INSERT INTO {target._meta.db_table} ({insert_columns}) SELECT {select_columns} FROM moved'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+@contextmanager
+def _change_log_skipped():
+    """Keep writes made inside the block, in the current transaction, out of the sync change log"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT set_config('api.skip_change_log', 'on', true)")
+        yield
+        # A failed block leaves nothing to reset: rolling back undoes the setting too
+        cursor.execute("SELECT set_config('api.skip_change_log', 'off', true)")
+
+
+def archivable_programs(retention_days=None):
+    """Completed programs past the retention window"""
+    days = settings.ARCHIVE_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = timezone.now() - timedelta(days=days)
+    return HealthProgram.objects.filter(status='completed').filter(
+        Q(end_date__lt=cutoff.date()) | Q(end_date__isnull=True, updated_at__lt=cutoff)
+    )
+
+
+def archive_programs(retention_days=None, batch_size=100, pause=0.0, progress=None):
+    """
+    Move archivable programs and their enrollments to the archive tables in
+    batches; returns the numbers of programs and enrollments moved.
+    ``progress`` is called with the running totals after each batch.
+    """
+    moved = {'programs': 0, 'enrollments': 0}
+    while True:
+        with transaction.atomic():
+            ids = [str(pk) for pk in (
+                archivable_programs(retention_days).select_for_update(skip_locked=True)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )]
+            if not ids:
+                return moved
+            archived_at = timezone.now()
+            with _change_log_skipped():
+                moved['enrollments'] += _move(Enrollment, ArchivedEnrollment, 'program_id', ids, archived_at)
+                moved['programs'] += _move(HealthProgram, ArchivedHealthProgram, 'id', ids, archived_at)
+        if progress:
+            progress(moved)
+        if pause:
+            time.sleep(pause)
+
+
+def restore_programs(ids, batch_size=100):
+    """
+    Move archived programs ``ids``, and their enrollments, back to the
+    live tables; returns the numbers of programs and enrollments restored.
+    """
+    ids = [str(pk) for pk in ids]
+    restored = {'programs': 0, 'enrollments': 0}
+    for start in range(0, len(ids), batch_size):
+        with transaction.atomic():
+            batch = [str(pk) for pk in (
+                ArchivedHealthProgram.objects.select_for_update()
+                .filter(id__in=ids[start:start + batch_size]).values_list('id', flat=True)
+            )]
+            restored['programs'] += _move(ArchivedHealthProgram, HealthProgram, 'id', batch)
+            restored['enrollments'] += _move(ArchivedEnrollment, Enrollment, 'program_id', batch)
+    return restored
+
+
+def view_definitions(cursor):
+    """Return the SQL of the archive views that exist, to recreate them after a table rebuild"""
+    definitions = {}
+    for name in ARCHIVE_VIEWS:
+        cursor.execute('SELECT pg_get_viewdef(to_regclass(%s))', [name])
+        definition = cursor.fetchone()[0]
+        if definition:
+            definitions[name] = definition.rstrip().rstrip(';')
+    return definitions
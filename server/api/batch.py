@@ -0,0 +1,155 @@
+import contextvars
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Request metadata copied from the batch request into every sub-request
+INHERITED_META = ('SERVER_NAME', 'SERVER_PORT', 'SERVER_PROTOCOL', 'REMOTE_ADDR')
+
+
+class BatchExecutor:
+    """
+    Run the sub-requests of a batch in-process.
+
+    Each sub-request is dispatched straight to the view its path resolves
+    to, carrying the user and token the batch request authenticated with,
+    so authentication and the middleware stack run once per batch. Only
+    DRF views under ``api_root`` can be reached, and a sub-request that
+    raises becomes a 500 entry of its own. Every sub-request runs in its
+    own copy of the batch request's context, so context variables it sets
+    (such as replica routing) cannot leak into the next one. When
+    ``parallel`` is set, consecutive safe requests run concurrently;
+    writes run one at a time, in order.
+    """
+
+    def __init__(self, request, api_root, batch_view_class, max_workers=4):
+        self.request = request
+        self.api_root = api_root
+        self.batch_view_class = batch_view_class
+        self.max_workers = max_workers
+
+    def execute(self, items, parallel=False):
+        """Return one result dict per item, in request order"""
+        if not parallel:
+            return [self.run(item) for item in items]
+
+        results = []
+        reads = []
+        for item in items:
+            if item['method'] in SAFE_METHODS:
+                reads.append(item)
+                continue
+            results.extend(self.run_concurrently(reads))
+            reads = []
+            results.append(self.run(item))
+        results.extend(self.run_concurrently(reads))
+        return results
+
+    def run_concurrently(self, items):
+        if len(items) < 2:
+            return [self.run(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            # Context variables (database routing, tracing) do not cross into pool threads on their own
+            futures = [
+                executor.submit(contextvars.copy_context().run, self.run_in_thread, item) for item in items
+            ]
+            return [future.result() for future in futures]
+
+    def run_in_thread(self, item):
+        """Run ``item`` on a worker thread and release that thread's connections"""
+        try:
+            return self.run(item)
+        finally:
+            connections.close_all()
+
+    def run(self, item):
+        """Dispatch one sub-request in a copy of the current context and describe its response"""
+        return contextvars.copy_context().run(self.dispatch, item)
+
+    def dispatch(self, item):
+        path, _, query = item['path'].partition('?')
+        if not path.startswith('/'):
+            path = self.api_root + path
+
+        match = self.resolve(path)
+        if match is None:
+            return self.result(item, 404, {'detail': 'Not found.'})
+
+        if getattr(match.func, 'cls', None) is self.batch_view_class:
+            return self.result(item, 400, {'detail': 'Batch requests cannot be nested.'})
+
+        try:
+            subrequest = self.build_request(item, path, query)
+            response = match.func(subrequest, *match.args, **match.kwargs)
+            return self.result(item, response.status_code, self.response_body(response))
+        except Exception:
+            logger.exception("Batch sub-request %s %s failed", item['method'], path)
+            return self.result(item, 500, {
+                'success': False,
+                'error': {'code': 500, 'message': 'An unexpected error occurred.'},
+            })
+
+    def resolve(self, path):
+        """Return the match for an API view at ``path``, or None for anything else"""
+        if not path.startswith(self.api_root):
+            return None
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return None
+        view_class = getattr(match.func, 'cls', None)
+        if not (isinstance(view_class, type) and issubclass(view_class, APIView)):
+            return None
+        return match
+
+    def build_request(self, item, path, query):
+        body = b'' if item.get('body') is None else json.dumps(item['body']).encode()
+        environ = {
+            key: value for key, value in self.request.META.items()
+            if key in INHERITED_META or (key.startswith('HTTP_') and key != 'HTTP_CONTENT_LENGTH')
+        }
+        environ.update({
+            'REQUEST_METHOD': item['method'],
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_ACCEPT': 'application/json',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.url_scheme': self.request.scheme,
+        })
+
+        subrequest = WSGIRequest(environ)
+        # DRF authenticates requests carrying these attributes as the given user
+        subrequest._force_auth_user = self.request.user
+        subrequest._force_auth_token = self.request.auth
+        return subrequest
+
+    @staticmethod
+    def response_body(response):
+        """Return DRF data as-is, or decode the rendered body"""
+        if hasattr(response, 'data'):
+            return response.data
+
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        if not content:
+            return None
+        if response.get('Content-Type', '').startswith('application/json'):
+            return json.loads(content)
+        return content.decode(response.charset or 'utf-8')
+
+    @staticmethod
+    def result(item, status_code, body):
+        return {'id': item.get('id'), 'status': status_code, 'body': body}
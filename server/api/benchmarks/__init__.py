@@ -0,0 +1,98 @@
+"""
+Benchmark suites run by ``manage.py benchmark``.
+
+Each suite module registers its cases with the ``suite`` decorator and
+returns one result dict per case and size. Timings are reported in
+milliseconds, alongside the queries and peak memory of one extra run.
+"""
+import importlib
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection
+
+SUITE_MODULES = [
+    'api.benchmarks.serializers',
+    'api.benchmarks.rendering',
+    'api.benchmarks.compression',
+    'api.benchmarks.endpoints',
+    'api.benchmarks.keys',
+]
+
+SUITES = {}
+
+
+def suite(name):
+    """Register a benchmark suite under ``name``"""
+    def decorator(func):
+        SUITES[name] = func
+        return func
+    return decorator
+
+
+def load_suites():
+    """Import every suite module so its suites are registered"""
+    for module in SUITE_MODULES:
+        importlib.import_module(module)
+    return SUITES
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of ``values``"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(timings):
+    """Summarize a list of timings in seconds as milliseconds"""
+    timings_ms = [timing * 1000 for timing in timings]
+    return {
+        'mean_ms': statistics.fmean(timings_ms),
+        'p50_ms': percentile(timings_ms, 0.50),
+        'p95_ms': percentile(timings_ms, 0.95),
+        'p99_ms': percentile(timings_ms, 0.99),
+    }
+
+
+class QueryCounter:
+    """Execute wrapper counting queries; unlike the debug query log it has no length limit"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def profile(func):
+    """Return the queries and peak Python allocations of one ``func()`` call"""
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+    return {'queries': counter.count, 'peak_alloc_kb': max(peak - before, 0) / 1024}
+
+
+def measure(func, repeat=20, warmup=2):
+    """Time ``func`` over ``repeat`` runs after ``warmup`` discarded runs, then profile one more"""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {**summarize(timings), **profile(func)}
@@ -0,0 +1,79 @@
+"""
+Benchmark baselines: save a run's results as JSON and compare later runs.
+
+A case is identified by suite, case name and size. A metric regresses
+when it grows by more than the threshold fraction; query counts regress
+on any increase since they do not vary between runs.
+"""
+import json
+import platform
+from datetime import datetime, timezone
+
+import django
+
+# Metrics compared against the baseline, and the minimum absolute change that counts
+GATED_METRICS = {
+    'p50_ms': 0.05,
+    'p95_ms': 0.05,
+    'queries': 0,
+    'peak_alloc_kb': 16,
+}
+
+
+def case_key(suite_name, result):
+    return f"{suite_name}/{result['case']}/{result['size']}"
+
+
+def save_baseline(path, results):
+    """Write ``results`` ({suite: [result, ...]}) to ``path`` with a description of the environment"""
+    document = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+        },
+        'cases': {
+            case_key(suite_name, result): result
+            for suite_name, suite_results in results.items()
+            for result in suite_results
+        },
+    }
+    with open(path, 'w') as handle:
+        json.dump(document, handle, indent=2, sort_keys=True)
+    return document
+
+
+def load_baseline(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def compare(baseline, results, threshold=0.10):
+    """
+    Compare ``results`` with a loaded baseline.
+
+    Returns one entry per gated metric that changed, each with the old and
+    new value, the relative change and whether it is a regression.
+    """
+    changes = []
+    for suite_name, suite_results in results.items():
+        for result in suite_results:
+            key = case_key(suite_name, result)
+            previous = baseline['cases'].get(key)
+            if previous is None:
+                continue
+            for metric, noise in GATED_METRICS.items():
+                if metric not in result or metric not in previous:
+                    continue
+                old, new = previous[metric], result[metric]
+                if abs(new - old) <= noise:
+                    continue
+                change = (new - old) / old if old else float('inf')
+                limit = 0 if metric == 'queries' else threshold
+                changes.append({
+                    'case': key, 'metric': metric, 'baseline': old, 'current': new,
+                    'change': change, 'regression': change > limit,
+                })
+    return changes
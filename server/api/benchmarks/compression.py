@@ -0,0 +1,40 @@
+from django.conf import settings
+
+from api.compression import VariantCache, available_codecs, timed_compress
+from api.fast_serializers import client_fast_serializer
+from api.models import Client
+from api.renderers import FastJSONRenderer
+
+from . import measure, suite
+from .datasets import seed_dataset
+
+
+@suite('compression')
+def compression_suite(sizes, repeat):
+    """Report ratio and CPU time per codec for rendered client pages"""
+    seed_dataset(clients=max(sizes), programs=20)
+    codecs = available_codecs(settings.COMPRESSION_CODECS, settings.COMPRESSION_LEVELS)
+    results = []
+
+    for size in sizes:
+        queryset = client_fast_serializer.get_queryset(Client.objects.all())[:size]
+        body = FastJSONRenderer().render({'results': client_fast_serializer.serialize(queryset)})
+
+        for codec in codecs:
+            compressed, cpu_seconds = timed_compress(codec, body)
+            cache = VariantCache(max_bytes=len(compressed) * 16)
+            cache.set(cache.key(codec, body), compressed)
+
+            results.append({
+                'case': f'compress.{codec.name}', 'size': size,
+                **measure(lambda: codec.compress(body), repeat=repeat),
+                'cpu_ms': cpu_seconds * 1000,
+                'bytes_in': len(body), 'bytes_out': len(compressed),
+                'ratio': len(body) / len(compressed),
+            })
+            results.append({
+                'case': f'cache_hit.{codec.name}', 'size': size,
+                **measure(lambda: cache.get(cache.key(codec, body)), repeat=repeat),
+            })
+
+    return results
@@ -0,0 +1,49 @@
+import random
+from datetime import date, timedelta
+
+from api.models import Client, HealthProgram, Enrollment
+
+
+def seed_dataset(clients=200, programs=20, enrollments_per_client=2, seed=0):
+    """Create a small deterministic dataset with bulk inserts"""
+    rng = random.Random(seed)
+    today = date.today()
+
+    program_objects = HealthProgram.objects.bulk_create([
+        HealthProgram(
+            name=f"Program {index}",
+            description=f"Benchmark program {index}",
+            start_date=today - timedelta(days=rng.randint(0, 700)),
+            status=rng.choice(['active', 'planned']),
+            capacity=rng.choice([None, 500, 1000]),
+        )
+        for index in range(programs)
+    ])
+
+    client_objects = Client.objects.bulk_create([
+        Client(
+            first_name=f"First{index}",
+            last_name=f"Last{index}",
+            date_of_birth=today - timedelta(days=rng.randint(365, 365 * 80)),
+            gender=rng.choice(['male', 'female', 'other']),
+            contact_number=f"07{index:08d}",
+            email=f"client{index}@example.com",
+            address=f"{index} Benchmark Road",
+            emergency_contact=f"07{index + 1:08d}",
+            registration_date=today - timedelta(days=rng.randint(0, 1000)),
+        )
+        for index in range(clients)
+    ])
+
+    enrollments = []
+    for client in client_objects:
+        for program in rng.sample(program_objects, min(enrollments_per_client, programs)):
+            enrollments.append(Enrollment(
+                client=client,
+                program=program,
+                enrollment_date=today - timedelta(days=rng.randint(0, 300)),
+                status=rng.choice(['active', 'completed', 'suspended']),
+            ))
+    Enrollment.objects.bulk_create(enrollments)
+
+    return client_objects, program_objects
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.datagen import generate_dataset
+from api.models import Client, HealthProgram
+
+from . import measure, suite
+
+PASSWORD = 'benchmark-password'
+
+
+def request(api_client, method, url, data=None, expected=200):
+    """Return a callable making one request and consuming the whole body"""
+    def call():
+        response = getattr(api_client, method)(url, data, format='json' if method == 'post' else None)
+        if response.status_code != expected:
+            raise AssertionError(f"{method.upper()} {url} returned {response.status_code}")
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+    return call
+
+
+def fresh_clients(count):
+    """Clients enrolled in nothing yet, one per enroll request"""
+    template = Client.objects.order_by('pk').first()
+    return Client.objects.bulk_create([
+        Client(
+            first_name='Bench', last_name=f'Enroll{index}', date_of_birth=template.date_of_birth,
+            gender=template.gender, contact_number=template.contact_number, email=f'enroll{index}@example.com',
+            address=template.address, emergency_contact=template.emergency_contact,
+        )
+        for index in range(count)
+    ])
+
+
+@suite('endpoints')
+def endpoint_suite(sizes, repeat):
+    """Time the main API endpoints end to end against generated datasets of ``size`` clients"""
+    results = []
+    user = None
+
+    for size in sizes:
+        generate_dataset(size, max(10, size // 100), seed=0, workers=0, truncate=True, change_log=False)
+        if user is None:
+            user = get_user_model().objects.create_user(
+                'benchmark@example.com', PASSWORD, first_name='Bench', last_name='Mark', is_staff=True
+            )
+        api_client = APIClient()
+        api_client.force_authenticate(user=user)
+
+        popular = HealthProgram.objects.with_enrolled_counts().order_by('-enrolled_clients_total').first()
+        open_program = HealthProgram.objects.create(
+            name='Benchmark Enrollment', description='Open program for enroll requests',
+            start_date=popular.start_date, status='active',
+        )
+        name = Client.objects.order_by('pk').values_list('first_name', flat=True).first()
+        enrollees = iter(fresh_clients(repeat + 5))
+
+        def enroll():
+            url = reverse('client-enroll', args=[next(enrollees).pk])
+            return request(api_client, 'post', url, {'program_id': str(open_program.pk)}, expected=201)()
+
+        cases = [
+            ('clients.list', request(api_client, 'get', reverse('client-list'))),
+            ('clients.search', request(api_client, 'get', reverse('client-search'), {'query': name})),
+            ('clients.enroll', enroll),
+            ('programs.list', request(api_client, 'get', reverse('healthprogram-list'))),
+            ('programs.clients', request(api_client, 'get', reverse('healthprogram-clients', args=[popular.pk]))),
+            ('auth.login', request(
+                APIClient(), 'post', reverse('login'), {'email': user.email, 'password': PASSWORD}
+            )),
+        ]
+        for case, call in cases:
+            results.append({'case': case, 'size': size, **measure(call, repeat=repeat, warmup=2)})
+
+    return results
@@ -0,0 +1,68 @@
+import uuid
+
+from django.db import connection
+
+from api.ids import uuid7
+
+from . import measure, suite
+
+KEY_FUNCTIONS = {
+    'uuid4': uuid.uuid4,
+    'uuid7': uuid7,
+}
+
+# Rows per INSERT statement, as a bulk import would send them
+BATCH_SIZE = 1000
+PAYLOAD = 'x' * 200
+
+
+def insert_rows(table, make_key, count):
+    """Return a callable inserting ``count`` rows keyed by ``make_key()`` into ``table``"""
+    def insert():
+        with connection.cursor() as cursor:
+            for start in range(0, count, BATCH_SIZE):
+                keys = [str(make_key()) for _ in range(min(BATCH_SIZE, count - start))]
+                cursor.execute(
+                    f'INSERT INTO {table} (id, payload) SELECT unnest(%s::uuid[]), %s', [keys, PAYLOAD]
+                )
+    return insert
+
+
+def table_stats(table):
+    """Primary key index size and how closely heap order follows key order"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {table}')
+        cursor.execute(
+            "SELECT pg_relation_size(%s), "
+            "(SELECT correlation FROM pg_stats WHERE tablename = %s AND attname = 'id')",
+            [f'{table}_pkey', table],
+        )
+        index_bytes, correlation = cursor.fetchone()
+    return {'index_kb': index_bytes / 1024, 'correlation': correlation}
+
+
+@suite('keys')
+def key_suite(sizes, repeat):
+    """
+    Compare inserting ``size`` rows per run with random (uuid4) and
+    time-ordered (uuid7) primary keys. The table keeps growing across
+    runs, so later runs insert into an index larger than the cache.
+    """
+    results = []
+    for size in sizes:
+        for name, make_key in KEY_FUNCTIONS.items():
+            table = f'benchmark_keys_{name}'
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE IF EXISTS {table}')
+                cursor.execute(f'CREATE TABLE {table} (id uuid PRIMARY KEY, payload text NOT NULL)')
+            try:
+                timings = measure(insert_rows(table, make_key, size), repeat=repeat, warmup=1)
+                results.append({
+                    'case': f'insert.{name}', 'size': size, **timings,
+                    'rows_per_s': size / (timings['p50_ms'] / 1000),
+                    **table_stats(table),
+                })
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'DROP TABLE {table}')
+    return results
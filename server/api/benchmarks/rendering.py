@@ -0,0 +1,68 @@
+import time
+import tracemalloc
+
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import client_fast_serializer
+from api.models import Client
+from api.renderers import FastJSONRenderer, render_list_chunks
+from api.views import chunked
+
+from . import measure, suite
+from .datasets import seed_dataset
+
+CHUNK_SIZE = 50
+
+
+def buffered_body(renderer, queryset):
+    """Serialize the whole page, then render it in one call"""
+    rows = client_fast_serializer.serialize(queryset)
+    yield renderer.render({'count': len(rows), 'next': None, 'previous': None, 'results': rows})
+
+
+def streamed_body(renderer, queryset):
+    """Serialize and render the page chunk by chunk"""
+    chunks = chunked(queryset.iterator(chunk_size=CHUNK_SIZE), CHUNK_SIZE)
+    yield b'{"count":0,"next":null,"previous":null,"results":['
+    yield from render_list_chunks(renderer, (client_fast_serializer.serialize(chunk) for chunk in chunks))
+    yield b']}'
+
+
+def first_byte_and_peak(body):
+    """Return seconds to the first chunk and peak traced memory while consuming ``body``"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    iterator = iter(body)
+    next(iterator)
+    first_byte = time.perf_counter() - start
+    for _ in iterator:
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_byte, peak
+
+
+@suite('rendering')
+def rendering_suite(sizes, repeat):
+    """Compare stdlib and orjson rendering, buffered and streamed bodies"""
+    seed_dataset(clients=max(sizes), programs=20)
+    results = []
+
+    for size in sizes:
+        queryset = client_fast_serializer.get_queryset(Client.objects.all())[:size]
+        rows = client_fast_serializer.serialize(queryset)
+
+        for name, renderer in (('stdlib', JSONRenderer()), ('orjson', FastJSONRenderer())):
+            results.append({'case': f'render.{name}', 'size': size,
+                            **measure(lambda: renderer.render(rows), repeat=repeat)})
+
+        renderer = FastJSONRenderer()
+        for name, body in (('buffered', buffered_body), ('streamed', streamed_body)):
+            first_byte, peak = first_byte_and_peak(body(renderer, queryset))
+            results.append({
+                'case': f'response.{name}', 'size': size,
+                **measure(lambda: b''.join(body(renderer, queryset)), repeat=repeat),
+                'ttfb_ms': first_byte * 1000, 'peak_kib': peak / 1024,
+            })
+
+    return results
@@ -0,0 +1,47 @@
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import (
+    client_fast_serializer, program_fast_serializer, enrollment_fast_serializer
+)
+from api.models import Client, HealthProgram, Enrollment
+from api.serializers import ClientSerializer, HealthProgramSerializer, EnrollmentSerializer
+
+from . import measure, suite
+from .datasets import seed_dataset
+
+CASES = [
+    ('client', Client, ClientSerializer, client_fast_serializer),
+    ('program', HealthProgram, HealthProgramSerializer, program_fast_serializer),
+    ('enrollment', Enrollment, EnrollmentSerializer, enrollment_fast_serializer),
+]
+
+
+@suite('serializers')
+def serializer_suite(sizes, repeat):
+    """Compare ModelSerializer pages with the values() fast path"""
+    seed_dataset(clients=max(sizes), programs=max(20, max(sizes) // 5))
+    renderer = JSONRenderer()
+    results = []
+
+    for name, model, serializer_class, fast_serializer in CASES:
+        for size in sizes:
+            queryset = model.objects.all()
+
+            def standard():
+                return serializer_class(list(queryset[:size]), many=True).data
+
+            def fast():
+                return fast_serializer.serialize(fast_serializer.get_queryset(queryset)[:size])
+
+            if renderer.render(standard()) != renderer.render(fast()):
+                raise AssertionError(f"Fast {name} serializer output differs at page size {size}")
+
+            baseline = measure(standard, repeat=repeat)
+            optimized = measure(fast, repeat=repeat)
+            results.append({'case': f'{name}.model_serializer', 'size': size, **baseline})
+            results.append({
+                'case': f'{name}.fast_serializer', 'size': size, **optimized,
+                'speedup': baseline['mean_ms'] / optimized['mean_ms'],
+            })
+
+    return results
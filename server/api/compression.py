@@ -0,0 +1,231 @@
+import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.utils.http import parse_etags
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class Codec:
+    """A content coding that can compress whole bodies and streams"""
+    name = None
+
+    def __init__(self, level):
+        self.level = level
+
+    def compress(self, data):
+        compressor = self.compressobj()
+        return compressor.compress(data) + compressor.flush(zlib.Z_FINISH)
+
+    def compressobj(self):
+        raise NotImplementedError
+
+
+class GzipCodec(Codec):
+    name = 'gzip'
+
+    def compressobj(self):
+        return zlib.compressobj(self.level, zlib.DEFLATED, 31)
+
+
+class DeflateCodec(Codec):
+    name = 'deflate'
+
+    def compressobj(self):
+        return zlib.compressobj(self.level, zlib.DEFLATED, 15)
+
+
+class BrotliCodec(Codec):
+    name = 'br'
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.level)
+
+    def compressobj(self):
+        return _BrotliStream(brotli.Compressor(quality=self.level))
+
+
+class ZstdCodec(Codec):
+    name = 'zstd'
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def compressobj(self):
+        return _ZstdStream(zstandard.ZstdCompressor(level=self.level).compressobj())
+
+
+class _BrotliStream:
+    """Adapt brotli's compressor to the zlib compressobj interface"""
+
+    def __init__(self, compressor):
+        self.compressor = compressor
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self, mode=zlib.Z_SYNC_FLUSH):
+        return self.compressor.finish() if mode == zlib.Z_FINISH else self.compressor.flush()
+
+
+class _ZstdStream:
+    """Adapt zstandard's compressobj to the zlib compressobj interface"""
+
+    def __init__(self, compressor):
+        self.compressor = compressor
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self, mode=zlib.Z_SYNC_FLUSH):
+        if mode == zlib.Z_FINISH:
+            return self.compressor.flush()
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+
+CODEC_CLASSES = {
+    'br': BrotliCodec if brotli is not None else None,
+    'zstd': ZstdCodec if zstandard is not None else None,
+    'gzip': GzipCodec,
+    'deflate': DeflateCodec,
+}
+
+
+def available_codecs(preference, levels):
+    """Instantiate the preferred codecs whose libraries are installed"""
+    return [
+        CODEC_CLASSES[name](levels.get(name, 6))
+        for name in preference
+        if CODEC_CLASSES.get(name) is not None
+    ]
+
+
+def parse_accept_encoding(header):
+    """Return a mapping of coding name to q-value from an Accept-Encoding header"""
+    accepted = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def negotiate(header, codecs):
+    """Pick the codec with the highest q-value, breaking ties by server preference"""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for codec in codecs:
+        quality = accepted.get(codec.name, wildcard)
+        if quality > best_quality:
+            best, best_quality = codec, quality
+    return best
+
+
+def coded_etag(etag, codec):
+    """The ETag of ``codec``'s encoding of the representation tagged ``etag``"""
+    return f'{etag[:-1]}-{codec.name}"'
+
+
+def uncoded_etags(header, codec):
+    """
+    Map If-None-Match tags given to ``codec``'s encoding back to the
+    representation's own tags; returns the header and whether any changed.
+    """
+    suffix = f'-{codec.name}"'
+    etags = parse_etags(header)
+    if not any(etag.endswith(suffix) for etag in etags):
+        return header, False
+    return ', '.join(etag[:-len(suffix)] + '"' if etag.endswith(suffix) else etag for etag in etags), True
+
+
+class VariantCache:
+    """Byte-bounded LRU of compressed bodies keyed by codec and content"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(codec, content, etag=None):
+        """Key by strong ETag when there is one, otherwise by a digest of the body"""
+        if etag and etag.startswith('"'):
+            return (codec.name, 'etag', etag)
+        return (codec.name, 'digest', hashlib.blake2b(content, digest_size=16).digest())
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes // 8:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class CompressionStats:
+    """Per-codec totals of bytes, CPU time and variant cache use"""
+
+    FIELDS = ('responses', 'bytes_in', 'bytes_out', 'cpu_seconds', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}
+
+    def record(self, codec_name, **values):
+        with self.lock:
+            totals = self.totals.setdefault(codec_name, dict.fromkeys(self.FIELDS, 0))
+            for field, value in values.items():
+                totals[field] += value
+
+    def snapshot(self):
+        """Return totals per codec with the overall compression ratio"""
+        with self.lock:
+            report = {name: dict(totals) for name, totals in self.totals.items()}
+        for totals in report.values():
+            totals['ratio'] = totals['bytes_in'] / totals['bytes_out'] if totals['bytes_out'] else 0.0
+        return report
+
+
+compression_stats = CompressionStats()
+
+
+def timed_compress(codec, content):
+    """Compress ``content`` and return the body with the thread CPU time spent"""
+    start = time.thread_time()
+    compressed = codec.compress(content)
+    return compressed, time.thread_time() - start
@@ -0,0 +1,359 @@
+"""
+Synthetic data for capacity testing.
+
+``generate_dataset`` writes clients, programs and enrollments with
+``COPY`` from parallel worker processes. Rows are generated in chunks,
+each from its own random stream derived from the seed and the chunk
+number, so a seed always yields the same rows whatever the worker count.
+"""
+import bisect
+import io
+import multiprocessing
+import random
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import psycopg2
+from django.db import connection, connections
+
+from api.ids import uuid7_at
+from api.models import ChangeLog, Client, Enrollment, HealthProgram
+
+FIRST_NAMES = {
+    'female': ['Akinyi', 'Wanjiru', 'Achieng', 'Njeri', 'Atieno', 'Wambui', 'Chebet', 'Mumbua', 'Nafula',
+               'Auma', 'Faith', 'Grace', 'Mercy', 'Joy', 'Esther', 'Mary', 'Amina', 'Zawadi', 'Halima', 'Ruth'],
+    'male': ['Otieno', 'Kamau', 'Mwangi', 'Kiprop', 'Ochieng', 'Mutua', 'Wafula', 'Kipchoge', 'Omondi',
+             'Baraka', 'Brian', 'Kevin', 'Dennis', 'John', 'Peter', 'Hassan', 'Juma', 'Samuel', 'David', 'Moses'],
+}
+FIRST_NAMES['other'] = FIRST_NAMES['female'][:10] + FIRST_NAMES['male'][:10]
+LAST_NAMES = ['Odhiambo', 'Kariuki', 'Wanjala', 'Njoroge', 'Koech', 'Onyango', 'Muthoni', 'Kiptoo', 'Otieno',
+              'Mwangi', 'Kimani', 'Ndungu', 'Were', 'Barasa', 'Cheruiyot', 'Akello', 'Omollo', 'Maina', 'Gitau',
+              'Rotich', 'Ali', 'Mohamed', 'Nyaga', 'Kilonzo', 'Makau', 'Wekesa', 'Chege', 'Langat', 'Ouma', 'Wairimu']
+TOWNS = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika', 'Machakos', 'Nyeri', 'Kakamega', 'Garissa',
+         'Kitale', 'Malindi', 'Kericho', 'Embu', 'Meru']
+STREETS = ['Moi Avenue', 'Kenyatta Road', 'Oginga Odinga Street', 'Market Lane', 'Hospital Road', 'Station Road',
+           'Biashara Street', 'Uhuru Highway']
+CONDITIONS = ['HIV Care', 'TB Treatment', 'Malaria Prevention', 'Maternal Health', 'Child Immunization',
+              'Diabetes Management', 'Hypertension Control', 'Nutrition Support', 'Mental Health', 'Family Planning',
+              'Cervical Cancer Screening', 'Hepatitis B']
+
+GENDERS = ['female', 'male', 'other']
+GENDER_WEIGHTS = [0.51, 0.48, 0.01]
+
+# Age bands (years) weighted like a young population pyramid
+AGE_BANDS = [(0, 5), (5, 15), (15, 25), (25, 35), (35, 45), (45, 55), (55, 65), (65, 90)]
+AGE_WEIGHTS = [0.14, 0.24, 0.20, 0.15, 0.11, 0.07, 0.05, 0.04]
+
+PROGRAM_STATUSES = ['active', 'completed', 'planned']
+PROGRAM_STATUS_WEIGHTS = [0.6, 0.25, 0.15]
+
+# Programs each client is enrolled in: most clients have one or two
+FAN_OUT = [0, 1, 2, 3, 4, 5]
+FAN_OUT_WEIGHTS = [0.15, 0.45, 0.22, 0.10, 0.05, 0.03]
+
+ENROLLMENT_STATUSES = ['active', 'completed', 'suspended']
+ACTIVE_ENROLLMENT_WEIGHTS = [0.8, 0.1, 0.1]
+
+HISTORY_YEARS = 5
+
+EPOCH = date(1970, 1, 1)
+
+CLIENT_COLUMNS = ('id', 'first_name', 'last_name', 'date_of_birth', 'gender', 'contact_number', 'email',
+                  'address', 'emergency_contact', 'registration_date', 'created_at', 'updated_at')
+PROGRAM_COLUMNS = ('id', 'name', 'description', 'start_date', 'end_date', 'status', 'capacity',
+                   'created_at', 'updated_at')
+ENROLLMENT_COLUMNS = ('id', 'client_id', 'program_id', 'enrollment_date', 'status', 'notes',
+                      'created_at', 'updated_at')
+
+COUNT = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kKmM]?)\s*$')
+
+
+def parse_count(value):
+    """Parse a row count such as ``5000``, ``2k`` or ``1.5M``"""
+    match = COUNT.match(str(value))
+    if not match:
+        raise ValueError(f'Invalid count {value!r}')
+    number, suffix = match.groups()
+    return int(float(number) * {'': 1, 'k': 1_000, 'm': 1_000_000}[suffix.lower()])
+
+
+def chunk_rng(seed, kind, number):
+    return random.Random(f'{seed}:{kind}:{number}')
+
+
+def ordered_uuid(rng, timestamp_ms):
+    """Version 7 key for a row created at ``timestamp_ms``, as the model default would have made it"""
+    return str(uuid7_at(timestamp_ms, rng))
+
+
+def timestamp_ms(day, hour):
+    return ((day - EPOCH).days * 24 + hour) * 3_600_000
+
+
+class Dates:
+    """ISO strings for day offsets back from ``today``, cached since formatting dominates row generation"""
+
+    def __init__(self, today, days):
+        self.today = today
+        self.strings = [(today - timedelta(days=offset)).isoformat() for offset in range(days + 1)]
+        self.first_ms = timestamp_ms(today, 0)
+
+    def __getitem__(self, offset):
+        return self.strings[offset]
+
+    def timestamp_ms(self, offset, hour):
+        return self.first_ms + (hour - offset * 24) * 3_600_000
+
+
+def generate_programs(count, seed, today):
+    """Return program rows, plus (id, start offset, status, cumulative weight) for enrollment sampling"""
+    rng = chunk_rng(seed, 'programs', 0)
+    rows, choices = [], []
+    history = HISTORY_YEARS * 365
+    total = 0.0
+    for index in range(count):
+        status = rng.choices(PROGRAM_STATUSES, PROGRAM_STATUS_WEIGHTS)[0]
+        if status == 'planned':
+            start_offset, end_offset = -rng.randint(1, 180), None
+        elif status == 'completed':
+            start_offset = rng.randint(365, history)
+            end_offset = rng.randint(1, start_offset - 180)
+        else:
+            start_offset, end_offset = rng.randint(0, history), None
+        capacity = None if rng.random() < 0.3 else int(rng.lognormvariate(7, 1)) // 50 * 50 + 50
+        condition = CONDITIONS[index % len(CONDITIONS)]
+        town = rng.choice(TOWNS)
+        start = today - timedelta(days=start_offset)
+        # Planned programs are created now, not on their future start date
+        program_id = ordered_uuid(rng, timestamp_ms(min(start, today), 8))
+        end = (today - timedelta(days=end_offset)).isoformat() if end_offset is not None else None
+        stamp = f'{start.isoformat()} 08:00:00+00'
+        rows.append((
+            program_id, f'{condition} {town} {index + 1}', f'{condition} programme for {town} county',
+            start.isoformat(), end, status, capacity, stamp, stamp,
+        ))
+        if status != 'planned':
+            # Popularity follows a Zipf-like curve, so a few programs hold most enrollments
+            total += 1.0 / (index % 97 + 1)
+            choices.append((program_id, max(start_offset, 0), status, total))
+    return rows, choices
+
+
+def generate_chunk(seed, number, start, count, programs, dates):
+    """Return client and enrollment rows for clients ``start`` to ``start + count``"""
+    rng = chunk_rng(seed, 'clients', number)
+    history = HISTORY_YEARS * 365
+    weights = [choice[3] for choice in programs]
+    clients, enrollments = [], []
+
+    for index in range(start, start + count):
+        gender = rng.choices(GENDERS, GENDER_WEIGHTS)[0]
+        first = rng.choice(FIRST_NAMES[gender])
+        last = rng.choice(LAST_NAMES)
+        low, high = rng.choices(AGE_BANDS, AGE_WEIGHTS)[0]
+        # Registrations grow over time, so recent dates are more likely
+        registered = int(history * (1 - rng.random() ** 0.5))
+        born = min(registered + rng.randint(low * 365, high * 365), len(dates.strings) - 1)
+        stamp = f'{dates[registered]} 09:00:00+00'
+        client_id = ordered_uuid(rng, dates.timestamp_ms(registered, 9))
+        clients.append((
+            client_id, first, last, dates[born], gender, f'07{rng.randrange(10 ** 8):08d}',
+            f'{first.lower()}.{last.lower()}{index}@example.com',
+            f'{rng.randint(1, 999)} {rng.choice(STREETS)}, {rng.choice(TOWNS)}', f'07{rng.randrange(10 ** 8):08d}',
+            dates[registered], stamp, stamp,
+        ))
+
+        fan_out = min(rng.choices(FAN_OUT, FAN_OUT_WEIGHTS)[0], len(programs))
+        chosen = set()
+        while len(chosen) < fan_out:
+            chosen.add(bisect.bisect_left(weights, rng.random() * weights[-1]))
+        for position in chosen:
+            program_id, program_start, program_status, _ = programs[position]
+            earliest = min(registered, program_start)
+            enrolled = rng.randint(0, earliest) if earliest else 0
+            if program_status == 'completed':
+                status = 'completed'
+            else:
+                status = rng.choices(ENROLLMENT_STATUSES, ACTIVE_ENROLLMENT_WEIGHTS)[0]
+            stamp = f'{dates[enrolled]} 10:00:00+00'
+            enrollment_id = ordered_uuid(rng, dates.timestamp_ms(enrolled, 10))
+            enrollments.append((enrollment_id, client_id, program_id, dates[enrolled], status, None, stamp, stamp))
+    return clients, enrollments
+
+
+CHANGE_LOG_COLUMNS = ('txid', 'resource', 'object_id', 'deleted', 'changed_at')
+
+
+def copy_changes(cursor, resource, rows):
+    """Log ``rows`` as changed by the current transaction, as the change-log trigger would"""
+    cursor.execute('SELECT txid_current(), now()')
+    txid, now = cursor.fetchone()
+    copy_rows(cursor, ChangeLog._meta.db_table, CHANGE_LOG_COLUMNS,
+              ((txid, resource, row[0], 'f', now.isoformat()) for row in rows))
+
+
+def copy_chunk(cursor, client_rows, enrollment_rows, change_log):
+    copy_rows(cursor, Client._meta.db_table, CLIENT_COLUMNS, client_rows)
+    copy_rows(cursor, Enrollment._meta.db_table, ENROLLMENT_COLUMNS, enrollment_rows)
+    if change_log:
+        copy_changes(cursor, 'clients', client_rows)
+        copy_changes(cursor, 'enrollments', enrollment_rows)
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Load ``rows`` into ``table`` with COPY ... FROM STDIN in text format"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(r'\N' if value is None else str(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+# Set in each worker process by init_worker
+_worker = {}
+
+
+def init_worker(params, seed, programs, today, change_log):
+    _worker.update(
+        connection=psycopg2.connect(**params), seed=seed, programs=programs, change_log=change_log,
+        dates=Dates(today, (HISTORY_YEARS + 90) * 365),
+    )
+
+
+def write_chunk(number, start, count):
+    """Generate and COPY one chunk in a worker process; returns the rows written"""
+    clients, enrollments = generate_chunk(
+        _worker['seed'], number, start, count, _worker['programs'], _worker['dates']
+    )
+    conn = _worker['connection']
+    with conn, conn.cursor() as cursor:
+        copy_chunk(cursor, clients, enrollments, _worker['change_log'])
+    return len(clients), len(enrollments)
+
+
+TABLES = (HealthProgram._meta.db_table, Client._meta.db_table, Enrollment._meta.db_table)
+
+
+def change_triggers(cursor):
+    """Return the change-log triggers installed on the generated tables"""
+    cursor.execute(
+        "SELECT c.relname, t.tgname FROM pg_trigger t JOIN pg_class c ON c.oid = t.tgrelid "
+        "WHERE c.relname = ANY(%s) AND t.tgname = c.relname || '_changes'",
+        [list(TABLES)],
+    )
+    return cursor.fetchall()
+
+
+# Secondary indexes and foreign keys of the bulk-loaded tables, which are cheaper to rebuild than maintain
+SUSPENDABLE_SQL = """
+SELECT i.tablename, 'index', i.indexname, i.indexdef FROM pg_indexes i
+WHERE i.tablename = ANY(%(tables)s)
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname)
+UNION ALL
+SELECT t.relname, 'foreign key', c.conname, pg_get_constraintdef(c.oid) FROM pg_constraint c
+JOIN pg_class t ON t.oid = c.conrelid
+WHERE t.relname = ANY(%(tables)s) AND c.contype = 'f'
+"""
+
+
+def suspend_indexes(cursor, tables, restore):
+    """
+    Drop the secondary indexes and foreign keys of ``tables``, appending
+    the SQL restoring each to ``restore`` as soon as it is dropped.
+    """
+    cursor.execute(SUSPENDABLE_SQL, {'tables': list(tables)})
+    for table, kind, name, definition in cursor.fetchall():
+        if kind == 'index':
+            cursor.execute(f'DROP INDEX {name}')
+            # A partitioned parent's definition reads ON ONLY, which would skip its partitions
+            restore.append(definition.replace(' ON ONLY ', ' ON '))
+        else:
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+            # Re-adding NOT VALID and validating checks every row in one pass
+            restore.append(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition} NOT VALID')
+            restore.append(f'ALTER TABLE {table} VALIDATE CONSTRAINT {name}')
+
+
+def generate_dataset(clients, programs, seed=0, workers=None, chunk_size=50_000, truncate=False,
+                     change_log=True, defer_indexes=True, progress=None):
+    """
+    Load ``clients`` clients and ``programs`` programs with their enrollments.
+
+    With ``workers=0`` rows are copied through Django's connection inside
+    the caller's transaction; otherwise each worker commits its chunks on
+    its own connection. The change-log triggers are disabled while loading;
+    with ``change_log`` each chunk logs its rows with COPY instead. With
+    ``defer_indexes`` the client and enrollment secondary indexes and
+    foreign keys are dropped for the load and rebuilt after.
+    ``progress(clients, enrollments)`` is called as chunks finish.
+    Rows of a seed that was already loaded are refused unless ``truncate``
+    is set. Returns the number of rows written per table.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers and connection.in_atomic_block:
+        raise ValueError('Parallel generation commits as it goes; call it outside a transaction')
+    today = date.today()
+    program_rows, program_choices = generate_programs(programs, seed, today)
+    chunks = [
+        (number, start, min(chunk_size, clients - start))
+        for number, start in enumerate(range(0, clients, chunk_size))
+    ]
+    totals = {'programs': len(program_rows), 'clients': 0, 'enrollments': 0}
+
+    if not truncate and HealthProgram.objects.filter(pk__in=[row[0] for row in program_rows]).exists():
+        raise ValueError(f'Rows of seed {seed} are already loaded; pass truncate (--truncate) to replace them')
+
+    with connection.cursor() as cursor:
+        triggers = change_triggers(cursor)
+        if truncate:
+            cursor.execute(f"TRUNCATE {', '.join(TABLES + (ChangeLog._meta.db_table,))} CASCADE")
+
+    # Every step from here may commit on its own, so the finally restores whatever was changed
+    disabled, restore = [], []
+    try:
+        with connection.cursor() as cursor:
+            for table, trigger in triggers:
+                cursor.execute(f'ALTER TABLE {table} DISABLE TRIGGER {trigger}')
+                disabled.append((table, trigger))
+            copy_rows(cursor, HealthProgram._meta.db_table, PROGRAM_COLUMNS, program_rows)
+            if change_log:
+                copy_changes(cursor, 'programs', program_rows)
+            if defer_indexes:
+                suspend_indexes(cursor, TABLES[1:], restore)
+
+        if workers == 0:
+            dates = Dates(today, (HISTORY_YEARS + 90) * 365)
+            with connection.cursor() as cursor:
+                for number, start, count in chunks:
+                    client_rows, enrollment_rows = generate_chunk(seed, number, start, count, program_choices, dates)
+                    copy_chunk(cursor, client_rows, enrollment_rows, change_log)
+                    totals['clients'] += len(client_rows)
+                    totals['enrollments'] += len(enrollment_rows)
+                    if progress:
+                        progress(totals['clients'], totals['enrollments'])
+        else:
+            params = connection.get_connection_params()
+            connections.close_all()
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker,
+                                     initargs=(params, seed, program_choices, today, change_log)) as executor:
+                futures = [executor.submit(write_chunk, *chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    client_count, enrollment_count = future.result()
+                    totals['clients'] += client_count
+                    totals['enrollments'] += enrollment_count
+                    if progress:
+                        progress(totals['clients'], totals['enrollments'])
+    finally:
+        with connection.cursor() as cursor:
+            for sql in restore:
+                cursor.execute(sql)
+            for table, trigger in disabled:
+                cursor.execute(f'ALTER TABLE {table} ENABLE TRIGGER {trigger}')
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {', '.join(TABLES)}")
+    return totals
@@ -0,0 +1,391 @@
+import json
+import re
+from datetime import date, timedelta
+
+import django_filters
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import Client, HealthProgram
+
+TABLES = ('api_client', 'api_healthprogram', 'api_enrollment')
+
+EXISTING_INDEXES_SQL = """
+SELECT i.relname, t.relname, ix.indisunique OR ix.indisprimary,
+       ARRAY(
+           SELECT a.attname FROM unnest(ix.indkey) WITH ORDINALITY AS k(attnum, position)
+           JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+           ORDER BY k.position
+       ),
+       pg_relation_size(i.oid)
+FROM pg_index ix
+JOIN pg_class i ON i.oid = ix.indexrelid
+JOIN pg_class t ON t.oid = ix.indrelid
+WHERE t.relname = ANY(%s)
+"""
+
+# Partitions and partition indexes report under their parent's name
+PARENTS_SQL = """
+SELECT c.relname, p.relname FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent
+"""
+
+IDENTIFIER = re.compile(r'\b([a-z_][a-z0-9_]*)\b')
+EQUALITY = re.compile(r'\(?\b([a-z_][a-z0-9_]*)\)?(?:::\w+)?\s*=\s')
+
+
+class Scenario:
+    """A request, or a bare queryset, whose SQL the advisor explains"""
+
+    def __init__(self, name, url=None, params=None, queryset=None):
+        self.name = name
+        self.url = url
+        self.params = params or {}
+        self.queryset = queryset
+
+    def capture(self, api_client):
+        """Run the scenario and return the SELECT statements it issued on the API tables"""
+        with CaptureQueriesContext(connection) as captured:
+            if self.queryset is not None:
+                list(self.queryset())
+            else:
+                response = api_client.get(self.url, self.params)
+                if response.status_code != 200:
+                    raise AssertionError(f'{self.name} returned {response.status_code}')
+                if response.streaming:
+                    b''.join(response.streaming_content)
+        statements = []
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if sql.lstrip().upper().startswith('SELECT') and any(table in sql for table in TABLES):
+                if sql not in statements:
+                    statements.append(sql)
+        return statements
+
+
+class Proposal:
+    """A candidate index, with the statements it is expected to speed up"""
+
+    def __init__(self, table, columns, reason):
+        self.table = table
+        # B-tree indexes scan both ways, so (a DESC, b DESC) is proposed as (a, b)
+        if columns and columns[0][1]:
+            columns = [(column, not descending) for column, descending in columns]
+        self.columns = columns
+        self.reason = reason
+        self.statements = set()
+        self.before_ms = self.after_ms = None
+
+    @property
+    def key(self):
+        return (self.table, tuple(self.columns))
+
+    @property
+    def gain(self):
+        if not self.before_ms:
+            return 0.0
+        return (self.before_ms - self.after_ms) / self.before_ms
+
+    def create_sql(self, name):
+        columns = ', '.join(f'{column} DESC' if descending else column for column, descending in self.columns)
+        return f'CREATE INDEX {name} ON {self.table} ({columns})'
+
+    def model_index(self):
+        fields = ', '.join(
+            repr(('-' if descending else '') + column.removesuffix('_id')) for column, descending in self.columns
+        )
+        return f'models.Index(fields=[{fields}])'
+
+
+def sample_value(model, name, filter_):
+    """Return a plausible value for ``filter_`` from the seeded data"""
+    if isinstance(filter_, django_filters.ChoiceFilter):
+        return filter_.extra['choices'][0][0]
+    if isinstance(filter_, (django_filters.UUIDFilter, django_filters.ModelChoiceFilter)):
+        related = model._meta.get_field(filter_.field_name.split('__')[0]).related_model or model
+        return str(related.objects.values_list('pk', flat=True).order_by('pk').first())
+    if isinstance(filter_, django_filters.DateFilter):
+        return (date.today() - timedelta(days=180)).isoformat()
+    if isinstance(filter_, django_filters.NumberFilter):
+        return 30
+    return 'a'
+
+
+def viewset_scenarios(registry):
+    """Build list scenarios for every filter, ordering and search of each registered viewset"""
+    scenarios = []
+    for prefix, viewset, basename in registry:
+        url = reverse(f'{basename}-list')
+        model = viewset.queryset.model
+        scenarios.append(Scenario(f'{prefix} list', url))
+        filterset_class = getattr(viewset, 'filterset_class', None)
+        if filterset_class is not None:
+            for name, filter_ in filterset_class.base_filters.items():
+                value = sample_value(model, name, filter_)
+                scenarios.append(Scenario(f'{prefix} ?{name}=', url, {name: value}))
+        for field in getattr(viewset, 'ordering_fields', None) or []:
+            for ordering in (field, f'-{field}'):
+                scenarios.append(Scenario(f'{prefix} ?ordering={ordering}', url, {'ordering': ordering}))
+        if getattr(viewset, 'search_fields', None):
+            scenarios.append(Scenario(f'{prefix} ?search=', url, {'search': 'First1'}))
+    return scenarios
+
+
+def default_scenarios():
+    """Scenarios for every registered viewset plus the custom actions and model helpers"""
+    from api.urls import router
+
+    program = HealthProgram.objects.order_by('pk').first()
+    client = Client.objects.order_by('pk').first()
+    return viewset_scenarios(router.registry) + [
+        Scenario('programs clients', reverse('healthprogram-clients', args=[program.pk])),
+        Scenario('programs detail', reverse('healthprogram-detail', args=[program.pk])),
+        Scenario('clients detail', reverse('client-detail', args=[client.pk])),
+        Scenario('clients search', reverse('client-search'), {'query': 'First1'}),
+        Scenario('clients ?expand=programs.program', reverse('client-list'), {'expand': 'programs.program'}),
+        Scenario('Client.get_active_programs', queryset=client.get_active_programs),
+    ]
+
+
+def explain(sql, runs=1):
+    """Return the EXPLAIN (ANALYZE, BUFFERS) plan of ``sql`` from the fastest of ``runs`` executions"""
+    best = None
+    with connection.cursor() as cursor:
+        for _ in range(runs):
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+            plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]
+            if best is None or plan['Execution Time'] < best['Execution Time']:
+                best = plan
+    return best
+
+
+def walk(node, parent=None):
+    yield node, parent
+    for child in node.get('Plans', []):
+        yield from walk(child, node)
+
+
+def table_columns():
+    return {
+        table: {column.name for column in connection.introspection.get_table_description(connection.cursor(), table)}
+        for table in TABLES
+    }
+
+
+class IndexAdvisor:
+    """
+    Explain the SQL of each scenario and propose indexes to add or drop.
+
+    Sequential scans that filter rows and sorts over table scans, of at
+    least ``min_rows`` rows, become candidate indexes. Each candidate is
+    created inside a rolled back transaction and the affected statements
+    re-explained to estimate its gain. Existing indexes no plan used, or that are a prefix of another
+    index, are proposed for dropping.
+    """
+
+    def __init__(self, scenarios, runs=3, min_rows=1000):
+        self.scenarios = scenarios
+        self.runs = runs
+        self.min_rows = min_rows
+        self.columns = table_columns()
+        with connection.cursor() as cursor:
+            cursor.execute(PARENTS_SQL)
+            self.parents = dict(cursor.fetchall())
+        self.results = []
+        self.proposals = {}
+        self.used_indexes = set()
+
+    def parent(self, name):
+        while name in self.parents:
+            name = self.parents[name]
+        return name
+
+    def run(self):
+        api_client = APIClient()
+        api_client.force_authenticate(user=self.staff_user())
+        for scenario in self.scenarios:
+            for sql in scenario.capture(api_client):
+                plan = explain(sql, self.runs)
+                self.results.append({
+                    'scenario': scenario.name,
+                    'sql': sql,
+                    'execution_ms': plan['Execution Time'],
+                    'flags': self.inspect(sql, plan['Plan']),
+                })
+        self.estimate_gains()
+        return self.report()
+
+    def staff_user(self):
+        from django.contrib.auth import get_user_model
+        user, _ = get_user_model().objects.get_or_create(
+            email='index-advisor@example.com',
+            defaults={'first_name': 'Index', 'last_name': 'Advisor', 'is_staff': True},
+        )
+        return user
+
+    def inspect(self, sql, plan):
+        """Record indexes the plan uses and propose indexes for its scans and sorts"""
+        flags = []
+        for node, parent in walk(plan):
+            if node.get('Index Name'):
+                self.used_indexes.add(self.parent(node['Index Name']))
+            node_type = node['Node Type']
+            if node_type == 'Seq Scan':
+                table = self.parent(node['Relation Name'])
+                removed = node.get('Rows Removed by Filter', 0)
+                if table not in self.columns or node['Actual Rows'] + removed < self.min_rows:
+                    continue
+                flags.append(f"Seq Scan on {table} ({node['Actual Rows']} rows kept, {removed} removed)")
+                condition = node.get('Filter', '')
+                if '~~' in condition:
+                    flags.append("LIKE '%term%' filter; only a trigram (pg_trgm) index can serve it")
+                equality, other = self.filter_columns(table, condition)
+                if condition and removed > node['Actual Rows'] and (equality or other):
+                    columns = [(column, False) for column in equality + other[:1]]
+                    self.propose(table, columns, 'filter', sql)
+            elif node_type in ('Sort', 'Incremental Sort'):
+                # A top-N sort under LIMIT reports its output rows; what matters is its input
+                rows = sum(child['Actual Rows'] for child in node.get('Plans', []))
+                if rows < self.min_rows:
+                    continue
+                flags.append(f"{node_type} on {', '.join(node['Sort Key'])} ({rows} rows)")
+                self.propose_sort(node, sql)
+        return flags
+
+    def filter_columns(self, table, condition):
+        """Split the table columns a filter uses into equality and other comparisons"""
+        if '~~' in condition:
+            # LIKE '%term%' can't use a B-tree index
+            return [], []
+        columns = self.columns[table]
+        equality = [column for column in dict.fromkeys(EQUALITY.findall(condition)) if column in columns]
+        other = [
+            column for column in dict.fromkeys(IDENTIFIER.findall(condition))
+            if column in columns and column not in equality
+        ]
+        return equality, other
+
+    def propose_sort(self, sort, sql):
+        scans = [node for node, _ in walk(sort) if node['Node Type'] == 'Seq Scan']
+        if len(scans) != 1:
+            return
+        table = self.parent(scans[0]['Relation Name'])
+        if table not in self.columns:
+            return
+        equality, _ = self.filter_columns(table, scans[0].get('Filter', ''))
+        columns = [(column, False) for column in equality]
+        for key in sort['Sort Key']:
+            name, _, direction = key.partition(' ')
+            name = name.split('.')[-1].strip('()')
+            if name not in self.columns[table]:
+                return
+            columns.append((name, direction.startswith('DESC')))
+        self.propose(table, columns, 'sort', sql)
+
+    def propose(self, table, columns, reason, sql):
+        proposal = Proposal(table, columns, reason)
+        if self.covered(proposal):
+            return
+        proposal = self.proposals.setdefault(proposal.key, proposal)
+        proposal.statements.add(sql)
+
+    def covered(self, proposal):
+        """Whether an existing index already leads with the proposed columns"""
+        wanted = [column for column, _ in proposal.columns]
+        if any(descending for _, descending in proposal.columns):
+            return False
+        return any(
+            table == proposal.table and columns[:len(wanted)] == wanted
+            for _, table, _, columns, _ in self.existing_indexes()
+        )
+
+    def existing_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute(EXISTING_INDEXES_SQL, [list(TABLES)])
+            return cursor.fetchall()
+
+    def estimate_gains(self):
+        """Time each proposal's statements with and without the index"""
+        for number, proposal in enumerate(self.proposals.values()):
+            statements = sorted(proposal.statements)
+            proposal.before_ms = sum(explain(sql, self.runs)['Execution Time'] for sql in statements)
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(proposal.create_sql(f'index_advisor_{number}'))
+                    cursor.execute(f'ANALYZE {proposal.table}')
+                proposal.after_ms = sum(explain(sql, self.runs)['Execution Time'] for sql in statements)
+                transaction.set_rollback(True)
+
+    def drop_candidates(self):
+        """Existing secondary indexes that no plan used or that another index makes redundant"""
+        indexes = self.existing_indexes()
+        candidates = []
+        for name, table, unique, columns, size in indexes:
+            if unique or table in self.parents:
+                continue
+            wider = [
+                other for other, other_table, _, other_columns, _ in indexes
+                if other != name and other_table == table and other_columns[:len(columns)] == columns
+                and len(other_columns) > len(columns)
+            ]
+            foreign_key = self.is_foreign_key(table, columns)
+            if wider:
+                reason = f'prefix of {wider[0]}'
+                if foreign_key:
+                    reason += '; set db_index=False on the foreign key'
+            elif name not in self.used_indexes and not foreign_key:
+                reason = 'not used by any scenario'
+            else:
+                continue
+            candidates.append({'index': name, 'table': table, 'columns': columns, 'bytes': size, 'reason': reason})
+        return candidates
+
+    def is_foreign_key(self, table, columns):
+        # Foreign key indexes serve cascades and joins the scenarios may not exercise
+        constraints = connection.introspection.get_constraints(connection.cursor(), table)
+        return any(
+            constraint['foreign_key'] and constraint['columns'] == columns[:1]
+            for constraint in constraints.values()
+        )
+
+    def report(self):
+        add = sorted(self.proposals.values(), key=lambda proposal: proposal.gain, reverse=True)
+        return {
+            'queries': self.results,
+            'add': [
+                {
+                    'table': proposal.table,
+                    'columns': [f'{column} DESC' if descending else column for column, descending in proposal.columns],
+                    'reason': proposal.reason,
+                    'statements': len(proposal.statements),
+                    'before_ms': proposal.before_ms,
+                    'after_ms': proposal.after_ms,
+                    'gain': proposal.gain,
+                    'model_index': proposal.model_index(),
+                }
+                for proposal in add
+            ],
+            'drop': self.drop_candidates(),
+            'ordering': ordering_warnings(),
+        }
+
+
+def ordering_warnings():
+    """Registered viewsets whose default ordering can tie, making pagination unstable"""
+    from api.urls import router
+
+    warnings = []
+    for prefix, viewset, _ in router.registry:
+        queryset = viewset.queryset
+        model = queryset.model
+        ordering = list(queryset.query.order_by or model._meta.ordering)
+        fields = {name.lstrip('-') for name in ordering}
+        unique = {'pk', model._meta.pk.name} | {
+            field.name for field in model._meta.concrete_fields if field.unique
+        }
+        if not fields & unique:
+            warnings.append(f"{prefix}: ordering {ordering} has no unique tie-breaker such as 'id'")
+    return warnings
@@ -0,0 +1,280 @@
+import re
+from datetime import date
+
+from django.db import connections, transaction
+
+from api.archive import view_definitions
+from api.models import Enrollment
+
+STRATEGIES = ('hash', 'range')
+INTERVALS = ('month', 'year')
+OLD_SUFFIX = '_unpartitioned'
+STAGING_SUFFIX = '_partitioned'
+
+# Range partitions cannot carry a unique (client_id, program_id) constraint, so a trigger enforces it:
+# the advisory lock serializes writers of the same pair and each check sees their committed rows
+UNIQUE_PAIR_FUNCTION = """
+CREATE OR REPLACE FUNCTION api_enrollment_unique_pair() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtextextended(NEW.client_id::text || ':' || NEW.program_id::text, 0));
+    IF EXISTS (
+        SELECT 1 FROM api_enrollment
+        WHERE client_id = NEW.client_id AND program_id = NEW.program_id AND id <> NEW.id
+    ) THEN
+        RAISE EXCEPTION 'duplicate enrollment of client % in program %', NEW.client_id, NEW.program_id
+            USING ERRCODE = 'unique_violation', CONSTRAINT = 'api_enrollment_client_id_program_id_uniq';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# Partition names encode their period: api_enrollment_2025 or api_enrollment_2025_04
+RANGE_NAME = re.compile(r'_(\d{4})(?:_(\d{2}))?$')
+
+
+def partition_key(strategy):
+    return 'program_id' if strategy == 'hash' else 'enrollment_date'
+
+
+def period_start(day, interval):
+    return date(day.year, day.month if interval == 'month' else 1, 1)
+
+
+def next_period(start, interval):
+    if interval == 'year':
+        return date(start.year + 1, 1, 1)
+    return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def add_periods(start, interval, count):
+    for _ in range(count):
+        start = next_period(start, interval)
+    return start
+
+
+def range_partition_name(table, start, interval):
+    if interval == 'year':
+        return f'{table}_{start.year}'
+    return f'{table}_{start.year}_{start.month:02d}'
+
+
+def partition_info(using='default'):
+    """Return the partition strategy of the enrollment table and its partitions"""
+    table = Enrollment._meta.db_table
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT p.partstrat FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid WHERE c.oid = to_regclass(%s)",
+            [table],
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return {'strategy': None, 'partitions': []}
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname",
+            [table],
+        )
+        partitions = [
+            {'name': name, 'bound': bound, 'estimated_rows': max(rows, 0)}
+            for name, bound, rows in cursor.fetchall()
+        ]
+    return {'strategy': {'h': 'hash', 'r': 'range'}.get(row[0], row[0]), 'partitions': partitions}
+
+
+def partition_statements(strategy, table, staging, partitions=8, interval='month', first=None, last=None):
+    """Return the SQL creating the staging table and its partitions"""
+    statements = [
+        f'CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+        f'PARTITION BY {strategy.upper()} ({partition_key(strategy)})'
+    ]
+    if strategy == 'hash':
+        statements += [
+            f'CREATE TABLE {table}_p{remainder} PARTITION OF {staging} '
+            f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})'
+            for remainder in range(partitions)
+        ]
+        return statements
+
+    start = period_start(first, interval)
+    while start <= last:
+        end = next_period(start, interval)
+        statements.append(
+            f"CREATE TABLE {range_partition_name(table, start, interval)} PARTITION OF {staging} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        start = end
+    statements.append(f'CREATE TABLE {table}_default PARTITION OF {staging} DEFAULT')
+    return statements
+
+
+def partition_enrollments(strategy, partitions=8, interval='month', ahead=12, drop_old=False,
+                          using='default', dry_run=False):
+    """
+    Rebuild the enrollment table partitioned by program hash or date range.
+
+    Rows are copied into the new table, which is swapped into place in one
+    transaction; writes wait while rows are copied and reads continue
+    against the old table until the swap commits. Indexes and constraints
+    get the names Django gives them, so later migrations keep working.
+
+    PostgreSQL requires unique constraints to include the partition key, so
+    the primary key becomes ``(id, <key>)``. ``(client, program)`` is a
+    unique constraint when partitioning by program and is enforced by a
+    trigger when partitioning by date. The old table keeps its rows but
+    loses its foreign keys, so deleting clients and programs is not blocked
+    by rows it still holds. Returns the SQL run, or that would run with
+    ``dry_run``.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f'Unknown partition strategy {strategy!r}')
+    if interval not in INTERVALS:
+        raise ValueError(f'Unknown partition interval {interval!r}')
+
+    connection = connections[using]
+    table = Enrollment._meta.db_table
+    staging, old = f'{table}{STAGING_SUFFIX}', f'{table}{OLD_SUFFIX}'
+    if partition_info(using)['strategy'] is not None:
+        raise ValueError(f'{table} is already partitioned')
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        executed = []
+
+        def run(sql, params=None):
+            executed.append(sql)
+            if not dry_run:
+                cursor.execute(sql, params)
+
+        run(f'LOCK TABLE {table} IN EXCLUSIVE MODE')
+        cursor.execute(f'SELECT MIN(enrollment_date), MAX(enrollment_date) FROM {table}')
+        first, last = cursor.fetchone()
+        today = date.today()
+        first = min(first or today, today)
+        last = add_periods(period_start(max(last or today, today), interval), interval, ahead)
+
+        for sql in partition_statements(strategy, table, staging, partitions, interval, first, last):
+            run(sql)
+        run(f'INSERT INTO {staging} SELECT * FROM {table}')
+
+        # Views over the table follow it when renamed, so rebuild them on the new table
+        views = view_definitions(cursor)
+        for name in views:
+            run(f'DROP VIEW {name}')
+
+        # Move the old table and its index names out of the way of the new ones
+        index_names = table_indexes(cursor, table)
+        foreign_key_names = table_foreign_keys(cursor, table)
+        run(f'ALTER TABLE {table} RENAME TO {old}')
+        for index_name in index_names:
+            run(f'ALTER INDEX {index_name} RENAME TO {(index_name + OLD_SUFFIX)[:63]}')
+        run(f'DROP TRIGGER IF EXISTS {table}_changes ON {old}')
+        if foreign_key_names:
+            # Deferred checks still pending from this transaction would block dropping the constraints
+            run(f'SET CONSTRAINTS {", ".join(foreign_key_names)} IMMEDIATE')
+        for name in foreign_key_names:
+            run(f'ALTER TABLE {old} DROP CONSTRAINT {name}')
+        run(f'ALTER TABLE {staging} RENAME TO {table}')
+
+        for sql in constraint_statements(connection, strategy):
+            run(sql)
+        if strategy == 'range':
+            run(UNIQUE_PAIR_FUNCTION)
+            run(
+                f'CREATE TRIGGER {table}_unique_pair BEFORE INSERT OR UPDATE OF client_id, program_id '
+                f'ON {table} FOR EACH ROW EXECUTE FUNCTION api_enrollment_unique_pair()'
+            )
+        if change_tracking_installed(cursor):
+            run(
+                f"CREATE TRIGGER {table}_changes AFTER INSERT OR UPDATE OR DELETE ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION api_record_change('enrollments')"
+            )
+        for name, definition in views.items():
+            run(f'CREATE VIEW {name} AS {definition}')
+        if drop_old:
+            run(f'DROP TABLE {old}')
+
+        if dry_run:
+            transaction.set_rollback(True, using=using)
+    return executed
+
+
+def constraint_statements(connection, strategy):
+    """Return the SQL recreating keys, foreign keys and indexes with Django's names"""
+    table = Enrollment._meta.db_table
+    key = partition_key(strategy)
+    statements = [f'ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {key})']
+
+    with connection.schema_editor(collect_sql=True) as editor:
+        for field in (Enrollment._meta.get_field('client'), Enrollment._meta.get_field('program')):
+            editor.execute(editor._create_fk_sql(Enrollment, field, '_fk_%(to_table)s_%(to_column)s'))
+            editor.execute(editor._create_index_sql(Enrollment, fields=[field]))
+        for index in Enrollment._meta.indexes:
+            editor.add_index(Enrollment, index)
+        if strategy == 'hash':
+            for fields in Enrollment._meta.unique_together:
+                editor.execute(editor._create_unique_sql(
+                    Enrollment, [Enrollment._meta.get_field(name) for name in fields]
+                ))
+    return statements + [sql.rstrip(';') for sql in editor.collected_sql]
+
+
+def extend_range_partitions(ahead=12, using='default'):
+    """
+    Create the missing range partitions up to ``ahead`` periods from today.
+
+    Rows already in the default partition for a new period are moved into it.
+    Returns the names of the partitions created.
+    """
+    table = Enrollment._meta.db_table
+    info = partition_info(using)
+    if info['strategy'] != 'range':
+        raise ValueError(f'{table} is not partitioned by date range')
+
+    periods = [RANGE_NAME.search(partition['name']) for partition in info['partitions']]
+    periods = [match for match in periods if match]
+    if not periods:
+        raise ValueError(f'{table} has no dated partitions to extend')
+    interval = 'month' if periods[0].group(2) else 'year'
+    existing = {partition['name'] for partition in info['partitions']}
+
+    created = []
+    start = period_start(date.today(), interval)
+    last = add_periods(start, interval, ahead)
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        while start <= last:
+            end = next_period(start, interval)
+            name = range_partition_name(table, start, interval)
+            if name not in existing:
+                cursor.execute(f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM {table}_default '
+                    f'WHERE enrollment_date >= %s AND enrollment_date < %s RETURNING *) '
+                    f'INSERT INTO {name} SELECT * FROM moved',
+                    [start, end],
+                )
+                cursor.execute(
+                    f"ALTER TABLE {table} ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+                created.append(name)
+            start = end
+    return created
+
+
+def table_indexes(cursor, table):
+    cursor.execute('SELECT indexname FROM pg_indexes WHERE tablename = %s', [table])
+    return [row[0] for row in cursor.fetchall()]
+
+
+def table_foreign_keys(cursor, table):
+    cursor.execute(
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f'", [table]
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def change_tracking_installed(cursor):
+    cursor.execute("SELECT to_regproc('api_record_change') IS NOT NULL")
+    return cursor.fetchone()[0]
@@ -0,0 +1,260 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2.extensions
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the pool's wait timeout"""
+
+
+class PooledConnection:
+    """Bookkeeping for a raw connection owned by the pool"""
+    __slots__ = ('connection', 'created_at', 'released_at')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.created_at = self.released_at = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of raw DB-API connections for one database alias.
+
+    Connections are opened on demand up to ``max_size`` and reused most
+    recently released first. Connections idle longer than ``idle_timeout``
+    are closed, down to ``min_size``. With ``pre_ping`` a connection is
+    checked with a trivial query before it is handed out. Callers that
+    find the pool exhausted wait up to ``wait_timeout`` seconds and then
+    get ``PoolTimeout``.
+    """
+
+    def __init__(self, min_size=0, max_size=10, idle_timeout=300, wait_timeout=5, pre_ping=True):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self.pre_ping = pre_ping
+        self.pid = os.getpid()
+        self.condition = threading.Condition()
+        self.idle = deque()
+        self.in_use = {}
+        self.size = 0
+        self.waiting = 0
+        self.counters = dict.fromkeys(
+            ('acquired', 'created', 'closed', 'timeouts', 'failed_pings', 'wait_seconds'), 0
+        )
+
+    def acquire(self, connect):
+        """Return an open connection, calling ``connect()`` when a new one is needed"""
+        deadline = time.monotonic() + self.wait_timeout
+        started = time.monotonic()
+        while True:
+            with self.condition:
+                pooled = self._take_idle()
+                if pooled is None and self.size >= self.max_size:
+                    self.waiting += 1
+                    try:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self.condition.wait(remaining):
+                            if not self.idle and self.size >= self.max_size:
+                                self.counters['timeouts'] += 1
+                                raise PoolTimeout(
+                                    f'No database connection available after {self.wait_timeout}s'
+                                )
+                    finally:
+                        self.waiting -= 1
+                    continue
+                if pooled is None:
+                    # Reserve the slot before connecting outside the lock
+                    self.size += 1
+
+            if pooled is None:
+                pooled = self._open(connect)
+            elif self.pre_ping and not self._ping(pooled.connection):
+                self._discard(pooled)
+                continue
+
+            with self.condition:
+                self.in_use[id(pooled.connection)] = pooled
+                self.counters['acquired'] += 1
+                self.counters['wait_seconds'] += time.monotonic() - started
+                missing = self.min_size - self.size
+            for _ in range(max(missing, 0)):
+                self.prefill(connect)
+            return pooled.connection
+
+    def release(self, connection):
+        """Return ``connection`` to the pool, closing it if it is no longer reusable"""
+        with self.condition:
+            pooled = self.in_use.pop(id(connection), None)
+        if pooled is None:
+            connection.close()
+            return
+
+        if not self._reset(connection):
+            self._discard(pooled)
+            return
+
+        pooled.released_at = time.monotonic()
+        with self.condition:
+            self.idle.append(pooled)
+            expired = self._expire_idle()
+            self.condition.notify()
+        for stale in expired:
+            self._close(stale)
+
+    def prefill(self, connect):
+        """Open one idle connection if the pool is below ``min_size``"""
+        with self.condition:
+            if self.size >= self.min_size:
+                return
+            self.size += 1
+        pooled = self._open(connect)
+        with self.condition:
+            self.idle.appendleft(pooled)
+            self.condition.notify()
+
+    def close_all(self):
+        """Close every idle connection; connections in use close when released"""
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+            self.size -= len(idle)
+        for pooled in idle:
+            self._close(pooled)
+
+    def stats(self):
+        """Return a snapshot of pool utilization and lifetime counters"""
+        with self.condition:
+            in_use = len(self.in_use)
+            return {
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': in_use,
+                'waiting': self.waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'utilization': in_use / self.max_size if self.max_size else 0.0,
+                **self.counters,
+            }
+
+    def _take_idle(self):
+        while self.idle:
+            pooled = self.idle.pop()
+            if not pooled.connection.closed:
+                return pooled
+            self.size -= 1
+            self.counters['closed'] += 1
+        return None
+
+    def _expire_idle(self):
+        """Remove connections idle past the timeout, keeping ``min_size``"""
+        expired = []
+        cutoff = time.monotonic() - self.idle_timeout
+        while self.idle and self.size > self.min_size and self.idle[0].released_at < cutoff:
+            expired.append(self.idle.popleft())
+            self.size -= 1
+        return expired
+
+    def _open(self, connect):
+        try:
+            pooled = PooledConnection(connect())
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.counters['created'] += 1
+        return pooled
+
+    def _ping(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            return True
+        except Exception:
+            with self.condition:
+                self.counters['failed_pings'] += 1
+            return False
+
+    @staticmethod
+    def _reset(connection):
+        """Roll back any open transaction; return whether the connection can be reused"""
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return True
+        if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        try:
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, pooled):
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+        self._close(pooled)
+
+    def _close(self, pooled):
+        with self.condition:
+            self.counters['closed'] += 1
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_key(alias, settings_dict):
+    return (alias, settings_dict['NAME'], settings_dict['USER'], settings_dict['HOST'], settings_dict['PORT'])
+
+
+def get_pool(alias, settings_dict):
+    """
+    Return this process's pool for the database ``settings_dict`` describes.
+
+    Pools are keyed by the connection target as well as the alias, so that
+    switching ``NAME`` (as the test runner does) never hands out connections
+    to the old database. Pools inherited through ``fork()`` are replaced
+    rather than reused, so workers never share sockets with their parent.
+    """
+    key = pool_key(alias, settings_dict)
+    options = settings_dict.get('POOL') or {}
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(
+                min_size=options.get('MIN_SIZE', 0),
+                max_size=options.get('MAX_SIZE', 10),
+                idle_timeout=options.get('IDLE_TIMEOUT', 300),
+                wait_timeout=options.get('WAIT_TIMEOUT', 5),
+                pre_ping=options.get('PRE_PING', True),
+            )
+        return pool
+
+
+def close_pool(alias, settings_dict):
+    """Discard the pool for ``settings_dict``, closing its idle connections"""
+    with _pools_lock:
+        pool = _pools.pop(pool_key(alias, settings_dict), None)
+    if pool is not None:
+        pool.close_all()
+
+
+def pool_stats():
+    """Return the stats of every pool opened by this process, labelled alias/database"""
+    with _pools_lock:
+        pools = {key: pool for key, pool in _pools.items() if pool.pid == os.getpid()}
+    return {f'{key[0]}/{key[1]}': pool.stats() for key, pool in pools.items()}
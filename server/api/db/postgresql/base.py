@@ -0,0 +1,52 @@
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from api.db import pool
+from api.db.pool import PoolTimeout
+from api.exceptions import ServiceUnavailable
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend that borrows connections from a per-process pool.
+
+    Closing a connection, which Django does at the end of every request
+    when ``CONN_MAX_AGE`` is 0, returns it to the pool instead. The pool is
+    shared by all threads of the process, so it serves WSGI thread workers
+    and the threads ASGI uses to run the ORM alike. Pool options are read
+    from the database's ``POOL`` setting.
+    """
+
+    @property
+    def connection_pool(self):
+        return pool.get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        try:
+            connection = self.connection_pool.acquire(
+                lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+            )
+        except PoolTimeout as exc:
+            raise ServiceUnavailable('The database is busy, please try again shortly.') from exc
+
+        # Reused connections skip the parent's connect, which records this
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        self.isolation_level = (
+            IsolationLevel.READ_COMMITTED if isolation_level is None else IsolationLevel(isolation_level)
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.connection_pool.release(self.connection)
+
+    def close_pool(self):
+        # Called before test databases are cloned or dropped
+        pool.close_pool(self.alias, self.settings_dict)
+
+    def ensure_timezone(self):
+        # The parent closes its pool here; pooled connections are reconfigured instead
+        if self.connection is None:
+            return False
+        return self._configure_timezone(self.connection)
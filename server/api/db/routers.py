@@ -0,0 +1,167 @@
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections, router
+
+logger = logging.getLogger(__name__)
+
+# The alias reads in the current context go to, or None when they stay on the primary
+_replica_alias = ContextVar('replica_alias', default=None)
+
+# Replica lag in seconds; zero when the replica has replayed all WAL it received
+POSTGRES_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+def replica_reads_allowed():
+    return _replica_alias.get() is not None
+
+
+def choose_replica():
+    """Ask the installed routers for a replica; 'default' when none is configured or healthy"""
+    for installed in router.routers:
+        choose = getattr(installed, 'choose_replica', None)
+        alias = choose() if choose else None
+        if alias is not None:
+            return alias
+    return 'default'
+
+
+def enable_replica_reads():
+    """
+    Send every read in the current context to one replica, chosen now, so
+    a request's count, page and prefetches see the same snapshot.
+    Returns a token for ``disable_replica_reads``.
+    """
+    return _replica_alias.set(choose_replica())
+
+
+def disable_replica_reads(token):
+    _replica_alias.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    """Send reads made inside the block to a replica"""
+    token = enable_replica_reads()
+    try:
+        yield
+    finally:
+        disable_replica_reads(token)
+
+
+def recent_write_key(user):
+    return f'replica:recent-write:{user.pk}'
+
+
+def record_write(user):
+    """Keep ``user`` on the primary for the read-your-writes window"""
+    if user is not None and user.is_authenticated:
+        cache.set(recent_write_key(user), True, settings.REPLICA_READ_YOUR_WRITES_SECONDS)
+
+
+def wrote_recently(user):
+    return user is not None and user.is_authenticated and cache.get(recent_write_key(user), False)
+
+
+class ReplicaLagMonitor:
+    """
+    Cached per-process view of how far each replica lags the primary.
+
+    Lag is measured at most once per ``check_interval`` per replica, by one
+    thread at a time; other threads use the last measurement meanwhile. A
+    replica that cannot be reached counts as unhealthy until its next check.
+    """
+
+    def __init__(self, max_lag, check_interval):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.lags = {}
+        self.checked_at = {}
+
+    def is_healthy(self, alias):
+        lag = self.lag(alias)
+        return lag is not None and lag <= self.max_lag
+
+    def lag(self, alias):
+        """Return the latest lag for ``alias`` in seconds, or None when it is unreachable"""
+        now = time.monotonic()
+        with self.lock:
+            due = now - self.checked_at.get(alias, float('-inf')) >= self.check_interval
+            if due:
+                self.checked_at[alias] = now
+        if due:
+            lag = self.measure(alias)
+            with self.lock:
+                self.lags[alias] = lag
+        with self.lock:
+            return self.lags.get(alias)
+
+    def measure(self, alias):
+        connection = connections[alias]
+        if connection.vendor != 'postgresql':
+            return 0.0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(POSTGRES_LAG_SQL)
+                return float(cursor.fetchone()[0])
+        except DatabaseError:
+            logger.warning('Replica %s is unreachable; reading from the primary', alias, exc_info=True)
+            connection.close()
+            return None
+
+
+class ReplicaRouter:
+    """
+    Route reads made under ``replica_reads()`` to a healthy replica.
+
+    Replicas are the aliases listed in ``settings.DATABASE_REPLICAS``; each
+    ``replica_reads()`` block takes the next healthy one round-robin and
+    keeps it. Everything else, including all writes, goes to the primary,
+    as do reads when every replica lags more than
+    ``settings.REPLICA_MAX_LAG_SECONDS``. Migrations never run on replicas.
+    """
+
+    def __init__(self, replicas=None, monitor=None):
+        self.replicas = list(settings.DATABASE_REPLICAS if replicas is None else replicas)
+        self.monitor = monitor or ReplicaLagMonitor(
+            settings.REPLICA_MAX_LAG_SECONDS, settings.REPLICA_LAG_CHECK_INTERVAL
+        )
+        self.counter = itertools.count()
+
+    def choose_replica(self):
+        if not self.replicas:
+            return None
+        healthy = [alias for alias in self.replicas if self.monitor.is_healthy(alias)]
+        if not healthy:
+            return 'default'
+        return healthy[next(self.counter) % len(healthy)]
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas:
+            return None
+        return _replica_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in self.replicas:
+            return False
+        return None
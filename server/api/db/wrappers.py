@@ -0,0 +1,8 @@
+def install_execute_wrapper(connection, wrapper):
+    """
+    Put ``wrapper`` first in ``connection.execute_wrappers``, once per
+    connection, so wrappers pushed and popped with
+    ``connection.execute_wrapper()`` leave it in place.
+    """
+    if wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, wrapper)
@@ -0,0 +1,24 @@
+"""
+``swagger_auto_schema`` and ``openapi`` for annotating views.
+
+They are drf_yasg's when ``API_DOCS_ENABLED`` is set. Otherwise they are
+no-ops, so nodes that do not serve the schema never import drf_yasg.
+"""
+from django.conf import settings
+
+if settings.API_DOCS_ENABLED:
+    from drf_yasg import openapi
+    from drf_yasg.utils import swagger_auto_schema
+else:
+    class _NoOpenAPI:
+        """Stands in for ``drf_yasg.openapi``; every attribute is a function returning None"""
+
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: None
+
+    openapi = _NoOpenAPI()
+
+    def swagger_auto_schema(**kwargs):
+        return lambda view_method: view_method
+
+__all__ = ['openapi', 'swagger_auto_schema']
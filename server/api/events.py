@@ -0,0 +1,436 @@
+"""
+Server-sent events for enrollment and program capacity changes.
+
+Model signals publish events on commit to the configured channel. The
+channel delivers them to the process-wide ``broadcaster``, which fans
+them out to every open event stream served by ``EventStreamApp``.
+``LocalChannel`` keeps events inside one process; ``PostgresChannel``
+shares them between processes with LISTEN/NOTIFY.
+"""
+import asyncio
+import io
+import json
+import logging
+import select
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from itertools import count
+from urllib.parse import parse_qs
+
+import psycopg2
+from asgiref.sync import sync_to_async
+from corsheaders.middleware import CorsMiddleware
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections, connection, transaction
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+STREAM_TOKEN_SALT = 'api.events.stream'
+
+
+def event_key(event):
+    """Return the key under which pending copies of ``event`` are conflated"""
+    if event['type'] == 'capacity':
+        return ('capacity', event['program_id'])
+    return None
+
+
+class Subscription:
+    """
+    Bounded buffer of events waiting to be sent on one connection.
+
+    Capacity events are state snapshots, so a newer one replaces any that
+    is still pending for the same program. When the buffer is full the
+    oldest event is dropped and counted; the stream then tells the client
+    it lagged so it can refetch.
+    """
+    __slots__ = ('program_ids', 'max_pending', 'pending', 'dropped', 'closed', 'wakeup', 'sequence')
+
+    def __init__(self, program_ids, max_pending):
+        self.program_ids = program_ids
+        self.max_pending = max_pending
+        self.pending = OrderedDict()
+        self.dropped = 0
+        self.closed = False
+        self.wakeup = asyncio.Event()
+        self.sequence = count()
+
+    def wants(self, event):
+        return self.program_ids is None or event['program_id'] in self.program_ids
+
+    def offer(self, event):
+        """Queue ``event``; must be called on the subscription's event loop"""
+        key = event_key(event) or next(self.sequence)
+        self.pending.pop(key, None)
+        self.pending[key] = event
+        if len(self.pending) > self.max_pending:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        self.wakeup.set()
+
+    def close(self):
+        self.closed = True
+        self.wakeup.set()
+
+    async def wait(self, timeout):
+        """Wait until events are pending, the connection closes or ``timeout`` passes"""
+        if not self.pending and not self.closed:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self.wakeup.clear()
+
+    def drain(self):
+        """Return the pending events and the number dropped since the last drain"""
+        events = list(self.pending.values())
+        dropped = self.dropped
+        self.pending.clear()
+        self.dropped = 0
+        return events, dropped
+
+
+class Broadcaster:
+    """Fan events out to the subscriptions of every event loop in the process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+
+    def subscribe(self, program_ids=None, max_pending=100):
+        """Register a subscription on the running event loop"""
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(program_ids, max_pending)
+        with self.lock:
+            self.subscriptions.setdefault(loop, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for loop, subscriptions in list(self.subscriptions.items()):
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[loop]
+
+    def deliver(self, event):
+        """Hand ``event`` to every loop with subscribers; safe to call from any thread"""
+        with self.lock:
+            loops = list(self.subscriptions)
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._deliver_on_loop, loop, event)
+            except RuntimeError:
+                # The loop has been closed without unsubscribing
+                with self.lock:
+                    self.subscriptions.pop(loop, None)
+
+    def _deliver_on_loop(self, loop, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(loop, ()))
+        for subscription in subscriptions:
+            if subscription.wants(event):
+                subscription.offer(event)
+
+    @property
+    def connection_count(self):
+        with self.lock:
+            return sum(len(subscriptions) for subscriptions in self.subscriptions.values())
+
+
+class LocalChannel:
+    """Deliver published events to subscribers in this process only"""
+
+    def __init__(self, broadcaster):
+        self.broadcaster = broadcaster
+
+    @property
+    def has_listeners(self):
+        return self.broadcaster.connection_count > 0
+
+    def start(self):
+        pass
+
+    def publish(self, event):
+        self.broadcaster.deliver(event)
+
+
+class PostgresChannel:
+    """
+    Share events between processes with PostgreSQL LISTEN/NOTIFY.
+
+    Events are published with ``pg_notify`` on the default connection. One
+    daemon thread per process holds a dedicated connection listening on the
+    channel and passes notifications to the broadcaster.
+    """
+    channel_name = 'api_events'
+    reconnect_delay = 5
+    # Other processes may be listening
+    has_listeners = True
+
+    def __init__(self, broadcaster):
+        self.broadcaster = broadcaster
+        self.lock = threading.Lock()
+        self.listener = None
+
+    def start(self):
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, name='event-listener', daemon=True)
+                self.listener.start()
+
+    def publish(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel_name, json.dumps(event)])
+
+    def listen(self):
+        while True:
+            try:
+                self.listen_once()
+            except psycopg2.Error:
+                logger.exception('Event listener connection failed; reconnecting')
+                time.sleep(self.reconnect_delay)
+
+    def listen_once(self):
+        params = connection.get_connection_params()
+        conn = psycopg2.connect(**params)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {self.channel_name}')
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notification = conn.notifies.pop(0)
+                    self.broadcaster.deliver(json.loads(notification.payload))
+        finally:
+            conn.close()
+
+
+broadcaster = Broadcaster()
+_channel = None
+_channel_lock = threading.Lock()
+
+
+def get_channel():
+    """Return the configured channel, created on first use"""
+    global _channel
+    with _channel_lock:
+        if _channel is None:
+            _channel = import_string(settings.EVENTS_CHANNEL)(broadcaster)
+        return _channel
+
+
+def has_listeners():
+    """Whether a published event could reach a subscriber; channels that cannot tell are assumed to"""
+    return getattr(get_channel(), 'has_listeners', True)
+
+
+def publish(event_type, program_id, data):
+    """Publish an event once the current transaction commits"""
+    if not has_listeners():
+        return
+    event = {'type': event_type, 'program_id': str(program_id), 'data': data}
+    transaction.on_commit(lambda: get_channel().publish(event))
+
+
+def publish_capacity(program_id):
+    """Publish a program's current capacity and enrollment count on commit"""
+    if not has_listeners():
+        return
+
+    def send():
+        from .models import HealthProgram
+
+        program = (
+            HealthProgram.objects.with_enrolled_counts()
+            .filter(pk=program_id)
+            .values('capacity', 'enrolled_clients_total')
+            .first()
+        )
+        if program is None:
+            return
+        capacity, enrolled = program['capacity'], program['enrolled_clients_total']
+        get_channel().publish({
+            'type': 'capacity',
+            'program_id': str(program_id),
+            'data': {
+                'capacity': capacity,
+                'enrolled_clients': enrolled,
+                'seats_remaining': None if capacity is None else max(capacity - enrolled, 0),
+            },
+        })
+    transaction.on_commit(send)
+
+
+def enrollment_saved(sender, instance, created, **kwargs):
+    publish('enrollment', instance.program_id, {
+        'id': str(instance.id),
+        'client_id': str(instance.client_id),
+        'status': instance.status,
+        'created': created,
+    })
+    if created:
+        publish_capacity(instance.program_id)
+
+
+def enrollment_deleted(sender, instance, **kwargs):
+    publish_capacity(instance.program_id)
+
+
+def program_saved(sender, instance, created, **kwargs):
+    publish_capacity(instance.pk)
+
+
+def stream_token(user):
+    """A signed token authenticating ``user``'s event streams for ``EVENTS_TOKEN_SECONDS``"""
+    return signing.TimestampSigner(salt=STREAM_TOKEN_SALT).sign(str(user.pk))
+
+
+def stream_token_user(token):
+    """The active user a stream token was issued to, or None if it is invalid or expired"""
+    try:
+        user_id = signing.TimestampSigner(salt=STREAM_TOKEN_SALT).unsign(
+            token, max_age=settings.EVENTS_TOKEN_SECONDS
+        )
+    except signing.BadSignature:
+        return None
+    return get_user_model().objects.filter(pk=user_id, is_active=True).first()
+
+
+class EventStreamApp:
+    """
+    ASGI application streaming program events as server-sent events.
+
+    Pass ``?program=<id>,<id>`` to follow specific programs. Requests are
+    authenticated with the API's authentication classes or, since browser
+    ``EventSource`` cannot send headers, with ``?token=`` from
+    ``POST /api/v1/events/token/``. The app runs outside Django's
+    middleware, so it adds the CORS headers ``corsheaders`` would, from the
+    same ``CORS_*`` settings. An idle connection holds only its coroutine
+    and a small subscription; heartbeat comments keep proxies from
+    closing it.
+    """
+
+    async def __call__(self, scope, receive, send):
+        cors_headers = await sync_to_async(self.cors_headers)(scope)
+        if scope['method'] == 'OPTIONS':
+            return await self.preflight(send, cors_headers)
+        if scope['method'] != 'GET':
+            return await self.reject(send, 405, 'Method not allowed.', cors_headers)
+
+        try:
+            program_ids = self.parse_programs(scope)
+        except ValueError:
+            return await self.reject(send, 400, 'Invalid program id.', cors_headers)
+
+        if not await sync_to_async(self.authenticate)(scope):
+            return await self.reject(send, 401, 'Authentication credentials were not provided.', cors_headers)
+
+        get_channel().start()
+        subscription = broadcaster.subscribe(program_ids, settings.EVENTS_MAX_PENDING)
+        watcher = asyncio.ensure_future(self.watch_disconnect(receive, subscription))
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                    *cors_headers,
+                ],
+            })
+            await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+
+            while True:
+                await subscription.wait(settings.EVENTS_HEARTBEAT_SECONDS)
+                if subscription.closed:
+                    break
+                events, dropped = subscription.drain()
+                body = self.encode(events, dropped) or b': keepalive\n\n'
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        finally:
+            watcher.cancel()
+            broadcaster.unsubscribe(subscription)
+
+    @staticmethod
+    async def watch_disconnect(receive, subscription):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        subscription.close()
+
+    @staticmethod
+    def parse_programs(scope):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        values = ','.join(query.get('program', []))
+        if not values:
+            return None
+        return {str(uuid.UUID(value.strip())) for value in values.split(',') if value.strip()}
+
+    @staticmethod
+    def authenticate(scope):
+        """Return whether the request carries valid API credentials or stream token"""
+        try:
+            token = parse_qs(scope.get('query_string', b'').decode()).get('token')
+            if token:
+                return stream_token_user(token[0]) is not None
+            request = Request(
+                ASGIRequest(scope, io.BytesIO()),
+                authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+            )
+            return bool(request.user and request.user.is_authenticated)
+        except APIException:
+            return False
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def cors_headers(scope):
+        """The headers corsheaders' middleware would add to a response to this request"""
+        response = HttpResponse()
+        CorsMiddleware(lambda request: response).add_response_headers(ASGIRequest(scope, io.BytesIO()), response)
+        return [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in response.items()
+            if name.lower().startswith('access-control-') or name.lower() == 'vary'
+        ]
+
+    @staticmethod
+    async def preflight(send, cors_headers):
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-length', b'0'), *cors_headers],
+        })
+        await send({'type': 'http.response.body', 'body': b''})
+
+    @staticmethod
+    def encode(events, dropped):
+        lines = []
+        if dropped:
+            lines.append(f'event: lagged\ndata: {json.dumps({"dropped": dropped})}\n\n')
+        for event in events:
+            lines.append(f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n')
+        return ''.join(lines).encode()
+
+    @staticmethod
+    async def reject(send, status_code, detail, cors_headers=()):
+        body = json.dumps({'detail': detail}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': status_code,
+            'headers': [(b'content-type', b'application/json'), *cors_headers],
+        })
+        await send({'type': 'http.response.body', 'body': body})
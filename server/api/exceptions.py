@@ -1,9 +1,10 @@
 from rest_framework.views import exception_handler
-from rest_framework.exceptions import APIException
+from rest_framework.exceptions import APIException, Throttled
 from rest_framework import status
 from rest_framework.response import Response
 from django.db import IntegrityError, transaction
 from django.core.exceptions import ValidationError
+from . import metrics
 
 class ServiceUnavailable(APIException):
     status_code = status.HTTP_503_SERVICE_UNAVAILABLE
@@ -20,21 +21,36 @@ class ResourceAlreadyExists(APIException):
     default_detail = 'Resource already exists.'
     default_code = 'resource_already_exists'
 
+class ResyncRequired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Sync token is older than the change log retention; sync again without since.'
+    default_code = 'resync_required'
+
 def custom_exception_handler(exc, context):
     """Custom exception handler for standardizing API responses"""
     
+    if isinstance(exc, Throttled):
+        metrics.throttled.inc(metrics.route_of(context['request']))
+
     # Call REST framework's default exception handler first
     response = exception_handler(exc, context)
     
     # If response is already handled by DRF, customize it
     if response is not None:
+        # Errors raised outside a serializer field (e.g. from save()) arrive as a list
+        if isinstance(response.data, list):
+            message = ' '.join(str(error) for error in response.data)
+        elif isinstance(response.data, dict):
+            message = response.data.get('detail', str(response.data))
+        else:
+            message = str(exc)
+
         # Create a custom response format
         custom_response = {
             'success': False,
             'error': {
                 'code': response.status_code,
-                'message': response.data.get('detail', str(response.data))
-                           if hasattr(response, 'data') else str(exc),
+                'message': message,
             }
         }
         
@@ -0,0 +1,105 @@
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+
+def parse_expand(value, allowed, max_depth):
+    """
+    Parse an ``expand`` parameter such as ``programs.program,clients`` into
+    a nested dict of relation names.
+
+    Only paths listed in ``allowed`` (or their prefixes) are accepted and no
+    path may be deeper than ``max_depth``.
+    """
+    prefixes = {
+        '.'.join(path.split('.')[:depth])
+        for path in allowed
+        for depth in range(1, path.count('.') + 2)
+    }
+
+    tree = {}
+    errors = []
+    for path in filter(None, (item.strip() for item in value.split(','))):
+        parts = path.split('.')
+        if len(parts) > max_depth:
+            errors.append(f"'{path}' is nested deeper than {max_depth} levels.")
+        elif path not in prefixes:
+            errors.append(f"'{path}' cannot be expanded.")
+        else:
+            node = tree
+            for part in parts:
+                node = node.setdefault(part, {})
+
+    if errors:
+        raise ValidationError({'expand': errors})
+    return tree
+
+
+def expanded_paths(tree, prefix=''):
+    """Yield every dotted path in a tree returned by ``parse_expand``"""
+    for name, subtree in tree.items():
+        path = f'{prefix}{name}'
+        yield path
+        yield from expanded_paths(subtree, f'{path}.')
+
+
+class ExpandableFieldsMixin:
+    """
+    Serializer mixin adding related representations on request.
+
+    ``expandable_fields`` maps a field name to the serializer class and
+    options used when that name is in the ``expand`` tree. Subtrees under
+    other names are handed down to the matching nested serializer field.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, expand=None, **kwargs):
+        self.expand = expand or {}
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name, subtree in self.expand.items():
+            if name in self.expandable_fields:
+                serializer_class, options = self.expandable_fields[name]
+                fields[name] = serializer_class(expand=subtree, **options)
+            elif name in fields:
+                nested = fields[name]
+                nested = getattr(nested, 'child', nested)
+                if isinstance(nested, ExpandableFieldsMixin):
+                    nested.expand = subtree
+        return fields
+
+
+class ExpandableViewMixin:
+    """
+    ViewSet mixin applying ``?expand=`` to read requests.
+
+    ``expandable`` maps each dotted path a client may expand to a callable
+    returning the prefetch lookups that path needs, so every expanded
+    relation costs one query per request rather than one per row.
+    """
+    expandable = {}
+
+    def get_expand(self):
+        """Return the parsed ``expand`` tree, empty for writes"""
+        if not hasattr(self, '_expand'):
+            # There is no request when the schema is generated offline (see api.schema)
+            value = self.request.query_params.get('expand', '') if self.request is not None else ''
+            if not value or self.request.method not in ('GET', 'HEAD'):
+                self._expand = {}
+            else:
+                self._expand = parse_expand(value, self.expandable, settings.EXPAND_MAX_DEPTH)
+        return self._expand
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for path in expanded_paths(self.get_expand()):
+            if path in self.expandable:
+                queryset = queryset.prefetch_related(*self.expandable[path]())
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), ExpandableFieldsMixin):
+            kwargs.setdefault('expand', self.get_expand())
+        return super().get_serializer(*args, **kwargs)
+
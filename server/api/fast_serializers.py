@@ -0,0 +1,131 @@
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+
+from .models import EnrollmentRecord, enrolled_clients_subquery
+from .serializers import (
+    ClientSerializer, HealthProgramSerializer, EnrollmentSerializer, EnrollmentSyncSerializer,
+    ClientWithArchiveSerializer, HealthProgramRecordSerializer,
+)
+
+
+class FastSerializer:
+    """
+    Read-only serializer that builds plain dicts from values() rows.
+
+    The readable fields of a ModelSerializer are compiled once into the
+    columns to select and a converter per field, so list endpoints skip
+    model instantiation and the per-row field tree while producing the
+    same output as the serializer they were compiled from.
+    """
+
+    def __init__(self, serializer_class, annotations=None):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.annotations = annotations or {}
+        self.columns = []
+        self.fields = []
+        self.nested = []
+        self._compile()
+
+    def _compile(self):
+        """Resolve each readable field to a column or a nested relation"""
+        serializer = self.serializer_class()
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+
+            if isinstance(field, serializers.ListSerializer):
+                self._compile_nested(name, field)
+                continue
+
+            if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)):
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{name} cannot be compiled to a values() column"
+                )
+
+            column = field.source if field.source in self.annotations else '__'.join(field.source_attrs)
+            self._add_column(column)
+            self.fields.append((name, column, self._converter(field), None))
+
+        self._add_column('pk')
+
+    def _compile_nested(self, name, field):
+        """Compile a reverse foreign key rendered with ``many=True``"""
+        relation = self.model._meta.get_field(field.source)
+        if not relation.one_to_many:
+            raise ImproperlyConfigured(
+                f"{self.serializer_class.__name__}.{name} must be a reverse foreign key"
+            )
+
+        child = FastSerializer(field.child.__class__)
+        link = relation.field.attname
+        child._add_column(link)
+        self.nested.append((name, relation.related_model, link, child))
+        self.fields.append((name, None, None, len(self.nested) - 1))
+
+    def _add_column(self, column):
+        if column not in self.columns:
+            self.columns.append(column)
+
+    @staticmethod
+    def _converter(field):
+        """Return the cheapest callable matching ``field.to_representation``"""
+        if type(field) in (serializers.CharField, serializers.EmailField):
+            return str
+        if type(field) is serializers.UUIDField and field.uuid_format == 'hex_verbose':
+            return str
+        if type(field) is serializers.IntegerField:
+            return int
+        return field.to_representation
+
+    def get_queryset(self, queryset):
+        """Turn a model queryset into the values() query this serializer reads"""
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        return queryset.values(*self.columns)
+
+    def serialize(self, rows):
+        """Build the representation of each row, fetching nested rows in one query per relation"""
+        rows = list(rows)
+        nested_rows = [self._fetch_nested(rows, *nested) for nested in self.nested]
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert, nested_index in self.fields:
+                if nested_index is not None:
+                    item[name] = nested_rows[nested_index].get(row['pk'], [])
+                    continue
+                value = row[column]
+                item[name] = None if value is None else convert(value)
+            data.append(item)
+        return data
+
+    def _fetch_nested(self, rows, name, related_model, link, child):
+        """Return the child representations grouped by parent primary key"""
+        if not rows:
+            return {}
+
+        queryset = related_model._default_manager.filter(
+            **{f'{link}__in': [row['pk'] for row in rows]}
+        )
+        child_rows = list(child.get_queryset(queryset))
+        grouped = {}
+        for child_row, item in zip(child_rows, child.serialize(child_rows)):
+            grouped.setdefault(child_row[link], []).append(item)
+        return grouped
+
+
+client_fast_serializer = FastSerializer(ClientSerializer)
+program_fast_serializer = FastSerializer(
+    HealthProgramSerializer,
+    annotations={'enrolled_clients_count': enrolled_clients_subquery()},
+)
+enrollment_fast_serializer = FastSerializer(EnrollmentSerializer)
+enrollment_sync_fast_serializer = FastSerializer(EnrollmentSyncSerializer)
+client_with_archive_fast_serializer = FastSerializer(ClientWithArchiveSerializer)
+program_record_fast_serializer = FastSerializer(
+    HealthProgramRecordSerializer,
+    annotations={'enrolled_clients_count': enrolled_clients_subquery(EnrollmentRecord)},
+)
@@ -1,5 +1,6 @@
 import django_filters
-from .models import Client, HealthProgram
+from django.db.models import Q
+from .models import Client, HealthProgram, HealthProgramRecord
 
 class ClientFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(method='filter_by_name')
@@ -9,18 +10,18 @@ class ClientFilter(django_filters.FilterSet):
     
     def filter_by_name(self, queryset, name, value):
         return queryset.filter(
-            django_filters.Q(first_name__icontains=value) | 
-            django_filters.Q(last_name__icontains=value)
+            Q(first_name__icontains=value) | 
+            Q(last_name__icontains=value)
         )
     
     def filter_by_min_age(self, queryset, name, value):
         from datetime import date, timedelta
-        cutoff_date = date.today() - timedelta(days=365 * value)
+        cutoff_date = date.today() - timedelta(days=int(365 * value))
         return queryset.filter(date_of_birth__lte=cutoff_date)
     
     def filter_by_max_age(self, queryset, name, value):
         from datetime import date, timedelta
-        cutoff_date = date.today() - timedelta(days=365 * value)
+        cutoff_date = date.today() - timedelta(days=int(365 * value))
         return queryset.filter(date_of_birth__gte=cutoff_date)
     
     class Meta:
@@ -34,4 +35,12 @@ class ProgramFilter(django_filters.FilterSet):
     
     class Meta:
         model = HealthProgram
-        fields = ['status', 'start_date_after', 'start_date_before']
\ No newline at end of file
+        fields = ['status', 'start_date_after', 'start_date_before']
+
+
+class ProgramRecordFilter(ProgramFilter):
+    """ProgramFilter for live and archived programs (include_archived)"""
+
+    class Meta(ProgramFilter.Meta):
+        model = HealthProgramRecord
+        fields = ProgramFilter.Meta.fields + ['archived']
@@ -0,0 +1,37 @@
+"""
+Liveness and readiness probes, as plain Django views: they skip REST
+framework's authentication, throttling and content negotiation, so a
+probe costs as little as a request can.
+
+``/healthz`` answers whenever the process can serve a request at all.
+``/readyz`` also runs ``SELECT 1`` on the primary database, which reads no
+table; replicas are left out because reads fall back to the primary when
+they lag or fail.
+"""
+import logging
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+
+def probe_response(data, status=200):
+    response = JsonResponse(data, status=status)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def healthz(request):
+    return probe_response({'status': 'ok'})
+
+
+def readyz(request):
+    try:
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Exception:
+        # The probe is unauthenticated, so the error stays in the log
+        logger.warning("Readiness check failed", exc_info=True)
+        return probe_response({'status': 'unavailable'}, status=503)
+    return probe_response({'status': 'ok', 'database': 'ok'})
@@ -0,0 +1,272 @@
+"""
+Background jobs with PostgreSQL as the queue.
+
+``enqueue`` inserts a ``Job`` row; ``manage.py run_workers`` starts a pool
+of worker processes that claim rows with ``SELECT ... FOR UPDATE SKIP
+LOCKED``, so workers on any number of hosts never take the same job and
+never wait on each other's locks. The claim commits straight away and
+the job runs outside any transaction, marked running with a heartbeat;
+a job whose heartbeat stops (the worker died) is queued again after
+``JOB_STALE_SECONDS``.
+
+Tasks are plain functions registered with ``@task`` in the modules
+listed in ``JOB_TASK_MODULES``. Each is called with a ``JobRun`` and the
+job's ``args``; ``run.progress()`` records progress and raises
+``JobCancelled`` once the job has been cancelled. A task that raises is
+retried with exponential backoff until ``max_attempts``.
+
+Periodic jobs are configured in ``JOB_SCHEDULES``; the pool's supervisor
+enqueues them when due.
+"""
+import logging
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import threading
+import traceback
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, JobSchedule
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+class JobCancelled(Exception):
+    """Raised inside a task when its job has been cancelled"""
+
+
+def task(name=None, max_attempts=3):
+    """Register a function as a task, under ``name`` or its dotted path"""
+    def register(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts
+        _tasks[func.task_name] = func
+        return func
+    return register
+
+
+def registered_tasks():
+    for module in settings.JOB_TASK_MODULES:
+        import_module(module)
+    return _tasks
+
+
+def get_task(name):
+    try:
+        return registered_tasks()[name]
+    except KeyError:
+        raise LookupError(f'Unknown task {name!r}') from None
+
+
+def enqueue(task, args=None, priority=0, run_at=None, max_attempts=None):
+    """Queue a job for ``task`` (a registered function or its name) and return it"""
+    func = get_task(getattr(task, 'task_name', task))
+    return Job.objects.create(
+        task=func.task_name,
+        args=args or {},
+        priority=priority,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or func.max_attempts,
+    )
+
+
+def claim(worker):
+    """Take the next due job for ``worker`` and mark it running, or return None"""
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_at__lte=now)
+            .order_by('-priority', 'run_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.worker = worker
+        job.attempts += 1
+        job.started_at = job.heartbeat_at = now
+        job.save(update_fields=['status', 'worker', 'attempts', 'started_at', 'heartbeat_at'])
+    return job
+
+
+def cancel(job):
+    """Cancel a queued or running job; a running task stops at its next progress report"""
+    return bool(
+        Job.objects.filter(pk=job.pk, status__in=[Job.QUEUED, Job.RUNNING])
+        .update(status=Job.CANCELLED, finished_at=timezone.now())
+    )
+
+
+def retry_delay(attempts):
+    """Seconds before retry number ``attempts``: exponential, capped, with jitter"""
+    delay = min(settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class JobRun:
+    """Handle passed to a running task for reporting progress"""
+
+    def __init__(self, job):
+        self.job = job
+
+    def progress(self, fraction, message=''):
+        """Record progress (0 to 1); raises JobCancelled if the job was cancelled"""
+        updated = Job.objects.filter(pk=self.job.pk, status=Job.RUNNING, worker=self.job.worker).update(
+            progress=max(0.0, min(float(fraction), 1.0)),
+            progress_message=message[:255],
+            heartbeat_at=timezone.now(),
+        )
+        if not updated:
+            raise JobCancelled(f'Job {self.job.pk} is no longer running here')
+
+
+def _heartbeat(job, stop):
+    interval = settings.JOB_STALE_SECONDS / 3
+    while not stop.wait(interval):
+        Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker).update(heartbeat_at=timezone.now())
+    connections.close_all()
+
+
+def execute(job):
+    """Run a claimed job and record its result, scheduling a retry if it failed"""
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job, stop), daemon=True)
+    heartbeat.start()
+    mine = Job.objects.filter(pk=job.pk, status=Job.RUNNING, worker=job.worker)
+    try:
+        result = get_task(job.task)(JobRun(job), **job.args)
+    except JobCancelled:
+        logger.info("Job %s cancelled", job.pk)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts < job.max_attempts:
+            delay = retry_delay(job.attempts)
+            logger.warning("Job %s failed (attempt %s), retrying in %.0fs", job.pk, job.attempts, delay)
+            mine.update(status=Job.QUEUED, worker='', error=error, run_at=now + timedelta(seconds=delay))
+        else:
+            logger.error("Job %s failed after %s attempts", job.pk, job.attempts)
+            mine.update(status=Job.FAILED, error=error, finished_at=now)
+    else:
+        mine.update(status=Job.SUCCEEDED, result=result, progress=1.0, error='', finished_at=timezone.now())
+    finally:
+        stop.set()
+        heartbeat.join()
+
+
+def requeue_stale():
+    """Queue again, or fail, running jobs whose worker stopped sending heartbeats"""
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=now - timedelta(seconds=settings.JOB_STALE_SECONDS))
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, error='Worker stopped responding', finished_at=now
+    )
+    return stale.update(status=Job.QUEUED, worker='', run_at=now) + failed
+
+
+def schedule_due(now=None):
+    """Enqueue periodic jobs that are due; returns the jobs queued"""
+    now = now or timezone.now()
+    schedules = settings.JOB_SCHEDULES
+    JobSchedule.objects.bulk_create(
+        [JobSchedule(name=name, next_run_at=now) for name in schedules], ignore_conflicts=True
+    )
+    jobs = []
+    with transaction.atomic():
+        due = JobSchedule.objects.select_for_update(skip_locked=True).filter(
+            name__in=list(schedules), next_run_at__lte=now
+        )
+        for schedule in due:
+            spec = schedules[schedule.name]
+            job = enqueue(spec['task'], args=spec.get('args'), priority=spec.get('priority', 0))
+            every = timedelta(seconds=spec['every'])
+            # Keep the cadence, skipping runs missed while no worker was up
+            while schedule.next_run_at <= now:
+                schedule.next_run_at += every
+            schedule.last_job = job
+            schedule.save(update_fields=['next_run_at', 'last_job'])
+            jobs.append(job)
+    return jobs
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def work(stop, burst=False):
+    """Claim and run jobs until ``stop`` is set, or until none are due when ``burst`` is set"""
+    name = worker_name()
+    while not stop.is_set():
+        close_old_connections()
+        job = claim(name)
+        if job is None:
+            if burst:
+                return
+            stop.wait(settings.JOB_POLL_SECONDS)
+            continue
+        execute(job)
+
+
+def _worker_main(stop):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    work(stop)
+
+
+class WorkerPool:
+    """
+    Supervise ``processes`` worker processes. The supervisor enqueues
+    scheduled jobs, requeues stale ones and replaces workers that exit.
+    """
+
+    def __init__(self, processes):
+        self.processes = processes
+        self.context = multiprocessing.get_context('fork')
+        self.stop = self.context.Event()
+        self.workers = []
+
+    def spawn(self):
+        # Forked children must not share the parent's database connections
+        connections.close_all()
+        process = self.context.Process(target=_worker_main, args=(self.stop,), daemon=True)
+        process.start()
+        return process
+
+    def run(self):
+        signal.signal(signal.SIGTERM, lambda *_: self.stop.set())
+        self.workers = [self.spawn() for _ in range(self.processes)]
+        try:
+            while not self.stop.is_set():
+                try:
+                    schedule_due()
+                    requeue_stale()
+                except Exception:
+                    logger.exception("Job supervisor check failed")
+                for index, process in enumerate(self.workers):
+                    if not process.is_alive():
+                        logger.warning("Worker %s exited with %s, restarting", process.pid, process.exitcode)
+                        self.workers[index] = self.spawn()
+                self.stop.wait(settings.JOB_POLL_SECONDS)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+
+    def shutdown(self, timeout=30):
+        """Let workers finish their current job, then stop them"""
+        self.stop.set()
+        for process in self.workers:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
@@ -0,0 +1,416 @@
+"""
+Load generator for the API.
+
+Simulated clinicians run weighted scenarios (login, search, open a
+client profile, enroll, list programs) against ``core.asgi.application``
+in this process, or against a server over HTTP/1.1 keep-alive sockets.
+
+Closed-loop runs keep ``users`` sessions busy with think time between
+requests. Open-loop runs start requests at a Poisson arrival ``rate``
+whatever the response times, and measure latency from each request's
+scheduled start so a stalled server cannot hide its own queueing.
+"""
+import asyncio
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlencode, urlsplit
+
+from api.benchmarks import percentile
+
+API_ROOT = '/api/v1/'
+PASSWORD = 'loadtest-password'
+DEFAULT_MIX = 'search=40,profile=30,programs=15,enroll=10,login=5'
+
+
+def parse_mix(value):
+    """Parse ``name=weight,...`` into a dict of scenario weights"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Response:
+    __slots__ = ('status', 'body')
+
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class ASGITransport:
+    """Send requests straight to an ASGI application, without a server or sockets"""
+
+    def __init__(self, app, host='loadtest'):
+        self.app = app
+        self.host = host
+
+    async def request(self, method, path, query=None, body=None, headers=None):
+        payload = json.dumps(body).encode() if body is not None else b''
+        raw_headers = [(b'host', self.host.encode())]
+        if body is not None:
+            raw_headers += [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode())]
+        raw_headers += [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+            'query_string': urlencode(query or {}).encode(), 'headers': raw_headers,
+            'client': ('127.0.0.1', 0), 'server': (self.host, 80),
+        }
+        done = asyncio.Event()
+        request_sent = False
+        status, chunks = None, []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': payload, 'more_body': False}
+            # The client stays connected until the whole response has arrived
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body', False):
+                    done.set()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            done.set()
+        return Response(status, b''.join(chunks))
+
+    def session(self):
+        return self
+
+    async def close(self):
+        pass
+
+
+class HTTPConnection:
+    """One keep-alive HTTP/1.1 connection, reopened when the server closes it"""
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def request(self, method, path, query=None, body=None, headers=None):
+        if query:
+            path = f'{path}?{urlencode(query)}'
+        payload = json.dumps(body).encode() if body is not None else b''
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'Content-Length: {len(payload)}']
+        if body is not None:
+            lines.append('Content-Type: application/json')
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        message = ('\r\n'.join(lines) + '\r\n\r\n').encode() + payload
+
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+            try:
+                self.writer.write(message)
+                await self.writer.drain()
+                return await asyncio.wait_for(self.read_response(), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # A reused connection may have been closed by the server while idle
+                await self.close()
+                if attempt:
+                    raise
+
+    async def read_response(self):
+        status_line = await self.reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        headers = {}
+        while (line := await self.reader.readuntil(b'\r\n')) != b'\r\n':
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while size := int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16):
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            await self.reader.readuntil(b'\r\n')
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            headers['connection'] = 'close'
+
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return Response(status, body)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+class SocketTransport:
+    """Send requests over HTTP/1.1 to a running server; each session gets its own connection"""
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.connections = []
+
+    def session(self):
+        connection = HTTPConnection(self.host, self.port, self.timeout)
+        self.connections.append(connection)
+        return connection
+
+    async def close(self):
+        for connection in self.connections:
+            await connection.close()
+
+
+class Stats:
+    """Latencies, statuses and errors per endpoint"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = defaultdict(Counter)
+        self.started = self.finished = None
+
+    def record(self, endpoint, seconds, status=None, error=None):
+        self.latencies[endpoint].append(seconds)
+        if error is not None:
+            self.errors[endpoint][error] += 1
+        else:
+            self.statuses[endpoint][status] += 1
+
+    def report(self):
+        """Return per-endpoint and overall percentiles, throughput and error breakdowns"""
+        duration = (self.finished or time.monotonic()) - self.started
+        endpoints = {}
+        for endpoint in sorted(self.latencies):
+            endpoints[endpoint] = self.summarize(
+                self.latencies[endpoint], self.statuses[endpoint], self.errors[endpoint], duration
+            )
+        everything = [latency for latencies in self.latencies.values() for latency in latencies]
+        overall = self.summarize(
+            everything, sum(self.statuses.values(), Counter()), sum(self.errors.values(), Counter()), duration
+        )
+        return {'duration_s': duration, 'endpoints': endpoints, 'overall': overall}
+
+    @staticmethod
+    def summarize(latencies, statuses, errors, duration):
+        latencies_ms = [latency * 1000 for latency in latencies]
+        server_errors = sum(count for status, count in statuses.items() if status >= 500)
+        return {
+            'requests': len(latencies),
+            'throughput_rps': len(latencies) / duration if duration else 0.0,
+            'p50_ms': percentile(latencies_ms, 0.50) if latencies_ms else None,
+            'p95_ms': percentile(latencies_ms, 0.95) if latencies_ms else None,
+            'p99_ms': percentile(latencies_ms, 0.99) if latencies_ms else None,
+            'max_ms': max(latencies_ms) if latencies_ms else None,
+            'statuses': {str(status): count for status, count in sorted(statuses.items())},
+            'errors': dict(errors),
+            'error_rate': (server_errors + sum(errors.values())) / len(latencies) if latencies else 0.0,
+        }
+
+
+class Clinician:
+    """A simulated user: one logged-in session issuing scenario requests"""
+
+    def __init__(self, runner, transport, email):
+        self.runner = runner
+        self.transport = transport
+        self.email = email
+        self.token = None
+        self.delay = 0.0
+        self.rng = random.Random(runner.rng.random())
+
+    @property
+    def headers(self):
+        return {'Authorization': f'Token {self.token}'} if self.token else {}
+
+    async def call(self, endpoint, method, path, started=None, expected=(200,), **kwargs):
+        """Make one request and record it under ``endpoint``; returns the response or None"""
+        started = time.monotonic() if started is None else started
+        try:
+            response = await self.transport.request(method, path, headers=self.headers, **kwargs)
+        except Exception as exc:
+            self.runner.stats.record(endpoint, time.monotonic() - started, error=type(exc).__name__)
+            return None
+        self.runner.stats.record(endpoint, time.monotonic() - started, status=response.status)
+        return response if response.status in expected else None
+
+    async def login(self, started=None):
+        response = await self.call(
+            'login', 'POST', f'{API_ROOT}auth/login/', started,
+            body={'email': self.email, 'password': PASSWORD},
+        )
+        if response is not None:
+            self.token = response.json()['token']
+
+    async def search(self, started=None):
+        await self.call('search', 'GET', f'{API_ROOT}clients/search/', started,
+                        query={'query': self.rng.choice(self.runner.names)})
+
+    async def profile(self, started=None):
+        await self.call('profile', 'GET', f'{API_ROOT}clients/{self.rng.choice(self.runner.client_ids)}/', started)
+
+    async def enroll(self, started=None):
+        # Clients already enrolled, or full programs, are rejected with 400 by design
+        await self.call(
+            'enroll', 'POST', f'{API_ROOT}clients/{self.rng.choice(self.runner.client_ids)}/enroll/', started,
+            expected=(201, 400), body={'program_id': self.rng.choice(self.runner.program_ids)},
+        )
+
+    async def programs(self, started=None):
+        await self.call('programs', 'GET', f'{API_ROOT}programs/', started)
+
+
+SCENARIOS = {
+    'login': Clinician.login,
+    'search': Clinician.search,
+    'profile': Clinician.profile,
+    'enroll': Clinician.enroll,
+    'programs': Clinician.programs,
+}
+
+
+class LoadRunner:
+    """
+    Drive ``transport`` with simulated clinicians for ``duration`` seconds.
+
+    ``accounts`` are the emails users log in as (round-robin); ``data``
+    holds the client ids, client names and program ids scenarios pick from.
+    """
+
+    def __init__(self, transport, accounts, data, mix=None, duration=30, seed=0):
+        self.transport = transport
+        self.accounts = accounts
+        self.client_ids = data['client_ids']
+        self.names = data['names']
+        self.program_ids = data['program_ids']
+        self.mix = mix or parse_mix(DEFAULT_MIX)
+        self.duration = duration
+        self.rng = random.Random(seed)
+        self.stats = Stats()
+
+    def choose(self, rng):
+        return rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+
+    async def start_users(self, users, ramp):
+        """
+        Log in once per account, then give ``users`` clinicians those tokens,
+        starting them evenly over ``ramp`` seconds.
+
+        Password hashing is deliberately slow, so sessions share their
+        account's token rather than each paying for a login up front.
+        """
+        accounts = [Clinician(self, self.transport.session(), email) for email in self.accounts]
+        await asyncio.gather(*(account.login() for account in accounts))
+        tokens = [account.token for account in accounts if account.token]
+        if not tokens:
+            raise RuntimeError('No simulated user could log in')
+
+        clinicians = []
+        for index in range(users):
+            clinician = Clinician(self, self.transport.session(), self.accounts[index % len(self.accounts)])
+            clinician.token = tokens[index % len(tokens)]
+            clinician.delay = ramp * index / max(users, 1)
+            clinicians.append(clinician)
+        return clinicians
+
+    async def closed_loop(self, users, think_time=1.0, ramp=0.0):
+        """Each user repeats: pick a weighted scenario, run it, think for an exponential time"""
+        clinicians = await self.start_users(users, ramp)
+        self.stats.started = time.monotonic()
+        deadline = self.stats.started + self.duration
+
+        async def work(clinician):
+            await asyncio.sleep(clinician.delay)
+            while time.monotonic() < deadline:
+                await SCENARIOS[self.choose(clinician.rng)](clinician)
+                if think_time:
+                    await asyncio.sleep(min(clinician.rng.expovariate(1 / think_time),
+                                            max(deadline - time.monotonic(), 0)))
+
+        await asyncio.gather(*(work(clinician) for clinician in clinicians))
+        self.stats.finished = time.monotonic()
+        await self.transport.close()
+        return self.stats.report()
+
+    async def open_loop(self, rate, users, max_in_flight=10_000):
+        """Start scenarios at Poisson arrivals of ``rate`` per second on ``users`` logged-in sessions"""
+        clinicians = await self.start_users(users, 0)
+        self.stats.started = time.monotonic()
+        deadline = self.stats.started + self.duration
+        in_flight = set()
+        scheduled = self.stats.started
+
+        while True:
+            scheduled += self.rng.expovariate(rate)
+            if scheduled >= deadline:
+                break
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            scenario = self.choose(self.rng)
+            if len(in_flight) >= max_in_flight:
+                self.stats.record(scenario, 0.0, error='Dropped')
+                continue
+            clinician = self.rng.choice(clinicians)
+            task = asyncio.ensure_future(SCENARIOS[scenario](clinician, started=scheduled))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        if in_flight:
+            await asyncio.wait(in_flight)
+        self.stats.finished = time.monotonic()
+        await self.transport.close()
+        return self.stats.report()
+
+
+def load_data(limit=10_000):
+    """Read the client ids, names and enrollable program ids scenarios pick from"""
+    from api.models import Client, HealthProgram
+
+    clients = list(Client.objects.order_by('?').values_list('id', 'first_name')[:limit])
+    programs = list(HealthProgram.objects.exclude(status='completed').values_list('id', flat=True)[:limit])
+    if not clients or not programs:
+        raise ValueError('Load tests need clients and programs; run generate_dataset first')
+    return {
+        'client_ids': [str(client_id) for client_id, _ in clients],
+        'names': sorted({name for _, name in clients}),
+        'program_ids': [str(program_id) for program_id in programs],
+    }
+
+
+def ensure_accounts(count):
+    """Create ``count`` clinician accounts with the load test password; returns their emails"""
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    emails = [f'loadtest-{index}@example.com' for index in range(count)]
+    existing = set(User.objects.filter(email__in=emails).values_list('email', flat=True))
+    for index, email in enumerate(emails):
+        if email not in existing:
+            User.objects.create_user(email, PASSWORD, first_name='Load', last_name=f'Test {index}')
+    return emails
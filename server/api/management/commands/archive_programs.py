@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.archive import archivable_programs, archive_programs, restore_programs
+
+
+class Command(BaseCommand):
+    help = "Move completed programs past the retention window, and their enrollments, to the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=settings.ARCHIVE_RETENTION_DAYS,
+                            help="Archive completed programs that ended more than this many days ago")
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE,
+                            help="Programs moved per transaction")
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between batches")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only count the programs that would be archived")
+        parser.add_argument('--restore', nargs='+', metavar='ID',
+                            help="Restore these archived programs instead")
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            restored = restore_programs(options['restore'], batch_size=options['batch_size'])
+            self.stdout.write(f"Restored {restored['programs']} programs and {restored['enrollments']} enrollments")
+            return
+        if options['dry_run']:
+            count = archivable_programs(options['retention_days']).count()
+            self.stdout.write(f"{count} programs would be archived")
+            return
+        moved = archive_programs(
+            retention_days=options['retention_days'], batch_size=options['batch_size'], pause=options['pause'],
+            progress=lambda moved: self.stdout.write(f"  {moved['programs']} programs archived"),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved['programs']} programs and {moved['enrollments']} enrollments"
+        ))
@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.benchmarks import load_suites
+from api.benchmarks.baseline import compare, load_baseline, save_baseline
+
+
+class Command(BaseCommand):
+    help = "Run benchmark suites against a throwaway test database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('suites', nargs='*', help="Suites to run (default: all)")
+        parser.add_argument('--sizes', default='20,50,100',
+                            help="Comma-separated page or dataset sizes")
+        parser.add_argument('--repeat', type=int, default=20,
+                            help="Timed runs per case")
+        parser.add_argument('--keepdb', action='store_true',
+                            help="Keep the test database between runs")
+        parser.add_argument('--save', metavar='PATH',
+                            help="Write the results to a JSON baseline file")
+        parser.add_argument('--compare', metavar='PATH',
+                            help="Compare the results with a baseline file and fail on regressions")
+        parser.add_argument('--threshold', type=float, default=0.10,
+                            help="Relative increase counted as a regression (default 0.10)")
+
+    def handle(self, *args, **options):
+        suites = load_suites()
+        names = options['suites'] or list(suites)
+        unknown = sorted(set(names) - set(suites))
+        if unknown:
+            raise CommandError(f"Unknown suites: {', '.join(unknown)}")
+
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        baseline = load_baseline(options['compare']) if options['compare'] else None
+
+        results = {}
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb'], serialize=False
+        )
+        try:
+            for name in names:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"Suite: {name}"))
+                results[name] = suites[name](sizes=sizes, repeat=options['repeat'])
+                for result in results[name]:
+                    self.stdout.write(self.format_result(result))
+                self._truncate()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        if options['save']:
+            save_baseline(options['save'], results)
+            self.stdout.write(f"Baseline written to {options['save']}")
+        if baseline is not None:
+            self.report_changes(compare(baseline, results, options['threshold']))
+
+    def report_changes(self, changes):
+        """Print metric changes against the baseline; fail when any regressed"""
+        self.stdout.write(self.style.MIGRATE_HEADING("Compared with baseline"))
+        for change in changes:
+            line = (f"  {change['case']:<48} {change['metric']:<14} "
+                    f"{change['baseline']:.3f} -> {change['current']:.3f} ({change['change']:+.1%})")
+            style = self.style.ERROR if change['regression'] else self.style.SUCCESS
+            self.stdout.write(style(line))
+        if not changes:
+            self.stdout.write("  no significant changes")
+        regressions = [change for change in changes if change['regression']]
+        if regressions:
+            raise CommandError(f"{len(regressions)} metrics regressed beyond the threshold")
+
+    def format_result(self, result):
+        """Format one result dict as an aligned line"""
+        metrics = '  '.join(
+            f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in result.items() if key not in ('case', 'size')
+        )
+        return f"  {result['case']:<36} size={result['size']:<8} {metrics}"
+
+    def _truncate(self):
+        """Empty the application tables so suites start from a clean dataset"""
+        tables = [table for table in connection.introspection.django_table_names(only_existing=True)
+                  if table.startswith('api_')]
+        if tables:
+            with connection.cursor() as cursor:
+                cursor.execute(f"TRUNCATE {', '.join(tables)} CASCADE")
@@ -0,0 +1,28 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from api.schema import artifact_path, generate_schema, write_artifacts
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema artifact served by the schema endpoints"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help="Only check the artifact is up to date; exit with status 1 if not")
+
+    def handle(self, *args, **options):
+        encoded = generate_schema()
+        if options['check']:
+            stale = [
+                str(artifact_path(encoding)) for encoding, content in encoded.items()
+                if not artifact_path(encoding).is_file() or artifact_path(encoding).read_bytes() != content
+            ]
+            if stale:
+                self.stderr.write(f"Schema artifact out of date: {', '.join(stale)}")
+                sys.exit(1)
+            self.stdout.write("Schema artifact is up to date")
+            return
+        for path in write_artifacts(encoded):
+            self.stdout.write(f"Wrote {path}")
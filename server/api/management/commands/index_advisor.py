@@ -0,0 +1,81 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.benchmarks.datasets import seed_dataset
+from api.db.advisor import IndexAdvisor, default_scenarios
+
+
+class Command(BaseCommand):
+    help = "Explain the API's querysets on a seeded test database and propose indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=20000,
+                            help="Clients to seed")
+        parser.add_argument('--programs', type=int, default=200,
+                            help="Programs to seed")
+        parser.add_argument('--runs', type=int, default=3,
+                            help="EXPLAIN ANALYZE runs per statement; the fastest is kept")
+        parser.add_argument('--min-gain', type=float, default=0.2,
+                            help="Only propose indexes that save at least this fraction of query time")
+        parser.add_argument('--json', dest='json_path',
+                            help="Also write the full report to this file")
+        parser.add_argument('--verbose-queries', action='store_true',
+                            help="Print every explained statement")
+        parser.add_argument('--keepdb', action='store_true',
+                            help="Keep the test database between runs")
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb'], serialize=False
+        )
+        try:
+            seed_dataset(clients=options['clients'], programs=options['programs'])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            report = IndexAdvisor(default_scenarios(), runs=options['runs']).run()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        self.write_report(report, options)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as handle:
+                json.dump(report, handle, indent=2, default=str)
+
+    def write_report(self, report, options):
+        self.stdout.write(self.style.MIGRATE_HEADING("Queries"))
+        for result in report['queries']:
+            if result['flags'] or options['verbose_queries']:
+                self.stdout.write(f"  {result['scenario']:<40} {result['execution_ms']:8.3f} ms")
+                for flag in result['flags']:
+                    self.stdout.write(f"      {flag}")
+                if options['verbose_queries']:
+                    self.stdout.write(f"      {result['sql']}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Indexes to add"))
+        proposals = [proposal for proposal in report['add'] if proposal['gain'] >= options['min_gain']]
+        for proposal in proposals:
+            self.stdout.write(
+                f"  {proposal['table']} ({', '.join(proposal['columns'])}): "
+                f"{proposal['before_ms']:.2f} ms -> {proposal['after_ms']:.2f} ms "
+                f"({proposal['gain']:.0%} faster, {proposal['statements']} statements, {proposal['reason']})"
+            )
+            self.stdout.write(f"      {proposal['model_index']}")
+        if not proposals:
+            self.stdout.write("  none")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Indexes to drop"))
+        for candidate in report['drop']:
+            self.stdout.write(
+                f"  {candidate['index']} on {candidate['table']} ({', '.join(candidate['columns'])}), "
+                f"{candidate['bytes'] // 1024} kB: {candidate['reason']}"
+            )
+        if not report['drop']:
+            self.stdout.write("  none")
+
+        if report['ordering']:
+            self.stdout.write(self.style.MIGRATE_HEADING("Ordering"))
+            for warning in report['ordering']:
+                self.stdout.write(self.style.WARNING(f"  {warning}"))
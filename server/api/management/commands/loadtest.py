@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.loadtest import (
+    ASGITransport, DEFAULT_MIX, LoadRunner, SocketTransport, ensure_accounts, load_data, parse_mix,
+)
+
+
+class Command(BaseCommand):
+    help = "Simulate concurrent clinicians against the ASGI app in-process or a server over HTTP"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url',
+                            help="Base URL of a running server, e.g. http://127.0.0.1:8000 "
+                                 "(default: call core.asgi.application in this process)")
+        parser.add_argument('--users', type=int, default=100,
+                            help="Simulated clinicians (sessions) to log in")
+        parser.add_argument('--rate', type=float,
+                            help="Open loop: start this many scenarios per second regardless of latency")
+        parser.add_argument('--duration', type=float, default=30,
+                            help="Seconds to generate load for")
+        parser.add_argument('--think-time', type=float, default=1.0,
+                            help="Closed loop: mean seconds a user waits between requests")
+        parser.add_argument('--ramp', type=float, default=0.0,
+                            help="Closed loop: seconds over which users log in")
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help=f"Weighted scenarios (default: {DEFAULT_MIX})")
+        parser.add_argument('--accounts', type=int, default=10,
+                            help="Clinician accounts shared by the simulated users")
+        parser.add_argument('--max-in-flight', type=int, default=10_000,
+                            help="Open loop: requests beyond this many outstanding are dropped")
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Random seed for scenario choice and arrivals")
+        parser.add_argument('--json', dest='json_path',
+                            help="Also write the report to this file")
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+            data = load_data()
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        accounts = ensure_accounts(options['accounts'])
+
+        if options['url']:
+            transport = SocketTransport(options['url'])
+        else:
+            from core.asgi import application
+            transport = ASGITransport(application)
+        runner = LoadRunner(transport, accounts, data, mix=mix, duration=options['duration'], seed=options['seed'])
+
+        if options['rate']:
+            coroutine = runner.open_loop(options['rate'], options['users'], options['max_in_flight'])
+        else:
+            coroutine = runner.closed_loop(options['users'], options['think_time'], options['ramp'])
+        report = asyncio.run(coroutine)
+
+        self.write_report(report)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+
+    def write_report(self, report):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Load test ({report['duration_s']:.1f}s)"))
+        rows = list(report['endpoints'].items()) + [('overall', report['overall'])]
+        self.stdout.write(
+            f"  {'endpoint':<10} {'requests':>9} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'errors':>8}  statuses"
+        )
+        for name, summary in rows:
+            if not summary['requests']:
+                continue
+            errors = ', '.join(f"{error}={count}" for error, count in summary['errors'].items())
+            statuses = ', '.join(f"{status}={count}" for status, count in summary['statuses'].items())
+            line = (
+                f"  {name:<10} {summary['requests']:>9} {summary['throughput_rps']:>9.1f} "
+                f"{summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f} {summary['p99_ms']:>9.1f} "
+                f"{summary['error_rate']:>8.1%}  {statuses}{'  ' + errors if errors else ''}"
+            )
+            style = self.style.ERROR if summary['error_rate'] else (lambda text: text)
+            self.stdout.write(style(line))
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from api.db.partitioning import (
+    INTERVALS, STRATEGIES, extend_range_partitions, partition_enrollments, partition_info,
+)
+
+
+class Command(BaseCommand):
+    help = "Convert the enrollment table to a partitioned table, or manage its partitions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strategy', choices=STRATEGIES,
+                            help="Partition by program hash or by enrollment date range")
+        parser.add_argument('--partitions', type=int, default=8,
+                            help="Number of hash partitions")
+        parser.add_argument('--interval', choices=INTERVALS, default='month',
+                            help="Width of each date range partition")
+        parser.add_argument('--ahead', type=int, default=12,
+                            help="Range partitions to create past the current one")
+        parser.add_argument('--drop-old', action='store_true',
+                            help="Drop the unpartitioned table after the swap")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Print the SQL without changing the database")
+        parser.add_argument('--extend', action='store_true',
+                            help="Add missing future range partitions to a partitioned table")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help="Database alias to operate on")
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if connections[using].vendor != 'postgresql':
+            raise CommandError("Partitioning requires PostgreSQL")
+
+        try:
+            if options['extend']:
+                created = extend_range_partitions(ahead=options['ahead'], using=using)
+                self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partitions"))
+                for name in created:
+                    self.stdout.write(f"  {name}")
+            elif options['strategy']:
+                if options['partitions'] < 1:
+                    raise CommandError("--partitions must be at least 1")
+                statements = partition_enrollments(
+                    options['strategy'],
+                    partitions=options['partitions'],
+                    interval=options['interval'],
+                    ahead=options['ahead'],
+                    drop_old=options['drop_old'],
+                    using=using,
+                    dry_run=options['dry_run'],
+                )
+                if options['dry_run']:
+                    for sql in statements:
+                        self.stdout.write(f"{sql};")
+                    return
+                self.stdout.write(self.style.SUCCESS("Enrollment table partitioned"))
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.show_status(using)
+
+    def show_status(self, using):
+        info = partition_info(using)
+        if info['strategy'] is None:
+            self.stdout.write("Enrollment table is not partitioned")
+            return
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Partitioned by {info['strategy']}"))
+        for partition in info['partitions']:
+            self.stdout.write(
+                f"  {partition['name']:<32} {partition['bound']:<60} ~{partition['estimated_rows']} rows"
+            )
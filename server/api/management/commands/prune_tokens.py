@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.revocation import prune_revoked
+from api.tokens import prune_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired API tokens, and revocations of expired signed tokens, in small batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Tokens deleted per statement")
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between batches")
+        parser.add_argument('--every', type=float,
+                            help="Keep running, pruning again every this many seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = prune_expired(batch_size=options['batch_size'], pause=options['pause'])
+            revoked = prune_revoked(batch_size=options['batch_size'])
+            self.stdout.write(f"Deleted {deleted} expired tokens and {revoked} expired revocations")
+            if not options['every']:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,25 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.jobs import WorkerPool, requeue_stale, schedule_due, work
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the database queue in a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOB_WORKERS,
+                            help="Worker processes to run")
+        parser.add_argument('--burst', action='store_true',
+                            help="Run due jobs in this process until none are left, then exit")
+
+    def handle(self, *args, **options):
+        if options['burst']:
+            requeue_stale()
+            schedule_due()
+            work(threading.Event(), burst=True)
+            return
+        self.stdout.write(f"Starting {options['processes']} job workers")
+        WorkerPool(options['processes']).run()
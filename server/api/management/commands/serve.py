@@ -0,0 +1,68 @@
+import os
+import tempfile
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.serving import WORKER_CLASSES, ServeApplication, gunicorn_options, rolling_reload
+
+
+class Command(BaseCommand):
+    help = "Serve the API with gunicorn: preloaded app, frozen GC, recycled workers and rolling reloads"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', help=f"Address to listen on (default {settings.SERVE_BIND})")
+        parser.add_argument('--workers', type=int, help=f"Worker processes (default {settings.SERVE_WORKERS})")
+        parser.add_argument('--worker-class', choices=sorted(WORKER_CLASSES),
+                            help=f"Worker type (default {settings.SERVE_WORKER_CLASS})")
+        parser.add_argument('--threads', type=int,
+                            help="Threads per worker for --worker-class threads")
+        parser.add_argument('--max-requests', type=int,
+                            help="Requests before a worker is replaced (0 to never replace)")
+        parser.add_argument('--max-requests-jitter', type=int,
+                            help="Random extra requests per worker, so workers are not replaced together")
+        parser.add_argument('--max-memory', type=int,
+                            help="Resident megabytes above which a worker is replaced (0 for no limit)")
+        parser.add_argument('--timeout', type=int,
+                            help="Seconds a worker may be silent before it is killed and replaced")
+        parser.add_argument('--graceful-timeout', type=int,
+                            help="Seconds stopping workers get to finish their requests")
+        parser.add_argument('--pidfile', help=f"Master PID file (default {settings.SERVE_PIDFILE})")
+        parser.add_argument('--reload', action='store_true',
+                            help="Replace the running server with one on the current code, then exit")
+        parser.add_argument('--reload-timeout', type=float, default=60.0,
+                            help="Seconds the new server gets to start its workers when reloading")
+
+    def handle(self, *args, **options):
+        if options['reload']:
+            pidfile = options['pidfile'] or settings.SERVE_PIDFILE
+            try:
+                pid = rolling_reload(pidfile, timeout=options['reload_timeout'])
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f"Reloaded; the server's master is now {pid}")
+            return
+
+        if options['worker_class'] == 'asgi' and find_spec('uvicorn') is None:
+            raise CommandError("The asgi worker class needs uvicorn (pip install uvicorn)")
+        try:
+            gunicorn = gunicorn_options(
+                bind=options['bind'],
+                workers=options['workers'],
+                worker_class=options['worker_class'],
+                threads=options['threads'],
+                max_requests=options['max_requests'],
+                max_requests_jitter=options['max_requests_jitter'],
+                timeout=options['timeout'],
+                graceful_timeout=options['graceful_timeout'],
+                pidfile=options['pidfile'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        # Workers merge their metrics through files in METRICS_DIR; the environment variable
+        # carries it to the new master of a rolling reload
+        if not settings.METRICS_DIR:
+            settings.METRICS_DIR = os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='api-metrics-')
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        ServeApplication(gunicorn, max_memory_mb=options['max_memory']).run()
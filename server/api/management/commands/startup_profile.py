@@ -0,0 +1,62 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.startup import package_totals, profile_startup
+
+# --without names and the settings flags they turn off
+SUBSYSTEMS = {'admin': 'ADMIN_ENABLED', 'docs': 'API_DOCS_ENABLED', 'jwt': 'JWT_ENABLED'}
+
+
+class Command(BaseCommand):
+    help = "Measure a cold start in a fresh interpreter and report import time per phase, package and module"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--warm-up', action='store_true',
+                            help="Include the warm-up phase")
+        parser.add_argument('--without', default='',
+                            help=f"Comma-separated subsystems to disable ({', '.join(SUBSYSTEMS)})")
+        parser.add_argument('--top', type=int, default=15,
+                            help="Packages and modules listed")
+        parser.add_argument('--json', action='store_true',
+                            help="Print the full report as JSON")
+
+    def handle(self, *args, **options):
+        without = [name for name in options['without'].split(',') if name]
+        unknown = sorted(set(without) - set(SUBSYSTEMS))
+        if unknown:
+            raise CommandError(f"Unknown subsystems: {', '.join(unknown)}")
+
+        try:
+            report = profile_startup(
+                warm_up=options['warm_up'], env={SUBSYSTEMS[name]: 'False' for name in without}
+            )
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        top = options['top']
+        imports = report['imports']
+        self.stdout.write(self.style.MIGRATE_HEADING("Phases"))
+        for phase in report['phases']:
+            self.stdout.write(
+                f"  {phase['name']:<12} {phase['seconds'] * 1000:8.1f}ms  "
+                f"{len(phase['modules']):>4} modules, {phase['import_seconds'] * 1000:.1f}ms importing"
+            )
+        total = sum(phase['seconds'] for phase in report['phases'])
+        modules = sum(len(phase['modules']) for phase in report['phases'])
+        self.stdout.write(f"  {'total':<12} {total * 1000:8.1f}ms  {modules:>4} modules")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Packages by self import time"))
+        for package, seconds in package_totals(imports)[:top]:
+            self.stdout.write(f"  {package:<40} {seconds * 1000:8.1f}ms")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Modules by cumulative import time"))
+        for entry in sorted(imports, key=lambda entry: entry['cumulative_us'], reverse=True)[:top]:
+            self.stdout.write(
+                f"  {entry['module']:<48} {entry['cumulative_us'] / 1000:8.1f}ms  "
+                f"(self {entry['self_us'] / 1000:.1f}ms, {entry['phase']})"
+            )
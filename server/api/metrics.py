@@ -0,0 +1,456 @@
+"""
+Prometheus metrics for the API, served in the text format at /metrics.
+
+Each process aggregates in memory: recording a sample is a dictionary
+update under a lock, and nothing is written per request. Processes that
+share ``METRICS_DIR`` (``manage.py serve`` sets one for its workers) also
+write a snapshot of their metrics to ``<METRICS_DIR>/<pid>.json``, from a
+background thread every ``METRICS_FLUSH_SECONDS`` once they have handled
+new requests. A scrape, answered by any one worker,
+writes that worker's snapshot and merges all of them: counters and
+histograms are summed, and the snapshots of exited workers are folded
+into ``exited.json`` so their counts survive worker recycling. The
+in-flight request count changes too often for snapshots, so each process
+keeps it in an 8-byte memory-mapped file (``<pid>.inflight``) that the
+scrape reads directly.
+
+Requests are labelled with the name of the URL pattern they matched
+(``client-detail``), which keeps label values bounded whatever paths
+clients send.
+"""
+import bisect
+import contextvars
+import fcntl
+import functools
+import hmac
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .db.wrappers import install_execute_wrapper
+from .streaming import when_body_closes
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+EXITED = 'exited.json'
+
+
+class Metric:
+    """A named family of samples, one per combination of label values"""
+
+    kind = None
+
+    def __init__(self, registry, name, documentation, labels=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        registry.metrics[name] = self
+
+    def merge(self, total, value):
+        return total + value
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self.registry.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set_total(self, value, *labels):
+        """Set the count from a cumulative total kept elsewhere in this process"""
+        with self.registry.lock:
+            self.values[labels] = value
+
+
+class Histogram(Metric):
+    """Observations counted into fixed buckets; each sample is the per-bucket counts (the last for +Inf) and the sum"""
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labels=(), buckets=()):
+        super().__init__(registry, name, documentation, labels)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.registry.lock:
+            sample = self.values.get(labels)
+            if sample is None:
+                sample = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            sample[index] += 1
+            sample[-1] += value
+
+    def merge(self, total, value):
+        if len(total) != len(value):
+            # Written with other buckets, by a server started with different settings
+            return total
+        return [a + b for a, b in zip(total, value)]
+
+
+class InFlightGauge:
+    """
+    An unlabelled gauge kept in a memory-mapped file per process when
+    ``METRICS_DIR`` is set, so other processes read its current value.
+    """
+
+    kind = 'gauge'
+    labels = ()
+
+    def __init__(self, registry, name, documentation):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self.pid = None
+        self.map = None
+        registry.metrics[name] = self
+
+    def _shared(self):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return None
+        if self.pid != os.getpid():
+            fd = os.open(os.path.join(directory, f'{os.getpid()}.inflight'), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                os.ftruncate(fd, 8)
+                self.map = mmap.mmap(fd, 8)
+            finally:
+                os.close(fd)
+            self.pid = os.getpid()
+        return self.map
+
+    def add(self, amount):
+        with self.registry.lock:
+            self.value += amount
+            shared = self._shared()
+            if shared is not None:
+                struct.pack_into('d', shared, 0, self.value)
+
+    def inc(self):
+        self.add(1)
+
+    def dec(self):
+        self.add(-1)
+
+    def reset(self):
+        self.value = 0
+        self.pid = None
+        self.map = None
+
+
+class Registry:
+    """The metrics of this process, with their snapshots in ``METRICS_DIR``"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.collectors = []
+        self.changes = 0
+        self.flusher = None
+
+    def counter(self, name, documentation, labels=()):
+        return Counter(self, name, documentation, labels)
+
+    def histogram(self, name, documentation, labels=(), buckets=()):
+        return Histogram(self, name, documentation, labels, buckets)
+
+    def reset(self):
+        """Forget everything recorded, as a forked child must"""
+        self.lock = threading.Lock()
+        self.changes = 0
+        self.flusher = None
+        for metric in self.metrics.values():
+            if isinstance(metric, InFlightGauge):
+                metric.reset()
+            else:
+                metric.values = {}
+
+    def snapshot(self):
+        """Counters and histograms of this process, as ``{name: [[labels, value], ...]}``"""
+        for collect in self.collectors:
+            collect()
+        with self.lock:
+            return {
+                name: [[list(labels), list(value) if isinstance(value, list) else value]
+                        for labels, value in metric.values.items()]
+                for name, metric in self.metrics.items() if not isinstance(metric, InFlightGauge)
+            }
+
+    def flush(self):
+        """Write this process's snapshot if METRICS_DIR is set"""
+        directory = settings.METRICS_DIR
+        if directory:
+            write_json(os.path.join(directory, f'{os.getpid()}.json'), self.snapshot())
+
+    def changed(self):
+        """Note a finished request, starting this process's flusher the first time METRICS_DIR is set"""
+        self.changes += 1
+        if self.flusher is None and settings.METRICS_DIR:
+            with self.lock:
+                if self.flusher is None:
+                    self.flusher = threading.Thread(target=self._flush_changes, name='metrics-flusher', daemon=True)
+                    self.flusher.start()
+
+    def _flush_changes(self):
+        written = 0
+        while True:
+            time.sleep(settings.METRICS_FLUSH_SECONDS)
+            changes = self.changes
+            if changes != written:
+                self.flush()
+                written = changes
+
+    def merge(self, totals, snapshot):
+        for name, samples in snapshot.items():
+            metric = self.metrics.get(name)
+            if metric is None:
+                continue
+            values = totals.setdefault(name, {})
+            for labels, value in samples:
+                labels = tuple(labels)
+                values[labels] = metric.merge(values[labels], value) if labels in values else value
+        return totals
+
+    def collect(self):
+        """Samples of every process sharing METRICS_DIR, or of this one, as ``{name: {labels: value}}``"""
+        directory = settings.METRICS_DIR
+        if not directory:
+            totals = self.merge({}, self.snapshot())
+            for metric in self.metrics.values():
+                if isinstance(metric, InFlightGauge):
+                    totals[metric.name] = {(): metric.value}
+            return totals
+
+        self.flush()
+        totals, in_flight = {}, 0.0
+        with open(os.path.join(directory, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            exited = self.merge({}, read_json(os.path.join(directory, EXITED)) or {})
+            folded = False
+            for entry in os.listdir(directory):
+                pid, _, suffix = entry.partition('.')
+                if not pid.isdigit() or suffix not in ('json', 'inflight'):
+                    continue
+                path = os.path.join(directory, entry)
+                if not is_running(int(pid)):
+                    if suffix == 'json':
+                        snapshot = read_json(path)
+                        if snapshot:
+                            self.merge(exited, snapshot)
+                            folded = True
+                    os.unlink(path)
+                elif suffix == 'json':
+                    self.merge(totals, read_json(path) or {})
+                else:
+                    with open(path, 'rb') as shared:
+                        data = shared.read(8)
+                    if len(data) == 8:
+                        in_flight += struct.unpack('d', data)[0]
+            exited = self.snapshot_of(exited)
+            if folded:
+                write_json(os.path.join(directory, EXITED), exited)
+        self.merge(totals, exited)
+        for metric in self.metrics.values():
+            if isinstance(metric, InFlightGauge):
+                totals[metric.name] = {(): in_flight}
+        return totals
+
+    def snapshot_of(self, totals):
+        """The snapshot form of merged samples"""
+        return {name: [[list(labels), value] for labels, value in values.items()] for name, values in totals.items()}
+
+    def render(self, totals):
+        """The Prometheus text exposition of merged samples"""
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in sorted(totals.get(name, {}).items()):
+                pairs = list(zip(metric.labels, labels))
+                if metric.kind != 'histogram':
+                    lines.append(f'{name}{format_labels(pairs)} {format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value[:-1]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else format_value(bound)
+                    lines.append(f'{name}_bucket{format_labels(pairs + [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(pairs)} {format_value(value[-1])}')
+                lines.append(f'{name}_count{format_labels(pairs)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in pairs) + '}'
+
+
+def format_value(value):
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def read_json(path):
+    try:
+        with open(path) as snapshot:
+            return json.load(snapshot)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.snapshot-')
+    try:
+        with os.fdopen(fd, 'w') as snapshot:
+            json.dump(data, snapshot)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry.reset)
+
+requests = registry.counter(
+    'api_requests_total', 'HTTP responses by method, URL pattern and status code', ('method', 'route', 'status'),
+)
+request_seconds = registry.histogram(
+    'api_request_duration_seconds', 'Time to produce a response, by method and URL pattern',
+    ('method', 'route'), settings.METRICS_LATENCY_BUCKETS,
+)
+in_flight = InFlightGauge(registry, 'api_requests_in_flight', 'Requests being handled')
+queries_per_request = registry.histogram(
+    'api_db_queries_per_request', 'Database queries made while producing a response, by URL pattern',
+    ('route',), (0, 1, 2, 5, 10, 20, 50, 100),
+)
+query_seconds = registry.histogram(
+    'api_db_query_duration_seconds', 'Database query execution time by connection alias',
+    ('alias',), (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+cache_requests = registry.counter(
+    'api_cache_requests_total', 'In-process cache lookups by cache and result (hit or miss)', ('cache', 'result'),
+)
+throttled = registry.counter(
+    'api_throttled_requests_total', 'Requests refused by a rate throttle, by URL pattern', ('route',),
+)
+enrollments = registry.counter('api_enrollments_created_total', 'Client enrollments created')
+
+# Queries counted for the request being handled; unset outside requests
+_request_queries = contextvars.ContextVar('request_queries', default=None)
+
+
+def route_of(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None and match.view_name else 'unmatched'
+
+
+def method_of(request):
+    return request.method if request.method in METHODS else 'other'
+
+
+def start_request():
+    """Count the request as in flight and its queries from here on; returns the token for ``finish_request``"""
+    in_flight.inc()
+    return time.perf_counter(), _request_queries.set([0])
+
+
+def finish_request(request, response, started):
+    """
+    Record the request's latency, status and query count; ``response`` is
+    None if the handler raised. A streamed response is recorded, and leaves
+    the in-flight count, when its body is closed.
+    """
+    start, token = started
+    # The body of a streamed response keeps counting into this list from its own copy of the context
+    queries = _request_queries.get()
+    _request_queries.reset(token)
+    if response is not None and response.streaming:
+        when_body_closes(response, functools.partial(record_request, request, response, start, queries))
+    else:
+        record_request(request, response, start, queries)
+
+
+def record_request(request, response, start, queries):
+    elapsed = time.perf_counter() - start
+    in_flight.dec()
+    route, method = route_of(request), method_of(request)
+    request_seconds.observe(elapsed, method, route)
+    requests.inc(method, route, str(response.status_code if response is not None else 500))
+    queries_per_request.observe(queries[0], route)
+    registry.changed()
+
+
+def time_query(execute, sql, params, many, context):
+    """Database execute wrapper timing every query of the connection it is installed on"""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        query_seconds.observe(time.perf_counter() - start, context['connection'].alias)
+        counter = _request_queries.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+def instrument_connection(sender, connection, **kwargs):
+    install_execute_wrapper(connection, time_query)
+
+
+def enrollment_saved(sender, instance, created, **kwargs):
+    if created:
+        enrollments.inc()
+
+
+def collect_compression_cache():
+    from .compression import compression_stats
+
+    hits = misses = 0
+    for totals in compression_stats.snapshot().values():
+        hits += totals['cache_hits']
+        misses += totals['cache_misses']
+    cache_requests.set_total(hits, 'compression', 'hit')
+    cache_requests.set_total(misses, 'compression', 'miss')
+
+
+registry.collectors.append(collect_compression_cache)
+
+
+def metrics_view(request):
+    """
+    Merged metrics of every worker in the Prometheus text format. Scrapes
+    must send METRICS_TOKEN as a bearer token; without one set, metrics
+    are only served with DEBUG on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponse('Set METRICS_TOKEN to enable metrics\n', status=403, content_type='text/plain')
+    if token and not hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    response = HttpResponse(registry.render(registry.collect()), content_type=CONTENT_TYPE)
+    response['Cache-Control'] = 'no-store'
+    return response
@@ -1,5 +1,15 @@
+from django.conf import settings
 from django.http import HttpResponseForbidden
+from django.utils.cache import patch_vary_headers
 import re
+import time
+import zlib
+
+from . import metrics, tracing
+from .compression import (
+    VariantCache, available_codecs, coded_etag, compression_stats, negotiate, timed_compress,
+    uncoded_etags,
+)
 
 class SecurityMiddleware:
     """
@@ -42,3 +52,195 @@ class SecurityMiddleware:
                 return True
                 
         return False
+
+
+class TracingMiddleware:
+    """
+    Middleware to trace sampled requests (see api.tracing). It goes first:
+    the request is its root span, and each middleware after it a child.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = tracing.instrument_middleware(get_response)
+
+    def __call__(self, request):
+        state = tracing.start_request(request)
+        try:
+            response = self.get_response(request)
+        except Exception as e:
+            tracing.finish_request(request, None, state, error=e)
+            raise
+        return tracing.finish_request(request, response, state)
+
+
+class MetricsMiddleware:
+    """
+    Middleware to record the latency, status, query count and in-flight
+    count of every request in this process's metrics (see api.metrics).
+    It goes first, so the time includes the other middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = metrics.start_request()
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish_request(request, response, started)
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Middleware to compress responses with the best codec the client accepts.
+
+    Bodies below COMPRESSION_MIN_SIZE are sent as-is, streaming responses
+    are compressed chunk by chunk, and compressed variants of cacheable
+    responses are kept in an in-process LRU so hot payloads are not
+    recompressed on every request. Each encoding of a representation gets
+    its own strong ETag, the original with the coding appended
+    (``"<tag>-gzip"``), and revalidations with that tag are answered
+    with a 304 carrying it.
+    """
+
+    compressible_types = (
+        'text/', 'application/json', 'application/javascript', 'application/xml',
+        'application/openapi', 'application/vnd.oai', 'image/svg+xml',
+    )
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.codecs = available_codecs(settings.COMPRESSION_CODECS, settings.COMPRESSION_LEVELS)
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.cache = VariantCache(settings.COMPRESSION_CACHE_MAX_BYTES)
+
+    def __call__(self, request):
+        codec = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''), self.codecs)
+        revalidating = False
+        if codec is not None and 'HTTP_IF_NONE_MATCH' in request.META:
+            # Views compare against the representation's own tag
+            request.META['HTTP_IF_NONE_MATCH'], revalidating = uncoded_etags(
+                request.META['HTTP_IF_NONE_MATCH'], codec
+            )
+
+        response = self.get_response(request)
+
+        if response.status_code == 304 and revalidating and response.has_header('ETag'):
+            response.headers['ETag'] = coded_etag(response['ETag'], codec)
+            patch_vary_headers(response, ('Accept-Encoding',))
+            return response
+
+        if not self._is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if codec is None:
+            return response
+
+        if response.streaming:
+            self._compress_stream(response, codec)
+        elif not self._compress_content(request, response, codec):
+            return response
+
+        if response.has_header('ETag'):
+            response.headers['ETag'] = coded_etag(response['ETag'], codec)
+        response.headers['Content-Encoding'] = codec.name
+        return response
+
+    def _is_compressible(self, response):
+        """Check headers, status, type and size before negotiating a codec"""
+        if response.has_header('Content-Encoding') or response.status_code in (204, 304):
+            return False
+
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type == 'text/event-stream' or not content_type.startswith(self.compressible_types):
+            return False
+
+        return response.streaming or len(response.content) >= self.min_size
+
+    def _is_cacheable(self, request, response):
+        cache_control = response.get('Cache-Control', '').lower()
+        return (
+            request.method in ('GET', 'HEAD')
+            and response.status_code == 200
+            and 'no-store' not in cache_control
+        )
+
+    def _compress_content(self, request, response, codec):
+        """Replace the body with its compressed form, reusing a cached variant"""
+        content = response.content
+        key = None
+        if self._is_cacheable(request, response):
+            key = self.cache.key(codec, content, response.get('ETag'))
+            compressed = self.cache.get(key)
+            if compressed is not None:
+                compression_stats.record(
+                    codec.name, responses=1, bytes_in=len(content),
+                    bytes_out=len(compressed), cache_hits=1,
+                )
+                self._set_body(response, compressed)
+                return True
+
+        compressed, cpu_seconds = timed_compress(codec, content)
+        compression_stats.record(
+            codec.name, responses=1, bytes_in=len(content), bytes_out=len(compressed),
+            cpu_seconds=cpu_seconds, cache_misses=int(key is not None),
+        )
+        if len(compressed) >= len(content):
+            return False
+
+        if key is not None:
+            self.cache.set(key, compressed)
+        self._set_body(response, compressed)
+        response.headers['Server-Timing'] = f'compress;dur={cpu_seconds * 1000:.2f}'
+        return True
+
+    def _set_body(self, response, compressed):
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+
+    def _compress_stream(self, response, codec):
+        """Compress each chunk and flush it so the client receives it immediately"""
+        if response.is_async:
+            original = response.streaming_content
+
+            async def compressed_async():
+                compressor = codec.compressobj()
+                totals = {'bytes_in': 0, 'bytes_out': 0, 'cpu_seconds': 0.0}
+                async for chunk in original:
+                    yield self._compress_chunk(compressor, chunk, totals)
+                yield self._finish_stream(codec, compressor, totals)
+
+            response.streaming_content = compressed_async()
+        else:
+            response.streaming_content = self._compressed_iterator(
+                codec, response.streaming_content
+            )
+        del response.headers['Content-Length']
+
+    def _compressed_iterator(self, codec, chunks):
+        compressor = codec.compressobj()
+        totals = {'bytes_in': 0, 'bytes_out': 0, 'cpu_seconds': 0.0}
+        for chunk in chunks:
+            yield self._compress_chunk(compressor, chunk, totals)
+        yield self._finish_stream(codec, compressor, totals)
+
+    def _compress_chunk(self, compressor, chunk, totals):
+        start = time.thread_time()
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        totals['cpu_seconds'] += time.thread_time() - start
+        totals['bytes_in'] += len(chunk)
+        totals['bytes_out'] += len(compressed)
+        return compressed
+
+    def _finish_stream(self, codec, compressor, totals):
+        start = time.thread_time()
+        tail = compressor.flush(zlib.Z_FINISH)
+        totals['cpu_seconds'] += time.thread_time() - start
+        totals['bytes_out'] += len(tail)
+        compression_stats.record(codec.name, responses=1, **totals)
+        return tail
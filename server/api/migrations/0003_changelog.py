@@ -0,0 +1,82 @@
+# Generated by Django 5.2 on 2026-10-19 05:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# Table each tracked resource is stored in
+TRACKED_TABLES = {
+    'clients': 'api_client',
+    'programs': 'api_healthprogram',
+    'enrollments': 'api_enrollment',
+}
+
+CREATE_FUNCTION = """
+CREATE FUNCTION api_record_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO api_changelog (txid, resource, object_id, deleted, changed_at)
+        VALUES (txid_current(), TG_ARGV[0], OLD.id, TRUE, now());
+        RETURN OLD;
+    END IF;
+    INSERT INTO api_changelog (txid, resource, object_id, deleted, changed_at)
+    VALUES (txid_current(), TG_ARGV[0], NEW.id, FALSE, now());
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def tracking_sql():
+    """Return the SQL installing the change triggers and backfilling current rows"""
+    statements = [CREATE_FUNCTION]
+    for resource, table in TRACKED_TABLES.items():
+        statements.append(
+            f"CREATE TRIGGER {table}_changes AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION api_record_change('{resource}');"
+        )
+        statements.append(
+            f"INSERT INTO api_changelog (txid, resource, object_id, deleted, changed_at) "
+            f"SELECT txid_current(), '{resource}', id, FALSE, now() FROM {table};"
+        )
+    return statements
+
+
+def untracking_sql():
+    statements = [f"DROP TRIGGER IF EXISTS {table}_changes ON {table};" for table in TRACKED_TABLES.values()]
+    statements.append("DROP FUNCTION IF EXISTS api_record_change();")
+    return statements
+
+
+def run_on_postgresql(statements):
+    """Return a RunPython callable executing ``statements``; other backends (e.g. SQLite stand-ins) skip them"""
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_authtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('txid', models.BigIntegerField()),
+                ('resource', models.CharField(choices=[('clients', 'Clients'), ('programs', 'Programs'), ('enrollments', 'Enrollments')], max_length=20)),
+                ('object_id', models.UUIDField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['txid', 'id'],
+                'indexes': [models.Index(fields=['txid', 'id'], name='api_changel_txid_003570_idx')],
+            },
+        ),
+        migrations.RunPython(run_on_postgresql(tracking_sql()), run_on_postgresql(untracking_sql())),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-19 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_changelog'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='client',
+            options={'ordering': ['-registration_date', '-id'], 'verbose_name': 'client', 'verbose_name_plural': 'clients'},
+        ),
+        migrations.AlterModelOptions(
+            name='healthprogram',
+            options={'ordering': ['-start_date', '-id'], 'verbose_name': 'health program', 'verbose_name_plural': 'health programs'},
+        ),
+        migrations.RemoveIndex(
+            model_name='client',
+            name='api_client_registr_bb49c0_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='healthprogram',
+            name='api_healthp_start_d_99f1c8_idx',
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['registration_date', 'id'], name='api_client_registr_fd18ff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthprogram',
+            index=models.Index(fields=['start_date', 'id'], name='api_healthp_start_d_35f0c2_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-19 06:17
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_ordering_tie_breakers'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='enrollment',
+            options={'ordering': ['-enrollment_date', '-id'], 'verbose_name': 'enrollment', 'verbose_name_plural': 'enrollments'},
+        ),
+    ]
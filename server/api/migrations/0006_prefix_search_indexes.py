@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-19 06:33
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_enrollment_ordering_tie_breaker'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('first_name'), name='text_pattern_ops'), name='client_first_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('last_name'), name='text_pattern_ops'), name='client_last_name_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='text_pattern_ops'), name='client_email_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('contact_number'), name='text_pattern_ops'), name='client_contact_prefix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthprogram',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), name='program_name_prefix_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 06:38
+
+import api.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_prefix_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='client',
+            name='id',
+            field=models.UUIDField(default=api.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='enrollment',
+            name='id',
+            field=models.UUIDField(default=api.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='healthprogram',
+            name='id',
+            field=models.UUIDField(default=api.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='id',
+            field=models.UUIDField(default=api.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
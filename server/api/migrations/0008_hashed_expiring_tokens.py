@@ -0,0 +1,38 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_uuid7_primary_keys'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='authtoken',
+            old_name='key',
+            new_name='digest',
+        ),
+        migrations.AlterField(
+            model_name='authtoken',
+            name='digest',
+            field=models.CharField(max_length=64, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='authtoken',
+            name='created',
+            field=models.DateTimeField(default=timezone.now),
+        ),
+        migrations.AddField(
+            model_name='authtoken',
+            name='last_used',
+            field=models.DateTimeField(default=timezone.now),
+        ),
+        migrations.AddField(
+            model_name='authtoken',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=timezone.now),
+            preserve_default=False,
+        ),
+    ]
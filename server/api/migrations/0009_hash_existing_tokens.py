@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+DIGEST = "encode(sha256(convert_to({column}, 'UTF8')), 'hex')"
+
+
+def hash_existing_tokens(apps, schema_editor):
+    """
+    Replace stored raw keys with their digests, and carry over tokens issued
+    by rest_framework.authtoken, so clients stay logged in. Every existing
+    token gets one idle timeout from now before it expires.
+    """
+    connection = schema_editor.connection
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.AUTH_TOKEN_IDLE_SECONDS)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE api_authtoken SET digest = {DIGEST.format(column='digest')}, last_used = %s, expires_at = %s",
+            [now, expires_at],
+        )
+        if 'authtoken_token' in connection.introspection.table_names():
+            cursor.execute(
+                f"INSERT INTO api_authtoken (digest, user_id, created, last_used, expires_at) "
+                f"SELECT {DIGEST.format(column='key')}, user_id, created, %s, %s FROM authtoken_token "
+                f"ON CONFLICT DO NOTHING",
+                [now, expires_at],
+            )
+
+
+class Migration(migrations.Migration):
+    """Kept apart from 0008 so its writes don't share a transaction with the schema changes"""
+
+    dependencies = [
+        ('api', '0008_hashed_expiring_tokens'),
+    ]
+
+    operations = [
+        migrations.RunPython(hash_existing_tokens, migrations.RunPython.noop),
+    ]
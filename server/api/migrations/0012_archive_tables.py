@@ -0,0 +1,114 @@
+# Generated by Django 5.2 on 2026-10-19 06:57
+
+import api.ids
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+PROGRAM_COLUMNS = 'id, created_at, updated_at, name, description, start_date, end_date, status, capacity'
+ENROLLMENT_COLUMNS = 'id, created_at, updated_at, enrollment_date, status, notes, client_id, program_id'
+
+# Live and archived rows together, for reads with include_archived
+CREATE_VIEWS = f"""
+CREATE VIEW api_healthprogram_all AS
+    SELECT {PROGRAM_COLUMNS}, FALSE AS archived FROM api_healthprogram
+    UNION ALL
+    SELECT {PROGRAM_COLUMNS}, TRUE AS archived FROM api_archivedhealthprogram;
+CREATE VIEW api_enrollment_all AS
+    SELECT {ENROLLMENT_COLUMNS}, FALSE AS archived FROM api_enrollment
+    UNION ALL
+    SELECT {ENROLLMENT_COLUMNS}, TRUE AS archived FROM api_archivedenrollment;
+"""
+
+DROP_VIEWS = """
+DROP VIEW IF EXISTS api_enrollment_all;
+DROP VIEW IF EXISTS api_healthprogram_all;
+"""
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_background_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentRecord',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=api.ids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('enrollment_date', models.DateField(default=django.utils.timezone.now)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('suspended', 'Suspended')], default='active', max_length=20)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('archived', models.BooleanField()),
+            ],
+            options={
+                'db_table': 'api_enrollment_all',
+                'ordering': ['-enrollment_date', '-id'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='HealthProgramRecord',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=api.ids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('planned', 'Planned')], default='planned', max_length=20)),
+                ('capacity', models.PositiveIntegerField(blank=True, null=True)),
+                ('archived', models.BooleanField()),
+            ],
+            options={
+                'db_table': 'api_healthprogram_all',
+                'ordering': ['-start_date', '-id'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedHealthProgram',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=api.ids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255)),
+                ('description', models.TextField()),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('planned', 'Planned')], default='planned', max_length=20)),
+                ('capacity', models.PositiveIntegerField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'archived health program',
+                'verbose_name_plural': 'archived health programs',
+                'ordering': ['-start_date', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedEnrollment',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=api.ids.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('enrollment_date', models.DateField(default=django.utils.timezone.now)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('suspended', 'Suspended')], default='active', max_length=20)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_enrollments', to='api.client')),
+                ('program', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='api.archivedhealthprogram')),
+            ],
+            options={
+                'verbose_name': 'archived enrollment',
+                'verbose_name_plural': 'archived enrollments',
+                'ordering': ['-enrollment_date', '-id'],
+            },
+        ),
+        migrations.RunSQL(CREATE_VIEWS, DROP_VIEWS),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-19 07:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_archive_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncHorizon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('txid', models.BigIntegerField()),
+                ('change_id', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['resource', 'object_id'], name='api_changel_resourc_a4e076_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations
+
+# api_record_change() from 0003, returning early while api.skip_change_log is on (set by api.archive)
+CREATE_FUNCTION = """
+CREATE OR REPLACE FUNCTION api_record_change() RETURNS trigger AS $$
+BEGIN
+    IF current_setting('api.skip_change_log', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO api_changelog (txid, resource, object_id, deleted, changed_at)
+        VALUES (txid_current(), TG_ARGV[0], OLD.id, TRUE, now());
+        RETURN OLD;
+    END IF;
+    INSERT INTO api_changelog (txid, resource, object_id, deleted, changed_at)
+    VALUES (txid_current(), TG_ARGV[0], NEW.id, FALSE, now());
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+PREVIOUS_FUNCTION = """
+CREATE OR REPLACE FUNCTION api_record_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO api_changelog (txid, resource, object_id, deleted, changed_at)
+        VALUES (txid_current(), TG_ARGV[0], OLD.id, TRUE, now());
+        RETURN OLD;
+    END IF;
+    INSERT INTO api_changelog (txid, resource, object_id, deleted, changed_at)
+    VALUES (txid_current(), TG_ARGV[0], NEW.id, FALSE, now());
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def run_on_postgresql(sql):
+    """Return a RunPython callable executing ``sql``; other backends (e.g. SQLite stand-ins) skip it"""
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_sync_horizon'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgresql(CREATE_FUNCTION), run_on_postgresql(PREVIOUS_FUNCTION)),
+    ]
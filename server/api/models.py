@@ -1,8 +1,11 @@
-import uuid
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Upper
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.contrib.postgres.indexes import OpClass
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
+from .ids import uuid7
 
 class CustomUserManager(BaseUserManager):
     """
@@ -38,7 +41,7 @@ class CustomUserManager(BaseUserManager):
 
 class User(AbstractUser):
     """Custom User model with email as the unique identifier"""
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     username = None
     email = models.EmailField(_('email address'), unique=True)
     first_name = models.CharField(_('first name'), max_length=150)
@@ -67,21 +70,52 @@ class TimeStampedModel(models.Model):
         abstract = True
 
 
-class HealthProgram(TimeStampedModel):
-    """Model for health programs like TB, Malaria, HIV, etc."""
+def enrolled_clients_subquery(enrollment_model=None):
+    """
+    Count a program's enrollments with a correlated subquery. Unlike a
+    joined Count() it needs no GROUP BY, keeps Meta.ordering and is only
+    evaluated for the rows actually returned.
+    """
+    enrollment_model = enrollment_model or Enrollment
+    return Coalesce(
+        Subquery(
+            enrollment_model.objects.filter(program=OuterRef('pk'))
+            .order_by()
+            .values('program')
+            .annotate(count=Count('pk'))
+            .values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class HealthProgramQuerySet(models.QuerySet):
+    """QuerySet for health programs"""
+
+    def with_enrolled_counts(self):
+        """Annotate each program with its number of enrollments"""
+        enrollment_model = self.model._meta.get_field('enrollments').related_model
+        return self.annotate(enrolled_clients_total=enrolled_clients_subquery(enrollment_model))
+
+
+class BaseHealthProgram(TimeStampedModel):
+    """Fields shared by live, archived and combined health programs"""
     STATUS_CHOICES = (
         ('active', 'Active'),
         ('completed', 'Completed'),
         ('planned', 'Planned'),
     )
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     name = models.CharField(max_length=255)
     description = models.TextField()
     start_date = models.DateField()
     end_date = models.DateField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='planned')
     capacity = models.PositiveIntegerField(null=True, blank=True)
+
+    objects = HealthProgramQuerySet.as_manager()
     
     def __str__(self):
         return self.name
@@ -89,16 +123,26 @@ class HealthProgram(TimeStampedModel):
     @property
     def enrolled_clients_count(self):
         """Return the number of clients enrolled in this program"""
+        if hasattr(self, 'enrolled_clients_total'):
+            return self.enrolled_clients_total
         return self.enrollments.count()
-    
+
+    class Meta:
+        abstract = True
+
+
+class HealthProgram(BaseHealthProgram):
+    """Model for health programs like TB, Malaria, HIV, etc."""
+
     class Meta:
         verbose_name = _('health program')
         verbose_name_plural = _('health programs')
-        ordering = ['-start_date']
+        ordering = ['-start_date', '-id']
         indexes = [
             models.Index(fields=['name']),
             models.Index(fields=['status']),
-            models.Index(fields=['start_date']),
+            models.Index(fields=['start_date', 'id']),
+            models.Index(OpClass(Upper('name'), name='text_pattern_ops'), name='program_name_prefix_idx'),
         ]
 
 
@@ -110,7 +154,7 @@ class Client(TimeStampedModel):
         ('other', 'Other'),
     )
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     first_name = models.CharField(max_length=150)
     last_name = models.CharField(max_length=150)
     date_of_birth = models.DateField()
@@ -127,41 +171,53 @@ class Client(TimeStampedModel):
     
     def get_active_programs(self):
         """Return all active programs the client is enrolled in"""
-        return self.programs.filter(enrollment__status='active')
+        return HealthProgram.objects.filter(enrollments__client=self, enrollments__status='active')
     
     class Meta:
         verbose_name = _('client')
         verbose_name_plural = _('clients')
-        ordering = ['-registration_date']
+        ordering = ['-registration_date', '-id']
         indexes = [
             models.Index(fields=['first_name', 'last_name']),
             models.Index(fields=['email']),
-            models.Index(fields=['registration_date']),
+            models.Index(fields=['registration_date', 'id']),
+            # Case-insensitive prefix search (istartswith) in the admin
+            models.Index(OpClass(Upper('first_name'), name='text_pattern_ops'), name='client_first_name_prefix_idx'),
+            models.Index(OpClass(Upper('last_name'), name='text_pattern_ops'), name='client_last_name_prefix_idx'),
+            models.Index(OpClass(Upper('email'), name='text_pattern_ops'), name='client_email_prefix_idx'),
+            models.Index(OpClass(Upper('contact_number'), name='text_pattern_ops'), name='client_contact_prefix_idx'),
         ]
 
 
-class Enrollment(TimeStampedModel):
-    """Model for client enrollment in health programs"""
+class BaseEnrollment(TimeStampedModel):
+    """Fields shared by live, archived and combined enrollments"""
     STATUS_CHOICES = (
         ('active', 'Active'),
         ('completed', 'Completed'),
         ('suspended', 'Suspended'),
     )
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='enrollments')
-    program = models.ForeignKey(HealthProgram, on_delete=models.CASCADE, related_name='enrollments')
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     enrollment_date = models.DateField(default=timezone.now)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
     notes = models.TextField(blank=True, null=True)
     
     def __str__(self):
         return f"{self.client} - {self.program}"
+
+    class Meta:
+        abstract = True
+
+
+class Enrollment(BaseEnrollment):
+    """Model for client enrollment in health programs"""
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='enrollments')
+    program = models.ForeignKey(HealthProgram, on_delete=models.CASCADE, related_name='enrollments')
     
     class Meta:
         verbose_name = _('enrollment')
         verbose_name_plural = _('enrollments')
-        ordering = ['-enrollment_date']
+        ordering = ['-enrollment_date', '-id']
         unique_together = ('client', 'program')
         indexes = [
             models.Index(fields=['enrollment_date']),
@@ -172,16 +228,200 @@ class Enrollment(TimeStampedModel):
 
 
 
+
+class ArchivedHealthProgram(BaseHealthProgram):
+    """A completed program moved out of the live table, with its enrollments; see api.archive"""
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = _('archived health program')
+        verbose_name_plural = _('archived health programs')
+        ordering = ['-start_date', '-id']
+
+
+class ArchivedEnrollment(BaseEnrollment):
+    """An enrollment in an archived program"""
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='archived_enrollments')
+    program = models.ForeignKey(ArchivedHealthProgram, on_delete=models.CASCADE, related_name='enrollments')
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = _('archived enrollment')
+        verbose_name_plural = _('archived enrollments')
+        ordering = ['-enrollment_date', '-id']
+
+
+class HealthProgramRecord(BaseHealthProgram):
+    """
+    Live and archived programs together, read from the
+    ``api_healthprogram_all`` view (UNION ALL of both tables) when a
+    request asks for ``include_archived``.
+    """
+    archived = models.BooleanField()
+    clients = models.ManyToManyField(Client, through='EnrollmentRecord', related_name='+')
+
+    class Meta:
+        managed = False
+        db_table = 'api_healthprogram_all'
+        ordering = ['-start_date', '-id']
+
+
+class EnrollmentRecord(BaseEnrollment):
+    """Live and archived enrollments together, read from the ``api_enrollment_all`` view"""
+    client = models.ForeignKey(
+        Client, on_delete=models.DO_NOTHING, db_constraint=False, related_name='all_enrollments'
+    )
+    program = models.ForeignKey(
+        HealthProgramRecord, on_delete=models.DO_NOTHING, db_constraint=False, related_name='enrollments'
+    )
+    archived = models.BooleanField()
+
+    class Meta:
+        managed = False
+        db_table = 'api_enrollment_all'
+        ordering = ['-enrollment_date', '-id']
+
+class ChangeLog(models.Model):
+    """
+    Append-only log of client, program and enrollment changes read by the
+    delta sync API. Rows are written by database triggers (see migration
+    0003), so bulk and raw SQL writes are captured too. ``txid`` is the
+    writing transaction's id and orders entries by commit visibility.
+    Entries older than ``SYNC_RETENTION_DAYS`` are pruned once superseded,
+    and tombstones once that old.
+    """
+    RESOURCE_CHOICES = (
+        ('clients', 'Clients'),
+        ('programs', 'Programs'),
+        ('enrollments', 'Enrollments'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    txid = models.BigIntegerField()
+    resource = models.CharField(max_length=20, choices=RESOURCE_CHOICES)
+    object_id = models.UUIDField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        action = 'deleted' if self.deleted else 'changed'
+        return f"{self.resource} {self.object_id} {action}"
+
+    class Meta:
+        ordering = ['txid', 'id']
+        indexes = [
+            models.Index(fields=['txid', 'id']),
+            models.Index(fields=['resource', 'object_id']),
+        ]
+
+
+class SyncHorizon(models.Model):
+    """
+    The oldest change log position a sync token may resume from. Pruning
+    (see api.sync.prune_changes) moves it past every tombstone it deletes;
+    tokens behind it could miss deletions and must sync from scratch.
+    """
+    txid = models.BigIntegerField()
+    change_id = models.BigIntegerField()
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Sync horizon at {self.txid}.{self.change_id}"
+
+
 class AuthToken(models.Model):
-    """Simple authentication token model"""
-    key = models.CharField(max_length=40, primary_key=True)
+    """
+    API token. Only the SHA-256 digest of the key is stored, so keys are
+    fixed width and a copy of the table cannot be used to authenticate.
+    ``expires_at`` is the earlier of the absolute lifetime and the idle
+    timeout after ``last_used``; see api.tokens.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
     user = models.ForeignKey('User', on_delete=models.CASCADE, related_name='auth_tokens')
-    created = models.DateTimeField(auto_now_add=True)
-    
-    def save(self, *args, **kwargs):
-        if not self.key:
-            self.key = str(uuid.uuid4())
-        return super().save(*args, **kwargs)
+    created = models.DateTimeField(default=timezone.now)
+    last_used = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
     
     def __str__(self):
-        return f"{self.user.email}'s token"
\ No newline at end of file
+        return f"{self.user.email}'s token"
+
+
+class RevokedToken(models.Model):
+    """
+    A signed (JWT) token revoked before it expired. Rows are only needed
+    until ``expires_at``; api.revocation keeps them in a per-process
+    filter so requests are not checked against this table.
+    """
+    id = models.BigAutoField(primary_key=True)
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Revoked token {self.jti}"
+
+
+class Job(models.Model):
+    """
+    A unit of background work, queued in this table and claimed by
+    ``manage.py run_workers`` with ``SELECT ... FOR UPDATE SKIP LOCKED``;
+    see api.jobs. Higher ``priority`` runs first, and a job does not run
+    before ``run_at``, which is also how retries are delayed.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    task = models.CharField(max_length=100)
+    args = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.SmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    progress = models.FloatField(default=0.0)
+    progress_message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            # Only queued rows are scanned when claiming, in claim order
+            models.Index(
+                models.F('priority').desc(), 'run_at', 'id',
+                name='job_queued_idx', condition=models.Q(status='queued'),
+            ),
+            models.Index(fields=['status', 'heartbeat_at']),
+        ]
+
+
+class JobSchedule(models.Model):
+    """
+    When a periodic job (``JOB_SCHEDULES``) is next due. Workers lock due
+    rows with SKIP LOCKED, so each run is enqueued once however many
+    workers are running.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    next_run_at = models.DateTimeField()
+    last_job = models.ForeignKey(Job, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+
+    def __str__(self):
+        return f"{self.name} next at {self.next_run_at}"
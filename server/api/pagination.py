@@ -1,6 +1,88 @@
+import json
+
+from django.core.paginator import InvalidPage, Paginator
+from django.db import connections
+from django.http import StreamingHttpResponse
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 
+from .renderers import render_list_chunks
+
+
+def estimated_count(queryset):
+    """Return the planner's estimate of the rows ``queryset`` matches, without running it"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that reports the planner's row estimate for large querysets.
+
+    An exact COUNT(*) scans every matching row on each page view. When the
+    estimate is below ``exact_threshold`` the count is still exact, so
+    small tables and narrow filters show true totals.
+    """
+    exact_threshold = 10_000
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return super().count
+        estimate = estimated_count(self.object_list)
+        if estimate < self.exact_threshold:
+            return super().count
+        return estimate
+
+
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+    def paginate_queryset_lazily(self, queryset, request, view=None):
+        """
+        Paginate like ``paginate_queryset`` but return the unevaluated page
+        queryset, so rows can be streamed from the database cursor.
+        """
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        return self.page.object_list
+
+    def get_streaming_response(self, chunks, renderer):
+        """
+        Stream the paginated envelope, rendering ``chunks`` of results as
+        they are produced. The bytes match ``get_paginated_response`` output.
+        """
+        envelope = renderer.render({
+            'count': self.page.paginator.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        })
+
+        def content():
+            yield envelope[:-1] + b',"results":['
+            yield from render_list_chunks(renderer, chunks)
+            yield b']}'
+
+        return StreamingHttpResponse(content(), content_type=renderer.media_type)
@@ -0,0 +1,75 @@
+from rest_framework.utils import encoders
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from . import tracing
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson writes U+2028/U+2029 raw; DRF escapes them so output stays valid JavaScript.
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson.
+
+    UUIDs are encoded natively. Dates and datetimes are passed through to
+    DRF's encoder so their format matches the default renderer. Falls back
+    to the stdlib renderer when orjson is not installed.
+    """
+    encoder = encoders.JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with tracing.span('render', renderer=type(self).__name__):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if data is None:
+            return b''
+
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(data, default=self.encoder.default, option=option)
+        if LINE_SEPARATOR in ret or PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(LINE_SEPARATOR, b'\\u2028').replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSON parser backed by orjson, falling back to the stdlib parser"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+def render_list_chunks(renderer, chunks):
+    """
+    Render an iterable of row lists as the body of a JSON array.
+
+    Each chunk is rendered on its own so rows can be produced, encoded and
+    sent incrementally instead of building the whole array in memory.
+    """
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        body = renderer.render(chunk)[1:-1]
+        yield body if first else b',' + body
+        first = False
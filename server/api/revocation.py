@@ -0,0 +1,193 @@
+"""
+Revocation of signed (JWT) tokens without a lookup per request.
+
+Access tokens are verified from their signature alone, so the only state
+a request needs is whether the token's ``jti`` was revoked before it
+expired. Each process keeps every unexpired revoked ID in a Bloom filter,
+a bit array of about 10 bits per ID at a 1% false-positive rate, and
+reads new rows from ``RevokedToken`` at most every
+``JWT_REVOCATION_SYNC_SECONDS``. A token missing from the filter is
+certainly not revoked, which is the common case and costs no query. A
+filter hit is confirmed against the table once and the answer kept in an
+exact set, so a false positive costs one query per token ID.
+
+Revocations made by another process are seen after at most one sync
+interval. IDs are assigned when a row is inserted, not when it commits,
+so a sync can see row 12 before row 11 commits; IDs skipped over are
+kept as gaps and read again at each sync for
+``JWT_REVOCATION_GAP_SECONDS``, the longest a revoking transaction is
+expected to stay open. Bits cannot be cleared from a Bloom filter, so the filter is
+rebuilt from the unexpired rows every ``JWT_REVOCATION_REBUILD_SECONDS``
+or when it fills past its capacity.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import metrics
+from .models import RevokedToken
+
+# Most skipped IDs kept per jump; a larger jump is a burst of rolled-back
+# inserts or a sequence cache, not open transactions
+MAX_GAPS = 1000
+
+
+class BloomFilter:
+    """Set membership with false positives but no false negatives, in ``size`` bits"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / self.capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Two independent 64-bit hashes combined as h1 + i*h2 (Kirsch and Mitzenmacher)
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationList:
+    """The process-wide view of revoked token IDs; see the module docstring"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.filter = BloomFilter(settings.JWT_REVOCATION_CAPACITY)
+            self.revoked = set()
+            self.not_revoked = set()
+            self.last_id = 0
+            self.gaps = {}
+            self.synced_at = None
+            self.built_at = None
+
+    def revoke(self, jti, exp):
+        """
+        Revoke ``jti`` until the Unix time ``exp`` when the token expires;
+        returns False if it was already revoked.
+        """
+        expires_at = datetime.fromtimestamp(exp, tz=dt_timezone.utc)
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        with self.lock:
+            self.filter.add(jti)
+            self.revoked.add(jti)
+            self.not_revoked.discard(jti)
+        return True
+
+    def is_revoked(self, jti):
+        self.sync()
+        # A hit is an answer from memory: not in the filter, or confirmed before
+        if jti not in self.filter:
+            metrics.cache_requests.inc('revocation', 'hit')
+            return False
+        if jti in self.revoked or jti in self.not_revoked:
+            metrics.cache_requests.inc('revocation', 'hit')
+            return jti in self.revoked
+        metrics.cache_requests.inc('revocation', 'miss')
+        revoked = RevokedToken.objects.filter(jti=jti).exists()
+        with self.lock:
+            (self.revoked if revoked else self.not_revoked).add(jti)
+        return revoked
+
+    def sync(self, force=False):
+        """Read revocations made since the last sync, or rebuild the filter when it is due"""
+        now = time.monotonic()
+        if not force and self.synced_at is not None and now - self.synced_at < settings.JWT_REVOCATION_SYNC_SECONDS:
+            return
+        with self.lock:
+            if not force and self.synced_at is not None and now - self.synced_at < settings.JWT_REVOCATION_SYNC_SECONDS:
+                return
+            self.synced_at = now
+            rebuild = (
+                self.built_at is None
+                or now - self.built_at >= settings.JWT_REVOCATION_REBUILD_SECONDS
+                or self.filter.count > self.filter.capacity
+            )
+            if rebuild:
+                self._rebuild(now)
+                return
+            rows = list(
+                RevokedToken.objects.filter(Q(id__gt=self.last_id) | Q(id__in=list(self.gaps)))
+                .order_by('id').values_list('id', 'jti')
+            )
+            for row_id, jti in rows:
+                self.filter.add(jti)
+                self.not_revoked.discard(jti)
+                self.gaps.pop(row_id, None)
+                if row_id > self.last_id:
+                    self._skip(self.last_id, row_id, now)
+                    self.last_id = row_id
+            self._expire_gaps(now)
+
+    def _rebuild(self, now):
+        # Rows added after last_id are picked up by the next sync
+        last_id = RevokedToken.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        rows = list(
+            RevokedToken.objects.filter(id__lte=last_id, expires_at__gt=timezone.now())
+            .order_by('id').values_list('id', 'jti')
+        )
+        self.filter = BloomFilter(max(settings.JWT_REVOCATION_CAPACITY, 2 * len(rows)))
+        # Only recent IDs can belong to open transactions; older gaps are pruned or rolled back rows
+        previous = max(last_id - MAX_GAPS, 0)
+        for row_id, jti in rows:
+            self.filter.add(jti)
+            self.gaps.pop(row_id, None)
+            if row_id > previous:
+                self._skip(previous, row_id, now)
+                previous = row_id
+        self._skip(previous, last_id + 1, now)
+        self.last_id = last_id
+        self._expire_gaps(now)
+        self.revoked, self.not_revoked = set(), set()
+        self.built_at = now
+
+    def _skip(self, previous, row_id, now):
+        """Remember the IDs between ``previous`` and ``row_id`` as possibly uncommitted"""
+        for missing in range(max(previous + 1, row_id - MAX_GAPS), row_id):
+            self.gaps.setdefault(missing, now)
+
+    def _expire_gaps(self, now):
+        self.gaps = {
+            row_id: seen_at for row_id, seen_at in self.gaps.items()
+            if now - seen_at < settings.JWT_REVOCATION_GAP_SECONDS
+        }
+
+
+revocations = RevocationList()
+
+
+def prune_revoked(batch_size=1000):
+    """Delete revocations of tokens that have expired anyway; returns the number deleted"""
+    deleted = 0
+    while True:
+        batch = list(
+            RevokedToken.objects.filter(expires_at__lte=timezone.now())
+            .order_by().values_list('id', flat=True)[:batch_size]
+        )
+        if not batch:
+            return deleted
+        deleted += RevokedToken.objects.filter(id__in=batch).delete()[0]
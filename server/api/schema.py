@@ -0,0 +1,172 @@
+"""
+Precomputed OpenAPI schema.
+
+Generating the schema introspects every viewset, serializer and filter,
+which takes hundreds of milliseconds, so it is done once: by
+``manage.py generate_schema`` at deploy time, or on the first schema
+request when no artifact exists. The JSON and YAML encodings are written
+to ``SCHEMA_ARTIFACT_DIR`` as ``openapi-<version>-<source>.json``/``.yaml``,
+where ``<source>`` is a digest of the api package, the root URLconf,
+the settings that add or remove URLs and the schema libraries, so an
+artifact left from other code or configuration is never served. Each
+process keeps them in memory, with a strong ETag from a digest of the
+bytes, so schema requests are a dictionary lookup and revalidations
+answer ``304 Not Modified``.
+
+The schema is generated as public (every endpoint, not only those the
+requesting user can call), so one artifact serves every user.
+"""
+import functools
+import hashlib
+import importlib.util
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import drf_yasg
+import rest_framework
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.renderers import _SpecRenderer
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+logger = logging.getLogger(__name__)
+
+API_VERSION = 'v1'
+
+API_INFO = openapi.Info(
+    title="Health Information System API",
+    default_version=API_VERSION,
+    description="API for managing health programs and clients",
+    terms_of_service="https://www.yourapp.com/terms/",
+    contact=openapi.Contact(email="contact@yourapp.com"),
+    license=openapi.License(name="BSD License"),
+)
+
+# Artifact file suffix and codec for each encoding served
+ENCODINGS = {'json': OpenAPICodecJson, 'yaml': OpenAPICodecYaml}
+
+# Settings that add or remove URLs, and so change the schema
+URL_SETTINGS = ('JWT_ENABLED', 'API_DOCS_ENABLED')
+
+_artifacts = {}
+_lock = threading.Lock()
+
+
+class SchemaArtifact:
+    """One encoding of the schema, with its strong ETag"""
+
+    def __init__(self, content):
+        self.content = content
+        self.etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def source_digest():
+    """Digest of what the schema is generated from, for the current settings"""
+    return _source_digest(settings.ROOT_URLCONF, tuple(getattr(settings, name) for name in URL_SETTINGS))
+
+
+@functools.cache
+def _source_digest(urlconf, url_settings):
+    digest = hashlib.sha256(f'{drf_yasg.__version__} {rest_framework.VERSION} {url_settings}'.encode())
+    digest.update(Path(importlib.util.find_spec(urlconf).origin).read_bytes())
+    package = Path(__file__).resolve().parent
+    for path in sorted(package.rglob('*.py')):
+        relative = path.relative_to(package)
+        if relative.parts[0] in ('tests', 'migrations', 'benchmarks'):
+            continue
+        digest.update(str(relative).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def artifact_path(encoding, version=None):
+    name = f'openapi-{version or API_VERSION}-{source_digest()}.{encoding}'
+    return Path(settings.SCHEMA_ARTIFACT_DIR) / name
+
+
+def generate_schema():
+    """Introspect the API and return its encodings, keyed by encoding name"""
+    generator = schema_view.generator_class(API_INFO, API_VERSION)
+    schema = generator.get_schema(request=None, public=True)
+    return {encoding: codec([]).encode(schema) for encoding, codec in ENCODINGS.items()}
+
+
+def write_artifacts(encoded):
+    """Write the encodings to the artifact directory, replacing each file atomically"""
+    directory = Path(settings.SCHEMA_ARTIFACT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for encoding, content in encoded.items():
+        path = artifact_path(encoding)
+        handle, temporary = tempfile.mkstemp(dir=directory, prefix='.openapi-')
+        with os.fdopen(handle, 'wb') as output:
+            output.write(content)
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+        paths.append(path)
+    # Artifacts of earlier code are never read again
+    for stale in directory.glob(f'openapi-{API_VERSION}-*'):
+        if stale not in paths:
+            stale.unlink(missing_ok=True)
+    return paths
+
+
+def reset():
+    """Forget the schema held in memory, so the next request reads the artifact again"""
+    _artifacts.clear()
+
+
+def get_artifact(encoding):
+    """The schema in ``encoding``, read from the artifact or generated on first use"""
+    artifact = _artifacts.get(encoding)
+    if artifact is not None:
+        return artifact
+    with _lock:
+        if not _artifacts:
+            encoded = {}
+            try:
+                for name in ENCODINGS:
+                    encoded[name] = artifact_path(name).read_bytes()
+            except FileNotFoundError:
+                logger.info("No schema artifact in %s, generating it", settings.SCHEMA_ARTIFACT_DIR)
+                encoded = generate_schema()
+                try:
+                    write_artifacts(encoded)
+                except OSError as e:
+                    logger.warning("Could not write the schema artifact: %s", e)
+            _artifacts.update({name: SchemaArtifact(content) for name, content in encoded.items()})
+    return _artifacts[encoding]
+
+
+schema_view = get_schema_view(
+    API_INFO,
+    public=True,
+    permission_classes=(permissions.IsAuthenticated,),
+)
+
+
+class SchemaView(schema_view):
+    """Serve the schema from the precomputed artifact; the UI pages only render their template"""
+
+    def get(self, request, version='', format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, _SpecRenderer):
+            return super().get(request, version, format)
+        artifact = get_artifact('yaml' if issubclass(renderer.codec_class, OpenAPICodecYaml) else 'json')
+        response = HttpResponse(artifact.content, content_type=f'{renderer.media_type}; charset=utf-8')
+        response['ETag'] = artifact.etag
+        patch_cache_control(response, private=True, max_age=settings.SCHEMA_CACHE_SECONDS)
+        return get_conditional_response(request, etag=artifact.etag, response=response)
+
+
+# Views for api.urls, which imports this module on the first schema request (see api.startup.lazy_view)
+schema_json_view = SchemaView.without_ui()
+swagger_ui_view = SchemaView.with_ui('swagger')
+redoc_view = SchemaView.with_ui('redoc')
@@ -1,7 +1,10 @@
 from rest_framework import serializers
-from .models import User, HealthProgram, Client, Enrollment
+from .models import User, HealthProgram, Client, Enrollment, Job, HealthProgramRecord, EnrollmentRecord
+from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
+from .expansion import ExpandableFieldsMixin
+from .jobs import enqueue, registered_tasks
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for User model"""
@@ -12,9 +15,22 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'is_staff')
 
 
-class HealthProgramSerializer(serializers.ModelSerializer):
+class ClientSummarySerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    """Compact client representation used when expanding a program's clients"""
+
+    class Meta:
+        model = Client
+        fields = ('id', 'first_name', 'last_name')
+        read_only_fields = fields
+
+
+class HealthProgramSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """Serializer for HealthProgram model"""
     enrolled_clients = serializers.IntegerField(source='enrolled_clients_count', read_only=True)
+
+    expandable_fields = {
+        'clients': (ClientSummarySerializer, {'source': 'expanded_clients', 'many': True, 'read_only': True}),
+    }
     
     class Meta:
         model = HealthProgram
@@ -36,17 +52,21 @@ class HealthProgramSerializer(serializers.ModelSerializer):
         return data
 
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """Serializer for the Enrollment model"""
     program_id = serializers.UUIDField(source='program.id', read_only=True)
     enrollment_date = serializers.DateField(read_only=True)
+
+    expandable_fields = {
+        'program': (HealthProgramSerializer, {'read_only': True}),
+    }
     
     class Meta:
         model = Enrollment
         fields = ('program_id', 'enrollment_date', 'status')
 
 
-class ClientSerializer(serializers.ModelSerializer):
+class ClientSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """Serializer for Client model"""
     programs = EnrollmentSerializer(source='enrollments', many=True, read_only=True)
     
@@ -58,6 +78,48 @@ class ClientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'registration_date', 'created_at', 'updated_at')
 
 
+
+class HealthProgramRecordSerializer(HealthProgramSerializer):
+    """Read-only serializer for live and archived programs (include_archived)"""
+
+    class Meta(HealthProgramSerializer.Meta):
+        model = HealthProgramRecord
+        fields = HealthProgramSerializer.Meta.fields + ('archived',)
+        read_only_fields = fields
+
+
+class EnrollmentRecordSerializer(EnrollmentSerializer):
+    """Read-only serializer for live and archived enrollments (include_archived)"""
+    expandable_fields = {
+        'program': (HealthProgramRecordSerializer, {'read_only': True}),
+    }
+
+    class Meta(EnrollmentSerializer.Meta):
+        model = EnrollmentRecord
+        fields = EnrollmentSerializer.Meta.fields + ('archived',)
+
+
+class ClientWithArchiveSerializer(ClientSerializer):
+    """Client serializer listing archived enrollments too (include_archived)"""
+    programs = EnrollmentRecordSerializer(source='all_enrollments', many=True, read_only=True)
+
+
+class RestoreProgramsSerializer(serializers.Serializer):
+    """Archived programs to restore"""
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=1000)
+
+class EnrollmentSyncSerializer(serializers.ModelSerializer):
+    """Serializer for enrollments in delta sync responses"""
+    client_id = serializers.UUIDField(read_only=True)
+    program_id = serializers.UUIDField(read_only=True)
+
+    class Meta:
+        model = Enrollment
+        fields = ('id', 'client_id', 'program_id', 'enrollment_date', 'status', 'notes',
+                  'created_at', 'updated_at')
+        read_only_fields = fields
+
+
 class ClientEnrollmentSerializer(serializers.Serializer):
     """Serializer for enrolling a client in a program"""
     program_id = serializers.UUIDField()
@@ -144,7 +206,61 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         
         return user
     
-    
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """Serializer for one sub-request of a batch"""
+    METHOD_CHOICES = ('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+    id = serializers.CharField(required=False, max_length=100)
+    method = serializers.ChoiceField(choices=METHOD_CHOICES, default='GET')
+    path = serializers.CharField(max_length=2000)
+    body = serializers.JSONField(required=False, allow_null=True)
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    """Serializer for a batch of API sub-requests"""
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        """Limit the number of sub-requests in one batch"""
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f"A batch can contain at most {settings.BATCH_MAX_REQUESTS} requests"
+            )
+        return value
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for background jobs; only the task and how to run it can be written"""
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'task', 'args', 'status', 'priority', 'run_at', 'attempts', 'max_attempts',
+            'progress', 'progress_message', 'result', 'error', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = [
+            'status', 'attempts', 'progress', 'progress_message', 'result', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+        extra_kwargs = {'run_at': {'required': False}, 'max_attempts': {'required': False}}
+
+    def validate_task(self, value):
+        if value not in registered_tasks():
+            raise serializers.ValidationError(f"Unknown task '{value}'")
+        return value
+
+    def validate_args(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Expected an object of keyword arguments")
+        return value
+
+    def create(self, validated_data):
+        return enqueue(**validated_data)
+
+
 # from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 # class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
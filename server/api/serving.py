@@ -0,0 +1,227 @@
+"""
+Production serving for ``manage.py serve``, built on gunicorn.
+
+The master process loads the application before forking (``preload_app``),
+so Django, the URLconf and the warm-up in ``core.wsgi``/``core.asgi`` run
+once and their memory is shared by every worker. The collector is
+disabled while loading and the loaded objects are frozen
+(``gc.freeze()``) before the first fork: collections in the workers then
+never touch, and so never copy, those shared pages.
+
+Workers are ``sync`` (one request at a time), ``threads`` (gunicorn's
+``gthread``) or ``asgi`` (uvicorn's worker, needed for the event stream;
+uvicorn is an optional dependency). Each worker is replaced after
+``SERVE_MAX_REQUESTS`` requests, plus random jitter so they do not all
+restart together, and once its resident memory passes
+``SERVE_WORKER_MAX_MEMORY_MB``. In both cases it finishes its current
+requests first.
+
+``rolling_reload`` deploys new code without refusing connections: the
+running master re-executes itself (``SIGUSR2``), the new master takes
+over the listening sockets and starts its workers, and only then is the
+old master stopped gracefully.
+"""
+import gc
+import logging
+import os
+import resource
+import signal
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, connections
+from gunicorn.app.base import BaseApplication
+
+logger = logging.getLogger(__name__)
+
+# serve --worker-class choices and the gunicorn worker classes they select
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'threads': 'gthread',
+    'asgi': 'uvicorn.workers.UvicornWorker',
+}
+
+
+def rss_bytes():
+    """Resident memory of this process, or its peak where /proc is not available"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryWatchdog(threading.Thread):
+    """Call ``on_exceeded`` once, when this process's memory passes ``limit`` bytes"""
+
+    def __init__(self, limit, on_exceeded, interval=5.0):
+        super().__init__(name='memory-watchdog', daemon=True)
+        self.limit = limit
+        self.on_exceeded = on_exceeded
+        self.interval = interval
+        self.stop = threading.Event()
+
+    def run(self):
+        while not self.stop.wait(self.interval):
+            rss = rss_bytes()
+            if rss > self.limit:
+                logger.warning("Worker %s uses %.0f MB, over its limit; restarting it", os.getpid(), rss / 2 ** 20)
+                self.on_exceeded()
+                return
+
+
+def when_ready(server):
+    # The master's warm-up may have connected; forked workers must not share that connection
+    connections.close_all()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    gc.enable()
+
+
+def post_worker_init(worker):
+    if worker.app.max_memory_mb:
+        # SIGTERM makes the worker finish its current requests and exit; the master starts a new one
+        MemoryWatchdog(worker.app.max_memory_mb * 2 ** 20, lambda: os.kill(os.getpid(), signal.SIGTERM)).start()
+    if worker.cfg.worker_class_str == 'sync':
+        connection.ensure_connection()
+
+
+def worker_exit(server, worker):
+    # Counts recorded since the last periodic snapshot would otherwise be lost with the worker
+    from .metrics import registry
+
+    registry.flush()
+
+
+def gunicorn_options(bind=None, workers=None, worker_class=None, threads=None, max_requests=None,
+                     max_requests_jitter=None, timeout=None, graceful_timeout=None, pidfile=None):
+    """gunicorn settings for ``serve``, from the arguments given and the SERVE_* settings"""
+    worker_class = worker_class or settings.SERVE_WORKER_CLASS
+    if worker_class not in WORKER_CLASSES:
+        raise ValueError(f'Unknown worker class {worker_class!r}')
+    return {
+        'bind': bind or settings.SERVE_BIND,
+        'workers': workers or settings.SERVE_WORKERS,
+        'worker_class': WORKER_CLASSES[worker_class],
+        'threads': (threads or settings.SERVE_THREADS) if worker_class == 'threads' else 1,
+        'max_requests': settings.SERVE_MAX_REQUESTS if max_requests is None else max_requests,
+        'max_requests_jitter': (
+            settings.SERVE_MAX_REQUESTS_JITTER if max_requests_jitter is None else max_requests_jitter
+        ),
+        'timeout': timeout or settings.SERVE_TIMEOUT,
+        'graceful_timeout': graceful_timeout or settings.SERVE_GRACEFUL_TIMEOUT,
+        'keepalive': settings.SERVE_KEEPALIVE,
+        'pidfile': pidfile or settings.SERVE_PIDFILE,
+        'preload_app': True,
+        'when_ready': when_ready,
+        'post_fork': post_fork,
+        'post_worker_init': post_worker_init,
+        'worker_exit': worker_exit,
+    }
+
+
+class ServeApplication(BaseApplication):
+    """
+    The Django application under gunicorn, configured from a dict of
+    gunicorn settings; workers over ``max_memory_mb`` (0 for no limit)
+    are replaced.
+    """
+
+    def __init__(self, options, max_memory_mb=None):
+        self.options = options
+        self.max_memory_mb = settings.SERVE_WORKER_MAX_MEMORY_MB if max_memory_mb is None else max_memory_mb
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        gc.disable()
+        if self.cfg.worker_class_str == WORKER_CLASSES['asgi']:
+            from core.asgi import application
+        else:
+            from core.wsgi import application
+        return application
+
+
+def read_pid(path):
+    try:
+        with open(path) as pidfile:
+            return int(pidfile.read().strip() or 0) or None
+    except (OSError, ValueError):
+        return None
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def children(pid):
+    """IDs of the child processes of ``pid``, or None where /proc is not available"""
+    if not os.path.isdir('/proc'):
+        return None
+    found = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat:
+                # The parent ID follows the state, after the parenthesised command name
+                parent = int(stat.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if parent == pid:
+            found.append(int(entry))
+    return found
+
+
+def _wait_for(condition, deadline, interval=0.1):
+    while time.monotonic() < deadline:
+        result = condition()
+        if result:
+            return result
+        time.sleep(interval)
+    return None
+
+
+def rolling_reload(pidfile, timeout=60.0, settle=2.0):
+    """
+    Replace the server whose master's PID is in ``pidfile`` with one
+    running the current code, without closing its sockets; returns the
+    new master's PID. Raises RuntimeError, leaving the old server
+    running, if the new one does not start its workers within ``timeout``.
+    """
+    old = read_pid(pidfile)
+    if old is None or not is_running(old):
+        raise RuntimeError(f'No server running with the PID in {pidfile}')
+    workers = children(old)
+    deadline = time.monotonic() + timeout
+    os.kill(old, signal.SIGUSR2)
+
+    new = _wait_for(lambda: read_pid(f'{pidfile}.2'), deadline)
+    started = new and _wait_for(
+        lambda: not is_running(new) or workers is None or len(children(new)) >= len(workers), deadline
+    )
+    if not started or not is_running(new):
+        if new and is_running(new):
+            os.kill(new, signal.SIGTERM)
+        raise RuntimeError('The new server did not start its workers; the old one is still serving')
+    if workers is None:
+        time.sleep(settle)
+
+    # The old master stops accepting, lets its workers finish their requests and exits
+    os.kill(old, signal.SIGTERM)
+    _wait_for(lambda: not is_running(old), time.monotonic() + settings.SERVE_GRACEFUL_TIMEOUT + 5)
+    return new
@@ -0,0 +1,98 @@
+"""
+Signed (JWT) access and refresh tokens, built on simplejwt.
+
+Everything that imports simplejwt lives here, and nothing else imports
+this module unless ``JWT_ENABLED`` is set, so nodes that only accept
+``Token`` keys never load it.
+"""
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer, TokenRefreshSerializer, TokenVerifySerializer,
+)
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken, Token, UntypedToken
+
+from .models import User
+from .revocation import revocations
+
+__all__ = [
+    'JWTAuthentication', 'AccessTokenObtainPairSerializer', 'RotatingTokenRefreshSerializer',
+    'RevocationAwareTokenVerifySerializer', 'revoke_signed_tokens', 'TokenError',
+]
+
+
+class JWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    ``Authorization: Bearer <access token>`` authentication from the
+    token's signature and claims alone. The user is a ``TokenUser`` built
+    from the claims, not loaded from the database, and revocation is
+    checked against the in-memory filter in api.revocation.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if revocations.is_revoked(token['jti']):
+            raise InvalidToken('Token has been revoked.')
+        return token
+
+
+class AccessTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Issue a signed access/refresh pair for an email and password. The
+    claims carry what ``TokenUser`` needs, so requests made with the
+    access token never load the user.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        return token
+
+
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Exchange a refresh token for a new access and refresh token. The
+    presented refresh token is revoked in the same step, so each one can
+    be used once and a replayed (possibly stolen) token is refused. The
+    user is loaded here, so deactivation and changed claims take effect
+    at the next refresh.
+    """
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        if not revocations.revoke(refresh['jti'], refresh['exp']):
+            raise InvalidToken('Token has been revoked.')
+        user = User.objects.filter(pk=refresh.get(jwt_settings.USER_ID_CLAIM)).first()
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        token = AccessTokenObtainPairSerializer.get_token(user)
+        return {'access': str(token.access_token), 'refresh': str(token)}
+
+
+class RevocationAwareTokenVerifySerializer(TokenVerifySerializer):
+    """
+    Check a token's signature and expiry, and refuse it once revoked by
+    logout or spent by a refresh, as authentication does.
+    """
+
+    def validate(self, attrs):
+        token = UntypedToken(attrs['token'])
+        if revocations.is_revoked(token['jti']):
+            raise InvalidToken('Token has been revoked.')
+        return {}
+
+
+def revoke_signed_tokens(auth, refresh=None):
+    """
+    Revoke ``auth`` if it is a signed access token, and the encoded
+    ``refresh`` token if given; raises TokenError for an invalid one.
+    """
+    if isinstance(auth, Token):
+        revocations.revoke(auth['jti'], auth['exp'])
+    if refresh:
+        refresh = RefreshToken(refresh)
+        revocations.revoke(refresh['jti'], refresh['exp'])
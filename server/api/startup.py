@@ -0,0 +1,231 @@
+"""
+Worker start-up: profiling, lazy views and warm-up.
+
+``profile_startup`` starts a fresh interpreter with ``-X importtime``. That
+interpreter runs this module's ``main``, which goes through each start-up
+phase (settings, app registry, request handler, URLconf and, optionally,
+warm-up), so the report can charge each imported module to its phase.
+The module only imports the standard library at the top, so the profile
+sees a true cold start. ``manage.py startup_profile`` prints the report.
+
+``warm_up`` does the work a worker would otherwise do on its first
+requests: it loads the URLconf and the DRF settings classes, fills the
+model metadata caches and builds the fields of every viewset serializer.
+``core.wsgi`` and ``core.asgi`` call it when ``WARM_UP_ON_STARTUP`` is set.
+"""
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+PHASE_MARKER = 'startup-phase:'
+
+IMPORT_TIME_PREFIX = 'import time:'
+
+
+def lazy_view(path):
+    """
+    A view that imports the DRF view at dotted ``path`` on its first
+    request, for routes most workers never serve. Only use it for DRF
+    views: like them, it is exempt from the CSRF middleware.
+    """
+    from django.utils.module_loading import import_string
+
+    view = None
+
+    def lazy(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(path)
+        return view(request, *args, **kwargs)
+
+    lazy.csrf_exempt = True
+    return lazy
+
+
+def _serializer_classes(viewset):
+    yield viewset.serializer_class
+    # Alternate serializers for include_archived reads (see api.views.ArchiveReadMixin)
+    yield getattr(viewset, 'with_archived', {}).get('serializer_class')
+
+
+def warm_up(connect=True):
+    """
+    Prime URL resolvers, model metadata and serializer fields, and open
+    the default database connection if ``connect`` is set (never before
+    forking workers); returns the seconds spent on each step.
+    """
+    from django.apps import apps
+    from django.db import DatabaseError, connection
+    from django.urls import get_resolver
+    from rest_framework.settings import api_settings
+
+    timings = {}
+
+    def step(name, func):
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            logger.exception("Warm-up step %s failed", name)
+        timings[name] = time.perf_counter() - start
+
+    def urls():
+        resolver = get_resolver()
+        resolver.url_patterns
+        resolver.reverse_dict
+
+    def rest_framework_settings():
+        for name in ('DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_RENDERER_CLASSES',
+                     'DEFAULT_PARSER_CLASSES', 'DEFAULT_FILTER_BACKENDS', 'DEFAULT_THROTTLE_CLASSES',
+                     'DEFAULT_PAGINATION_CLASS', 'EXCEPTION_HANDLER'):
+            getattr(api_settings, name)
+
+    def models():
+        for model in apps.get_models():
+            model._meta.get_fields()
+            model._meta.fields_map
+            model._meta._forward_fields_map
+
+    def serializers():
+        from .urls import router
+
+        for _, viewset, _ in router.registry:
+            for serializer_class in _serializer_classes(viewset):
+                if serializer_class is not None:
+                    serializer_class().fields
+
+    def database():
+        try:
+            connection.ensure_connection()
+        except DatabaseError as e:
+            logger.warning("Warm-up could not connect to the database: %s", e)
+
+    step('urls', urls)
+    step('rest_framework', rest_framework_settings)
+    step('models', models)
+    step('serializers', serializers)
+    if connect:
+        step('database', database)
+    logger.info("Warm-up took %.0fms", sum(timings.values()) * 1000)
+    return timings
+
+
+def _phases(warm):
+    """The start-up phases, in order, as (name, callable) pairs"""
+
+    def settings():
+        from django.conf import settings
+
+        settings.INSTALLED_APPS
+
+    def apps():
+        import django
+
+        django.setup(set_prefix=False)
+
+    def handler():
+        from django.core.handlers.wsgi import WSGIHandler
+
+        WSGIHandler()
+
+    def urls():
+        from django.urls import get_resolver
+
+        get_resolver().url_patterns
+
+    phases = [('settings', settings), ('apps', apps), ('handler', handler), ('urls', urls)]
+    if warm:
+        phases.append(('warm-up', lambda: warm_up(connect=False)))
+    return phases
+
+
+def main(argv):
+    """
+    Run the start-up phases, marking each on stderr, and print each one's
+    duration and newly loaded modules as JSON. ``-X importtime`` only times
+    ``import`` statements, so modules loaded with ``importlib`` (such as
+    installed apps) are only seen in the latter.
+    """
+    timings = []
+    for name, func in _phases('--warm-up' in argv):
+        print(PHASE_MARKER, name, file=sys.stderr, flush=True)
+        loaded = set(sys.modules)
+        start = time.perf_counter()
+        func()
+        timings.append([name, time.perf_counter() - start, sorted(set(sys.modules) - loaded)])
+    print(json.dumps(timings))
+
+
+def parse_import_times(lines):
+    """
+    Parse ``-X importtime`` output split by phase markers into dicts with
+    the phase, module, nesting depth and self/cumulative microseconds.
+    """
+    phase = None
+    imports = []
+    for line in lines:
+        if line.startswith(PHASE_MARKER):
+            phase = line[len(PHASE_MARKER):].strip()
+            continue
+        if not line.startswith(IMPORT_TIME_PREFIX):
+            continue
+        fields = line[len(IMPORT_TIME_PREFIX):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        imports.append({
+            'phase': phase or 'interpreter',
+            'module': stripped,
+            'depth': (len(name) - len(stripped) - 1) // 2,
+            'self_us': int(fields[0]),
+            'cumulative_us': int(fields[1]),
+        })
+    return imports
+
+
+def profile_startup(warm_up=False, env=None):
+    """
+    Start a fresh interpreter through the start-up phases and return
+    ``{'phases': [...], 'imports': [...]}``; phases give seconds, the
+    modules loaded and the time spent importing, imports come from
+    parse_import_times.
+    """
+    from django.conf import settings
+
+    command = [sys.executable, '-X', 'importtime', '-m', __name__]
+    if warm_up:
+        command.append('--warm-up')
+    environment = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings')}
+    environment.update(env or {})
+    result = subprocess.run(command, cwd=settings.BASE_DIR, env=environment, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f'Start-up profile failed:\n{result.stderr[-2000:]}')
+    imports = parse_import_times(result.stderr.splitlines())
+    phases = []
+    for name, seconds, loaded in json.loads(result.stdout.strip().splitlines()[-1]):
+        phases.append({
+            'name': name,
+            'seconds': seconds,
+            'modules': loaded,
+            'import_seconds': sum(entry['self_us'] for entry in imports if entry['phase'] == name) / 1e6,
+        })
+    return {'phases': phases, 'imports': imports}
+
+
+def package_totals(imports):
+    """Self import time in seconds per top-level package, largest first"""
+    totals = {}
+    for entry in imports:
+        package = entry['module'].split('.')[0]
+        totals[package] = totals.get(package, 0) + entry['self_us'] / 1e6
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,26 @@
+"""
+Helpers for streaming responses, whose bodies are produced after the
+middleware that built them has returned.
+"""
+
+
+def when_body_closes(response, callback):
+    """
+    Call ``callback`` once the streamed body of ``response`` has been sent
+    or abandoned. A sync body runs it when the server closes the response
+    (Django closes the iterator then), an async one when iteration ends.
+    """
+    if response.is_async:
+        async def body(chunks):
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            finally:
+                callback()
+    else:
+        def body(chunks):
+            try:
+                yield from chunks
+            finally:
+                callback()
+    response.streaming_content = body(response.streaming_content)
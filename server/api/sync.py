@@ -0,0 +1,159 @@
+import base64
+import binascii
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .exceptions import ResyncRequired
+
+from .fast_serializers import (
+    client_fast_serializer,
+    program_fast_serializer,
+    enrollment_sync_fast_serializer,
+)
+from .models import ChangeLog, Client, HealthProgram, Enrollment, SyncHorizon
+
+# Model and serializer used to render each synced resource
+RESOURCES = {
+    'clients': (Client, client_fast_serializer),
+    'programs': (HealthProgram, program_fast_serializer),
+    'enrollments': (Enrollment, enrollment_sync_fast_serializer),
+}
+
+
+def encode_token(txid, change_id):
+    """Return the opaque sync token for a change log position"""
+    return base64.urlsafe_b64encode(f'{txid}.{change_id}'.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Return the ``(txid, change_id)`` position encoded in a sync token"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        txid, change_id = base64.urlsafe_b64decode(padded).decode().split('.')
+        return int(txid), int(change_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValidationError({'since': ['Invalid sync token.']})
+
+
+def visible_horizon():
+    """
+    Return the oldest transaction id that may still be running.
+
+    Change log rows are only read below this horizon: every transaction
+    under it has committed or rolled back, so no row can later appear
+    behind a position a client has already synced past.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT txid_snapshot_xmin(txid_current_snapshot())')
+        return cursor.fetchone()[0]
+
+
+def fetch_changes(since=None, limit=500):
+    """
+    Return up to ``limit`` change log entries after ``since`` as a page of
+    changes, the token to resume from and whether more entries remain.
+
+    Only the latest entry per object is returned. Updated rows carry their
+    current representation; deleted rows are returned as tombstones. A
+    token behind the pruned part of the log raises ``ResyncRequired``.
+    """
+    entries = ChangeLog.objects.filter(txid__lt=visible_horizon())
+    if since is not None:
+        txid, change_id = since
+        horizon = SyncHorizon.objects.values_list('txid', 'change_id').first()
+        if horizon is not None and since < horizon:
+            raise ResyncRequired()
+        entries = entries.filter(txid__gte=txid).exclude(txid=txid, id__lte=change_id)
+
+    entries = list(
+        entries.order_by('txid', 'id')
+        .values_list('txid', 'id', 'resource', 'object_id', 'deleted')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}
+    for _, _, resource, object_id, deleted in entries:
+        latest.pop((resource, object_id), None)
+        latest[(resource, object_id)] = deleted
+
+    current = fetch_current(
+        (resource, object_id) for (resource, object_id), deleted in latest.items() if not deleted
+    )
+
+    changes = []
+    for (resource, object_id), deleted in latest.items():
+        if deleted:
+            changes.append({'resource': resource, 'id': str(object_id), 'deleted': True, 'data': None})
+        elif (resource, object_id) in current:
+            changes.append({
+                'resource': resource,
+                'id': str(object_id),
+                'deleted': False,
+                'data': current[(resource, object_id)],
+            })
+        # A missing row was deleted by a transaction past the horizon; its tombstone comes later
+
+    if entries:
+        next_token = encode_token(entries[-1][0], entries[-1][1])
+    else:
+        next_token = encode_token(*since) if since is not None else None
+    return {'changes': changes, 'next': next_token, 'has_more': has_more}
+
+
+def fetch_current(keys):
+    """Render the current rows for ``(resource, object_id)`` keys, one query per resource"""
+    ids = {}
+    for resource, object_id in keys:
+        ids.setdefault(resource, []).append(object_id)
+
+    current = {}
+    for resource, object_ids in ids.items():
+        model, fast_serializer = RESOURCES[resource]
+        rows = list(fast_serializer.get_queryset(model.objects.filter(pk__in=object_ids)))
+        for row, item in zip(rows, fast_serializer.serialize(rows)):
+            current[(resource, row['pk'])] = item
+    return current
+
+
+def prune_changes(retention_days=None, batch_size=1000):
+    """
+    Delete change log entries older than the retention window that no sync
+    still needs: tombstones, and entries superseded by a later one for the
+    same object. The latest entry of every live object is kept, so a full
+    sync still sees every row. Returns the number of entries deleted.
+    """
+    if retention_days is None:
+        retention_days = settings.SYNC_RETENTION_DAYS
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    newer = ChangeLog.objects.filter(resource=OuterRef('resource'), object_id=OuterRef('object_id')).filter(
+        Q(txid__gt=OuterRef('txid')) | Q(txid=OuterRef('txid'), id__gt=OuterRef('id'))
+    )
+    prunable = ChangeLog.objects.filter(changed_at__lt=cutoff).filter(Q(deleted=True) | Exists(newer))
+
+    deleted = 0
+    while True:
+        batch = list(prunable.order_by('txid', 'id').values_list('txid', 'id', 'deleted')[:batch_size])
+        if not batch:
+            return deleted
+        tombstones = [(txid, change_id) for txid, change_id, is_tombstone in batch if is_tombstone]
+        with transaction.atomic():
+            if tombstones:
+                move_horizon(max(tombstones))
+            deleted += ChangeLog.objects.filter(id__in=[change_id for _, change_id, _ in batch]).delete()[0]
+
+
+def move_horizon(position):
+    """Refuse tokens from before ``position`` from now on"""
+    horizon = SyncHorizon.objects.select_for_update().first()
+    if horizon is None:
+        SyncHorizon.objects.create(txid=position[0], change_id=position[1])
+    elif position > (horizon.txid, horizon.change_id):
+        horizon.txid, horizon.change_id = position
+        horizon.updated_at = timezone.now()
+        horizon.save()
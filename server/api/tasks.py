@@ -0,0 +1,65 @@
+"""
+Background tasks run by ``manage.py run_workers``; see api.jobs.
+"""
+import csv
+import os
+
+from django.conf import settings
+
+from . import archive
+from .jobs import task
+from .models import Client
+from .revocation import prune_revoked
+from .sync import prune_changes as prune_change_log
+from .tokens import prune_expired
+
+EXPORT_FIELDS = [
+    'id', 'first_name', 'last_name', 'date_of_birth', 'gender', 'contact_number', 'email', 'registration_date',
+]
+
+
+@task(max_attempts=1)
+def prune_tokens(run, batch_size=1000):
+    """Delete expired API tokens and revocations of expired signed tokens"""
+    tokens = prune_expired(batch_size=batch_size)
+    run.progress(0.5, f'Deleted {tokens} expired tokens')
+    return {'tokens': tokens, 'revocations': prune_revoked(batch_size=batch_size)}
+
+
+@task(max_attempts=1)
+def prune_changes(run, retention_days=None, batch_size=1000):
+    """Delete sync change log entries past SYNC_RETENTION_DAYS that no client still needs"""
+    return {'changes': prune_change_log(retention_days=retention_days, batch_size=batch_size)}
+
+
+@task()
+def export_clients(run, chunk_size=2000):
+    """Write every client to a CSV file in JOB_EXPORT_DIR, in primary key order"""
+    os.makedirs(settings.JOB_EXPORT_DIR, exist_ok=True)
+    path = os.path.join(settings.JOB_EXPORT_DIR, f'clients-{run.job.pk}.csv')
+    total = Client.objects.count() or 1
+    written = 0
+    with open(path, 'w', newline='') as output:
+        writer = csv.writer(output)
+        writer.writerow(EXPORT_FIELDS)
+        for row in Client.objects.order_by('id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+            writer.writerow(row)
+            written += 1
+            if written % chunk_size == 0:
+                run.progress(written / total, f'{written} of {total} clients')
+    return {'path': path, 'rows': written}
+
+
+@task(max_attempts=1)
+def archive_programs(run, retention_days=None, batch_size=None):
+    """Move completed programs past the retention window, and their enrollments, to the archive"""
+    total = archive.archivable_programs(retention_days).count() or 1
+
+    def progress(moved):
+        run.progress(moved['programs'] / total, f"Archived {moved['programs']} of {total} programs")
+
+    return archive.archive_programs(
+        retention_days=retention_days,
+        batch_size=batch_size or settings.ARCHIVE_BATCH_SIZE,
+        progress=progress,
+    )
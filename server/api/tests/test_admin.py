@@ -0,0 +1,89 @@
+import re
+from datetime import date, timedelta
+
+import pytest
+from django.contrib import admin
+from django.urls import reverse
+from api.models import Client, Enrollment, HealthProgram
+from api.pagination import EstimatedCountPaginator, estimated_count
+
+
+def make_clients(count):
+    return Client.objects.bulk_create([
+        Client(
+            first_name=f'Patient{index}', last_name='Admin', date_of_birth=date(1990, 1, 1), gender='female',
+            contact_number=f'07{index:08d}', email=f'patient{index}@example.com', address='1 Test Street',
+            emergency_contact='0700000000', registration_date=date(2024, 1, 1) + timedelta(days=index % 3),
+        )
+        for index in range(count)
+    ])
+
+
+@pytest.fixture
+def admin_client_logged_in(client, user_admin):
+    client.force_login(user_admin)
+    return client
+
+
+@pytest.mark.django_db
+class TestLargeTableAdmin:
+    """Test cases for the admin's large-table changelists, inline and actions."""
+
+    def test_keyset_pages_cover_every_client_once(self, admin_client_logged_in, monkeypatch):
+        """Test following the next-page cursor visits every row once, in changelist order."""
+        monkeypatch.setattr(admin.site._registry[Client], 'list_per_page', 4)
+        make_clients(10)
+        url, seen = reverse('admin:api_client_changelist'), []
+
+        while url:
+            response = admin_client_logged_in.get(url)
+            assert response.status_code == 200
+            seen += [client.pk for client in response.context['cl'].result_list]
+            next_link = re.search(r'href="(\?after=[^"]+)"', response.content.decode())
+            url = reverse('admin:api_client_changelist') + next_link.group(1) if next_link else None
+
+        assert seen == list(Client.objects.values_list('pk', flat=True))
+
+    def test_prefix_search(self, admin_client_logged_in):
+        """Test client search matches the start of names."""
+        make_clients(12)
+
+        response = admin_client_logged_in.get(reverse('admin:api_client_changelist'), {'q': 'patient1'})
+
+        names = sorted(client.first_name for client in response.context['cl'].result_list)
+        assert names == ['Patient1', 'Patient10', 'Patient11']
+
+    def test_estimated_count_paginator(self, monkeypatch):
+        """Test small results are counted exactly and large ones use the planner's estimate."""
+        make_clients(5)
+        queryset = Client.objects.all()
+        assert EstimatedCountPaginator(queryset, 2).count == 5
+
+        monkeypatch.setattr(EstimatedCountPaginator, 'exact_threshold', 0)
+        assert EstimatedCountPaginator(queryset, 2).count == estimated_count(queryset)
+
+    def test_enrollment_inline_is_paginated(self, admin_client_logged_in, health_program):
+        """Test a program's change page renders one page of enrollments."""
+        for client in make_clients(25):
+            Enrollment.objects.create(client=client, program=health_program)
+        url = reverse('admin:api_healthprogram_change', args=[health_program.pk])
+
+        response = admin_client_logged_in.get(url, {'enrollments-page': 2})
+
+        formset = response.context['inline_admin_formsets'][0].formset
+        assert formset.page.number == 2
+        assert formset.initial_form_count() == 5
+        assert 'Page 2 of 2 (25 total)' in response.content.decode()
+
+    def test_status_action_updates_in_batches(self, admin_client_logged_in, health_program, monkeypatch):
+        """Test the status actions update every selected enrollment across several batches."""
+        monkeypatch.setattr(admin.site._registry[Enrollment], 'action_batch_size', 2)
+        enrollments = [Enrollment.objects.create(client=client, program=health_program) for client in make_clients(5)]
+
+        response = admin_client_logged_in.post(reverse('admin:api_enrollment_changelist'), {
+            'action': 'mark_completed', '_selected_action': [enrollment.pk for enrollment in enrollments],
+        })
+
+        assert response.status_code == 302
+        assert set(Enrollment.objects.values_list('status', flat=True)) == {'completed'}
+        assert HealthProgram.objects.with_enrolled_counts().get().enrolled_clients_total == 5
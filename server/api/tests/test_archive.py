@@ -0,0 +1,131 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from api.archive import archivable_programs, archive_programs, restore_programs
+from api.models import ArchivedEnrollment, ArchivedHealthProgram, ChangeLog, Enrollment, HealthProgram
+
+
+@pytest.fixture
+def archived_setup(client_object, health_program, completed_program):
+    """A client enrolled in a live program and in a completed program ended 10 days ago."""
+    Enrollment.objects.create(client=client_object, program=health_program)
+    Enrollment.objects.create(client=client_object, program=completed_program, status='completed')
+    return completed_program
+
+
+@pytest.mark.django_db
+class TestArchival:
+    """Test cases for moving completed programs to the archive and back."""
+
+    def test_only_completed_programs_past_retention_are_archived(self, archived_setup, health_program):
+        """Test programs inside the retention window or still active stay live."""
+        assert not archivable_programs(retention_days=30).exists()
+
+        moved = archive_programs(retention_days=5)
+
+        assert moved == {'programs': 1, 'enrollments': 1}
+        assert list(HealthProgram.objects.values_list('id', flat=True)) == [health_program.id]
+        archived = ArchivedHealthProgram.objects.get()
+        assert (archived.id, archived.name, archived.created_at) == (
+            archived_setup.id, archived_setup.name, archived_setup.created_at,
+        )
+        assert ArchivedEnrollment.objects.get().program_id == archived_setup.id
+
+    def test_archive_in_batches_and_restore(self, client_object, completed_program):
+        """Test several batches are archived and restoring brings back programs and enrollments."""
+        programs = [completed_program] + [
+            HealthProgram.objects.create(
+                name=f'Old {index}', description='', start_date=completed_program.start_date,
+                end_date=completed_program.end_date, status='completed',
+            )
+            for index in range(4)
+        ]
+        for program in programs:
+            Enrollment.objects.create(client=client_object, program=program)
+        batches = []
+
+        archive_programs(retention_days=0, batch_size=2, progress=lambda moved: batches.append(dict(moved)))
+
+        assert [batch['programs'] for batch in batches] == [2, 4, 5]
+        assert not HealthProgram.objects.exists() and not Enrollment.objects.exists()
+
+        restored = restore_programs([program.id for program in programs[:3]], batch_size=2)
+
+        assert restored == {'programs': 3, 'enrollments': 3}
+        assert HealthProgram.objects.count() == 3 and ArchivedHealthProgram.objects.count() == 2
+        call_command('archive_programs', restore=[str(program.id) for program in programs[3:]])
+        assert not ArchivedEnrollment.objects.exists()
+
+
+    def test_archiving_sends_no_tombstones_to_sync(self, archived_setup, health_program):
+        """Test archived rows are not logged as deleted, and restored rows are logged as changed."""
+        enrollment_id = Enrollment.objects.get(program=archived_setup).id
+        before = ChangeLog.objects.count()
+
+        archive_programs(retention_days=0)
+        assert ChangeLog.objects.count() == before
+        # Later writes in the same transaction are logged again
+        HealthProgram.objects.filter(pk=health_program.pk).update(capacity=5)
+        assert ChangeLog.objects.count() == before + 1
+
+        restore_programs([archived_setup.id])
+        logged = set(ChangeLog.objects.order_by('-id').values_list('object_id', 'deleted')[:2])
+        assert logged == {(archived_setup.id, False), (enrollment_id, False)}
+
+
+@pytest.mark.django_db
+class TestIncludeArchived:
+    """Test cases for reading archived rows through the existing endpoints."""
+
+    def test_program_list_and_detail(
+        self, authenticated_doctor_client, archived_setup, health_program, client_object
+    ):
+        """Test archived programs are hidden by default and listed, with counts, when included."""
+        archive_programs(retention_days=0)
+        url = reverse('healthprogram-list')
+
+        live = authenticated_doctor_client.get(url).data['results']
+        combined = authenticated_doctor_client.get(url, {'include_archived': 'true'}).data['results']
+        archived_only = authenticated_doctor_client.get(url, {'include_archived': 'true', 'archived': 'true'})
+
+        assert [program['id'] for program in live] == [str(health_program.id)]
+        assert {(program['id'], program['archived'], program['enrolled_clients']) for program in combined} == {
+            (str(health_program.id), False, 1), (str(archived_setup.id), True, 1),
+        }
+        assert [program['id'] for program in archived_only.data['results']] == [str(archived_setup.id)]
+        detail = reverse('healthprogram-detail', args=[archived_setup.id])
+        assert authenticated_doctor_client.get(detail).status_code == status.HTTP_404_NOT_FOUND
+        response = authenticated_doctor_client.get(detail, {'include_archived': 'true', 'expand': 'clients'})
+        assert response.data['archived'] is True
+        assert [client['id'] for client in response.data['clients']] == [str(client_object.id)]
+
+    def test_client_programs_include_archived_enrollments(
+        self, authenticated_doctor_client, archived_setup, client_object, settings
+    ):
+        """Test a client's enrollments in archived programs appear only when included."""
+        archive_programs(retention_days=0)
+        detail = reverse('client-detail', args=[client_object.id])
+
+        assert len(authenticated_doctor_client.get(detail).data['programs']) == 1
+        for fast in (True, False):
+            settings.FAST_READ_SERIALIZERS = fast
+            response = authenticated_doctor_client.get(reverse('client-list'), {'include_archived': 'true'})
+            programs = response.data['results'][0]['programs']
+            assert {(program['program_id'], program['archived']) for program in programs} >= {
+                (str(archived_setup.id), True),
+            }
+            assert len(programs) == 2
+
+    def test_bulk_restore_endpoint_is_staff_only(self, api_client, user_admin, user_doctor, archived_setup):
+        """Test staff can restore archived programs in bulk and other users cannot."""
+        archive_programs(retention_days=0)
+        url = reverse('healthprogram-restore')
+
+        api_client.force_authenticate(user=user_doctor)
+        assert api_client.post(url, {'ids': [str(archived_setup.id)]}, format='json').status_code == 403
+        api_client.force_authenticate(user=user_admin)
+        response = api_client.post(url, {'ids': [str(archived_setup.id)]}, format='json')
+
+        assert response.data == {'programs': 1, 'enrollments': 1}
+        assert HealthProgram.objects.filter(pk=archived_setup.id).exists()
@@ -0,0 +1,109 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from api.db.routers import replica_reads_allowed
+from api.models import Enrollment
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def batch_url():
+    return reverse('batch')
+
+
+class TestBatchView:
+    """Test cases for the batch endpoint."""
+
+    def test_runs_reads_in_order(self, authenticated_doctor_client, batch_url, enrolled_client, health_program):
+        """Test each sub-request returns its own status and body."""
+        response = authenticated_doctor_client.post(batch_url, {'requests': [
+            {'id': 'client', 'path': f'clients/{enrolled_client.id}/'},
+            {'id': 'programs', 'path': f'/api/v1/programs/?status={health_program.status}'},
+            {'id': 'missing', 'path': 'does-not-exist/'},
+        ]}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        client_result, programs_result, missing_result = response.data['responses']
+        assert client_result['id'] == 'client'
+        assert client_result['status'] == 200
+        assert client_result['body']['email'] == enrolled_client.email
+        assert programs_result['body']['count'] == 1
+        assert missing_result['status'] == 404
+
+    def test_runs_writes(self, authenticated_doctor_client, batch_url, client_object, health_program):
+        """Test write sub-requests receive their JSON body."""
+        response = authenticated_doctor_client.post(batch_url, {'requests': [
+            {'method': 'POST', 'path': f'clients/{client_object.id}/enroll/',
+             'body': {'program_id': str(health_program.id)}},
+            {'path': f'clients/{client_object.id}/'},
+        ]}, format='json')
+
+        enroll_result, client_result = response.data['responses']
+        assert enroll_result['status'] == 201
+        assert client_result['body']['programs'][0]['program_id'] == str(health_program.id)
+        assert Enrollment.objects.filter(client=client_object).count() == 1
+
+    def test_rejects_nested_batches(self, authenticated_doctor_client, batch_url):
+        """Test a batch cannot contain another batch."""
+        response = authenticated_doctor_client.post(batch_url, {'requests': [
+            {'method': 'POST', 'path': 'batch/', 'body': {'requests': []}},
+        ]}, format='json')
+
+        assert response.data['responses'][0]['status'] == 400
+
+    def test_only_reaches_api_views(self, authenticated_admin_client, batch_url):
+        """Test paths outside the API or not served by DRF views are not found."""
+        response = authenticated_admin_client.post(batch_url, {'requests': [
+            {'path': '/admin/'}, {'path': '/metrics'}, {'path': '/healthz'}, {'path': '/api/v1/programs/'},
+        ]}, format='json')
+
+        assert [item['status'] for item in response.data['responses']] == [404, 404, 404, 200]
+
+    def test_failing_item_is_reported_alone(self, authenticated_doctor_client, batch_url, monkeypatch):
+        """Test an exception in one sub-request becomes that item's 500 and the rest still run."""
+        from api.views import HealthProgramViewSet
+
+        def fail(*args, **kwargs):
+            raise RuntimeError('boom')
+
+        # Raised outside DRF's exception handling, so it reaches the executor
+        monkeypatch.setattr(HealthProgramViewSet, 'finalize_response', fail)
+        response = authenticated_doctor_client.post(batch_url, {'requests': [
+            {'id': 'programs', 'path': 'programs/'}, {'id': 'clients', 'path': 'clients/'},
+        ]}, format='json')
+
+        programs_result, clients_result = response.data['responses']
+        assert programs_result['status'] == 500
+        assert programs_result['body']['error']['code'] == 500
+        assert clients_result['status'] == 200
+        # The failed item never reset the replica routing it switched on; that stayed inside its context
+        assert not replica_reads_allowed()
+
+    def test_limits_batch_size(self, authenticated_doctor_client, batch_url, settings):
+        """Test batches larger than BATCH_MAX_REQUESTS are rejected."""
+        settings.BATCH_MAX_REQUESTS = 2
+        response = authenticated_doctor_client.post(batch_url, {
+            'requests': [{'path': 'programs/'}] * 3,
+        }, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_requires_authentication(self, api_client, batch_url):
+        """Test anonymous callers cannot run batches."""
+        response = api_client.post(batch_url, {'requests': [{'path': 'programs/'}]}, format='json')
+        assert response.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_reads(authenticated_doctor_client, batch_url, enrolled_client, health_program):
+    """Test parallel reads return results in request order."""
+    response = authenticated_doctor_client.post(batch_url, {'parallel': True, 'requests': [
+        {'id': 'client', 'path': f'clients/{enrolled_client.id}/'},
+        {'id': 'program', 'path': f'programs/{health_program.id}/'},
+        {'id': 'clients', 'path': f'programs/{health_program.id}/clients/'},
+    ]}, format='json')
+
+    assert [item['id'] for item in response.data['responses']] == ['client', 'program', 'clients']
+    assert all(item['status'] == 200 for item in response.data['responses'])
+    assert response.data['responses'][2]['body']['count'] == 1
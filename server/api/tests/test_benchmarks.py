@@ -0,0 +1,73 @@
+import pytest
+from api.benchmarks import measure
+from api.benchmarks.baseline import compare, load_baseline, save_baseline
+from api.benchmarks.endpoints import endpoint_suite
+from api.benchmarks.keys import key_suite
+from api.models import HealthProgram
+
+
+def result(case, p50, queries=2, alloc=100.0):
+    return {'case': case, 'size': 100, 'p50_ms': p50, 'p95_ms': p50, 'queries': queries, 'peak_alloc_kb': alloc}
+
+
+class TestBaselines:
+    """Test cases for saving and comparing benchmark baselines."""
+
+    def test_round_trip_and_regressions(self, tmp_path):
+        """Test a slower case or an extra query is reported as a regression."""
+        path = tmp_path / 'baseline.json'
+        save_baseline(path, {'endpoints': [result('clients.list', 10.0), result('programs.list', 5.0)]})
+        baseline = load_baseline(path)
+
+        changes = compare(baseline, {'endpoints': [
+            result('clients.list', 12.0), result('programs.list', 5.0, queries=3),
+        ]}, threshold=0.10)
+
+        regressed = {(change['case'], change['metric']) for change in changes if change['regression']}
+        assert regressed == {
+            ('endpoints/clients.list/100', 'p50_ms'),
+            ('endpoints/clients.list/100', 'p95_ms'),
+            ('endpoints/programs.list/100', 'queries'),
+        }
+
+    def test_changes_within_threshold_pass(self, tmp_path):
+        """Test small slowdowns and improvements are not regressions."""
+        path = tmp_path / 'baseline.json'
+        baseline = save_baseline(path, {'endpoints': [result('clients.list', 10.0)]})
+
+        changes = compare(baseline, {'endpoints': [result('clients.list', 10.5, alloc=50.0)]}, threshold=0.10)
+
+        assert not [change for change in changes if change['regression']]
+
+
+@pytest.mark.django_db
+def test_measure_reports_queries_and_allocations():
+    """Test measured cases include query counts and allocations."""
+    metrics = measure(lambda: list(HealthProgram.objects.all()), repeat=2, warmup=0)
+
+    assert metrics['queries'] == 1
+    assert metrics['peak_alloc_kb'] >= 0
+    assert metrics['p50_ms'] > 0
+
+
+@pytest.mark.django_db
+def test_endpoint_suite_covers_api_cases(settings):
+    """Test the endpoint suite runs every case against a generated dataset."""
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+    results = endpoint_suite(sizes=[50], repeat=2)
+
+    assert {entry['case'] for entry in results} == {
+        'clients.list', 'clients.search', 'clients.enroll', 'programs.list', 'programs.clients', 'auth.login',
+    }
+    assert all(entry['queries'] > 0 for entry in results)
+
+
+@pytest.mark.django_db
+def test_key_suite_compares_key_types():
+    """Test the key suite reports insert rates and key/heap correlation for both key types."""
+    results = {entry['case']: entry for entry in key_suite(sizes=[2000], repeat=2)}
+
+    assert set(results) == {'insert.uuid4', 'insert.uuid7'}
+    assert results['insert.uuid7']['correlation'] > 0.9
+    assert all(entry['rows_per_s'] > 0 and entry['index_kb'] > 0 for entry in results.values())
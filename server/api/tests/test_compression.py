@@ -0,0 +1,107 @@
+import gzip
+import zlib
+
+import pytest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from api.compression import DeflateCodec, GzipCodec, compression_stats, negotiate, parse_accept_encoding
+from api.middleware import CompressionMiddleware
+
+BODY = b'{"results":[' + b','.join(b'{"first_name":"Test","last_name":"Client"}' for _ in range(100)) + b']}'
+
+
+def middleware_for(response):
+    return CompressionMiddleware(lambda request: response)
+
+
+class TestNegotiation:
+    """Test cases for Accept-Encoding negotiation."""
+
+    codecs = [GzipCodec(6), DeflateCodec(6)]
+
+    def test_parse_q_values(self):
+        """Test q-values are parsed and default to 1."""
+        assert parse_accept_encoding('gzip;q=0.5, deflate, br;q=0') == {'gzip': 0.5, 'deflate': 1.0, 'br': 0.0}
+
+    def test_highest_quality_wins(self):
+        """Test the client's highest q-value picks the codec."""
+        assert negotiate('gzip;q=0.5, deflate', self.codecs).name == 'deflate'
+
+    def test_server_preference_breaks_ties(self):
+        """Test equal q-values fall back to server preference."""
+        assert negotiate('deflate, gzip', self.codecs).name == 'gzip'
+
+    def test_refused_and_wildcard(self):
+        """Test q=0 refuses a codec and * matches unlisted codecs."""
+        assert negotiate('gzip;q=0', self.codecs) is None
+        assert negotiate('gzip;q=0, *', self.codecs).name == 'deflate'
+        assert negotiate('', self.codecs) is None
+
+
+class TestCompressionMiddleware:
+    """Test cases for the CompressionMiddleware."""
+
+    def get(self, encoding='gzip'):
+        return RequestFactory().get('/api/v1/clients/', HTTP_ACCEPT_ENCODING=encoding)
+
+    def test_compresses_large_body(self):
+        """Test a large JSON body is gzipped with matching headers."""
+        response = middleware_for(HttpResponse(BODY, content_type='application/json'))(self.get())
+
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['Vary'] == 'Accept-Encoding'
+        assert int(response['Content-Length']) == len(response.content)
+        assert gzip.decompress(response.content) == BODY
+
+    def test_skips_small_body(self):
+        """Test bodies below the size threshold are left alone."""
+        response = middleware_for(HttpResponse(b'{"ok":true}', content_type='application/json'))(self.get())
+
+        assert not response.has_header('Content-Encoding')
+        assert response.content == b'{"ok":true}'
+
+    def test_skips_incompressible_type(self):
+        """Test binary content types are not compressed."""
+        response = middleware_for(HttpResponse(BODY, content_type='image/png'))(self.get())
+        assert not response.has_header('Content-Encoding')
+
+    def test_compresses_stream_incrementally(self):
+        """Test each streamed chunk is flushed as a decodable block."""
+        chunks = [BODY[:500], BODY[500:]]
+        response = middleware_for(StreamingHttpResponse(iter(chunks), content_type='application/json'))(
+            self.get('deflate')
+        )
+
+        assert response['Content-Encoding'] == 'deflate'
+        decompressor = zlib.decompressobj()
+        parts = [decompressor.decompress(part) for part in response.streaming_content]
+        assert parts[0] == chunks[0]
+        assert b''.join(parts) == BODY
+
+    def test_reuses_cached_variant(self):
+        """Test identical cacheable bodies are served from the variant cache."""
+        middleware = CompressionMiddleware(lambda request: HttpResponse(BODY, content_type='application/json'))
+        before = compression_stats.snapshot().get('gzip', {}).get('cache_hits', 0)
+
+        first = middleware(self.get())
+        second = middleware(self.get())
+
+        assert first.content == second.content
+        assert compression_stats.snapshot()['gzip']['cache_hits'] == before + 1
+
+    def test_each_coding_has_its_own_strong_etag(self):
+        """Test the compressed representation's ETag stays strong and names the coding."""
+        response = HttpResponse(BODY, content_type='application/json')
+        response['ETag'] = '"abc"'
+        assert middleware_for(response)(self.get())['ETag'] == '"abc-gzip"'
+
+
+@pytest.mark.django_db
+def test_api_response_is_compressed(authenticated_doctor_client, enrolled_client, settings):
+    """Test API responses pass through the configured middleware."""
+    settings.COMPRESSION_MIN_SIZE = 0
+    response = authenticated_doctor_client.get(reverse('client-list'), HTTP_ACCEPT_ENCODING='gzip')
+
+    assert response['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.content).startswith(b'{"count":1')
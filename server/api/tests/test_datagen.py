@@ -0,0 +1,102 @@
+import pytest
+from django.db import connection
+from api.datagen import generate_dataset, parse_count
+from api.models import ChangeLog, Client, Enrollment, HealthProgram
+
+
+def checksum():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT md5(string_agg(id::text || first_name || date_of_birth, ',' ORDER BY id)) FROM api_client"
+        )
+        clients = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT md5(string_agg(client_id::text || program_id::text || status, ',' ORDER BY id)) "
+            "FROM api_enrollment"
+        )
+        return clients, cursor.fetchone()[0]
+
+
+def test_parse_count():
+    """Test counts accept plain numbers and k/M suffixes."""
+    assert parse_count('5000') == 5000
+    assert parse_count('2k') == 2000
+    assert parse_count('1.5M') == 1_500_000
+    with pytest.raises(ValueError):
+        parse_count('lots')
+
+
+@pytest.mark.django_db
+class TestGenerateDataset:
+    """Test cases for in-process dataset generation."""
+
+    def test_same_seed_same_rows(self):
+        """Test a seed reproduces the same clients and enrollments."""
+        generate_dataset(200, 5, seed=3, workers=0, chunk_size=64, truncate=True)
+        first = checksum()
+        generate_dataset(200, 5, seed=3, workers=0, chunk_size=64, truncate=True)
+
+        assert checksum() == first
+        generate_dataset(200, 5, seed=4, workers=0, chunk_size=64, truncate=True)
+        assert checksum() != first
+
+    def test_reloading_a_seed_is_refused_and_changes_nothing(self):
+        """Test a second load of a seed without truncate fails before disabling any trigger."""
+        generate_dataset(20, 3, seed=0, workers=0)
+
+        with pytest.raises(ValueError):
+            generate_dataset(20, 3, seed=0, workers=0)
+
+        assert Client.objects.count() == 20
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_trigger WHERE tgname LIKE 'api_%%_changes' AND tgenabled = 'D'")
+            assert cursor.fetchone()[0] == 0
+
+    def test_failed_load_restores_triggers_and_indexes(self, monkeypatch):
+        """Test triggers and indexes come back when the load fails after they were suspended."""
+        from api import datagen
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_indexes WHERE tablename IN ('api_client', 'api_enrollment')")
+            indexes = cursor.fetchone()[0]
+
+        def fail(*args):
+            raise RuntimeError('copy failed')
+
+        monkeypatch.setattr(datagen, 'copy_chunk', fail)
+        with pytest.raises(RuntimeError):
+            generate_dataset(20, 3, seed=5, workers=0, truncate=True)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_trigger WHERE tgname LIKE 'api_%%_changes' AND tgenabled = 'D'")
+            assert cursor.fetchone()[0] == 0
+            cursor.execute("SELECT count(*) FROM pg_indexes WHERE tablename IN ('api_client', 'api_enrollment')")
+            assert cursor.fetchone()[0] == indexes
+
+    def test_rows_are_consistent(self):
+        """Test generated rows respect program status and model constraints."""
+        totals = generate_dataset(500, 20, seed=1, workers=0, chunk_size=100, truncate=True)
+
+        assert Client.objects.count() == totals['clients'] == 500
+        assert HealthProgram.objects.count() == 20
+        assert Enrollment.objects.count() == totals['enrollments'] > 500
+        assert not Enrollment.objects.filter(program__status='planned').exists()
+        assert not Enrollment.objects.filter(program__status='completed').exclude(status='completed').exists()
+        assert ChangeLog.objects.filter(resource='clients').count() == 500
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_workers_restore_indexes():
+    """Test worker processes load every chunk and indexes are rebuilt afterwards."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM pg_indexes WHERE tablename IN ('api_client', 'api_enrollment')")
+        indexes = cursor.fetchone()[0]
+
+    totals = generate_dataset(300, 10, seed=2, workers=2, chunk_size=50)
+
+    assert Client.objects.count() == 300
+    assert Enrollment.objects.count() == totals['enrollments']
+    assert ChangeLog.objects.filter(resource='enrollments').count() == totals['enrollments']
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM pg_indexes WHERE tablename IN ('api_client', 'api_enrollment')")
+        assert cursor.fetchone()[0] == indexes
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import threading
+from urllib.parse import quote
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from api import events
+from api.events import Broadcaster, EventStreamApp, Subscription
+from api.models import Enrollment
+from api.tokens import issue_token
+
+
+class RecordingChannel:
+    def __init__(self):
+        self.published = []
+
+    def start(self):
+        pass
+
+    def publish(self, event):
+        self.published.append(event)
+
+
+def event(event_type, program_id='p1', **data):
+    return {'type': event_type, 'program_id': program_id, 'data': data}
+
+
+class TestSubscription:
+    """Test cases for per-connection event buffering."""
+
+    def test_capacity_events_are_conflated(self):
+        """Test a newer capacity event replaces the pending one for its program."""
+        subscription = Subscription(None, max_pending=10)
+        subscription.offer(event('capacity', enrolled_clients=1))
+        subscription.offer(event('enrollment', status='active'))
+        subscription.offer(event('capacity', enrolled_clients=2))
+
+        events_, dropped = subscription.drain()
+        assert [item['type'] for item in events_] == ['enrollment', 'capacity']
+        assert events_[1]['data']['enrolled_clients'] == 2
+        assert dropped == 0
+
+    def test_overflow_drops_oldest(self):
+        """Test a full buffer drops its oldest events and counts them."""
+        subscription = Subscription(None, max_pending=2)
+        for index in range(5):
+            subscription.offer(event('enrollment', index=index))
+
+        events_, dropped = subscription.drain()
+        assert [item['data']['index'] for item in events_] == [3, 4]
+        assert dropped == 3
+
+
+class TestBroadcaster:
+    """Test cases for fanning events out to subscriptions."""
+
+    def test_delivers_from_other_threads_by_program(self):
+        """Test events published on a worker thread reach matching subscribers only."""
+        broadcaster = Broadcaster()
+
+        async def scenario():
+            everything = broadcaster.subscribe()
+            one_program = broadcaster.subscribe({'p2'})
+            thread = threading.Thread(target=broadcaster.deliver, args=(event('enrollment', 'p1'),))
+            thread.start()
+            thread.join()
+            await everything.wait(1)
+            await asyncio.sleep(0)
+            return everything.drain()[0], one_program.drain()[0]
+
+        received, filtered = asyncio.run(scenario())
+        assert [item['program_id'] for item in received] == ['p1']
+        assert filtered == []
+        assert broadcaster.connection_count == 2
+
+
+@pytest.mark.django_db
+class TestEventSignals:
+    """Test cases for events published by model changes."""
+
+    def test_enrollment_publishes_enrollment_and_capacity(
+        self, monkeypatch, client_object, health_program, django_capture_on_commit_callbacks
+    ):
+        """Test a new enrollment publishes itself and the program's capacity on commit."""
+        channel = RecordingChannel()
+        monkeypatch.setattr(events, '_channel', channel)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Enrollment.objects.create(
+                client=client_object, program=health_program, enrollment_date=timezone.now().date()
+            )
+
+        assert [item['type'] for item in channel.published] == ['enrollment', 'capacity']
+        assert channel.published[1]['data']['enrolled_clients'] == 1
+        assert channel.published[1]['program_id'] == str(health_program.id)
+
+    def test_local_channel_without_subscribers_publishes_nothing(
+        self, monkeypatch, client_object, health_program, django_capture_on_commit_callbacks
+    ):
+        """Test saves queue no events, and so no capacity count, when nobody in the process is listening."""
+        monkeypatch.setattr(events, '_channel', events.LocalChannel(Broadcaster()))
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            Enrollment.objects.create(
+                client=client_object, program=health_program, enrollment_date=timezone.now().date()
+            )
+            health_program.save()
+
+        assert not [callback for callback in callbacks if callback.__module__ == events.__name__]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestEventStreamApp:
+    """Test cases for the server-sent events endpoint."""
+
+    def run(self, headers, query=b'', publish=None):
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/api/v1/events/',
+            'query_string': query, 'headers': headers,
+        }
+        sent = []
+
+        async def scenario():
+            disconnected = asyncio.Event()
+
+            async def receive():
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+                if publish and message.get('body', b'').startswith(b'retry'):
+                    events.broadcaster.deliver(publish)
+                elif message.get('body', b'').startswith(b'event'):
+                    disconnected.set()
+
+            await asyncio.wait_for(EventStreamApp()(scope, receive, send), 5)
+
+        asyncio.run(scenario())
+        return sent
+
+    def test_requires_authentication(self):
+        """Test streams without credentials are rejected."""
+        sent = self.run([])
+
+        assert sent[0]['status'] == 401
+
+    def test_streams_published_events(self, user_doctor):
+        """Test an authenticated stream receives events for its program."""
+        key, _ = issue_token(user_doctor)
+        program_id = '6c1f6a52-4c1e-4f43-a0a5-0b7a3d2f6a11'
+        sent = self.run(
+            [(b'authorization', f'Token {key}'.encode())],
+            query=f'program={program_id}'.encode(),
+            publish=event('capacity', program_id, enrolled_clients=3),
+        )
+
+        assert sent[0]['status'] == 200
+        assert (b'content-type', b'text/event-stream') in sent[0]['headers']
+        name, data = sent[2]['body'].decode().strip().split('\n')
+        assert name == 'event: capacity'
+        assert json.loads(data[len('data: '):])['data']['enrolled_clients'] == 3
+        assert events.broadcaster.connection_count == 0
+
+    def test_browser_stream_with_query_token_and_cors(self, authenticated_doctor_client, settings):
+        """Test a token from the token endpoint opens a stream and the answer carries CORS headers."""
+        settings.CORS_ALLOW_ALL_ORIGINS = False
+        settings.CORS_ALLOWED_ORIGINS = ['https://clinic.example']
+        token = authenticated_doctor_client.post(reverse('events-token')).data['token']
+        program_id = '6c1f6a52-4c1e-4f43-a0a5-0b7a3d2f6a11'
+        sent = self.run(
+            [(b'origin', b'https://clinic.example')],
+            query=f'program={program_id}&token={quote(token)}'.encode(),
+            publish=event('capacity', program_id, enrolled_clients=3),
+        )
+
+        headers = dict(sent[0]['headers'])
+        assert sent[0]['status'] == 200
+        assert headers[b'access-control-allow-origin'] == b'https://clinic.example'
+        assert headers[b'access-control-allow-credentials'] == b'true'
+
+    def test_bad_tokens_and_other_origins_are_refused(self, settings):
+        """Test tampered tokens are rejected and origins outside CORS_ALLOWED_ORIGINS get no CORS headers."""
+        settings.CORS_ALLOW_ALL_ORIGINS = False
+        settings.CORS_ALLOWED_ORIGINS = ['https://clinic.example']
+
+        sent = self.run([(b'origin', b'https://elsewhere.example')], query=b'token=1:forged:signature')
+
+        assert sent[0]['status'] == 401
+        assert b'access-control-allow-origin' not in dict(sent[0]['headers'])
+
+    def test_expired_token_is_refused(self, user_doctor, settings):
+        """Test a stream token stops working after EVENTS_TOKEN_SECONDS."""
+        token = events.stream_token(user_doctor)
+        assert events.stream_token_user(token) == user_doctor
+
+        settings.EVENTS_TOKEN_SECONDS = -1
+        assert events.stream_token_user(token) is None
@@ -0,0 +1,90 @@
+import pytest
+from datetime import date
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from api.expansion import parse_expand
+from api.models import Client, Enrollment
+
+pytestmark = pytest.mark.django_db
+
+
+class TestParseExpand:
+    """Test cases for parsing the expand parameter."""
+
+    def test_builds_nested_tree(self):
+        """Test dotted paths become a nested tree, prefixes included."""
+        tree = parse_expand('programs.program, programs', ['programs.program'], 2)
+
+        assert tree == {'programs': {'program': {}}}
+
+    def test_rejects_unknown_path(self):
+        """Test paths that are not expandable are rejected."""
+        with pytest.raises(ValidationError):
+            parse_expand('programs.owner', ['programs.program'], 2)
+
+    def test_rejects_deep_path(self):
+        """Test paths deeper than the limit are rejected."""
+        with pytest.raises(ValidationError):
+            parse_expand('programs.program', ['programs.program'], 1)
+
+
+class TestExpandEndpoints:
+    """Test cases for ?expand= on client and program endpoints."""
+
+    def test_client_expands_programs(self, authenticated_doctor_client, enrolled_client, health_program):
+        """Test a client embeds the full program of each enrollment."""
+        url = reverse('client-detail', kwargs={'pk': enrolled_client.id})
+        response = authenticated_doctor_client.get(url, {'expand': 'programs.program'})
+
+        assert response.status_code == status.HTTP_200_OK
+        program = response.data['programs'][0]['program']
+        assert program['id'] == str(health_program.id)
+        assert program['enrolled_clients'] == 1
+
+    def test_client_list_queries_do_not_grow(self, authenticated_doctor_client, enrolled_client, health_program, settings):
+        """Test expanded client lists cost the same number of queries for more rows."""
+        settings.STREAMING_LIST_RESPONSES = False
+        url = reverse('client-list')
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = authenticated_doctor_client.get(url, {'expand': 'programs.program'})
+            assert response.status_code == status.HTTP_200_OK
+            return len(queries)
+
+        baseline = count_queries()
+        for index in range(5):
+            client = Client.objects.create(
+                first_name=f'Extra{index}', last_name='Client', date_of_birth=date(1990, 1, 1),
+                gender='female', contact_number=f'+25470000000{index}',
+            )
+            Enrollment.objects.create(client=client, program=health_program, enrollment_date=date.today())
+
+        assert count_queries() == baseline
+
+    def test_program_expands_clients(self, authenticated_doctor_client, enrolled_client, health_program, settings):
+        """Test a program embeds at most EXPAND_MAX_ITEMS client summaries."""
+        settings.EXPAND_MAX_ITEMS = 1
+        other = Client.objects.create(
+            first_name='Other', last_name='Client', date_of_birth=date(1990, 1, 1),
+            gender='male', contact_number='+254711111111',
+        )
+        Enrollment.objects.create(client=other, program=health_program, enrollment_date=date.today())
+
+        url = reverse('healthprogram-detail', kwargs={'pk': health_program.id})
+        response = authenticated_doctor_client.get(url, {'expand': 'clients'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['enrolled_clients'] == 2
+        assert len(response.data['clients']) == 1
+        assert set(response.data['clients'][0]) == {'id', 'first_name', 'last_name'}
+
+    def test_invalid_expand_returns_400(self, authenticated_doctor_client, health_program):
+        """Test unknown expansions are reported as a bad request."""
+        url = reverse('healthprogram-list')
+        response = authenticated_doctor_client.get(url, {'expand': 'owner'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,67 @@
+import pytest
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from api.fast_serializers import (
+    client_fast_serializer,
+    program_fast_serializer,
+    enrollment_fast_serializer
+)
+from api.serializers import ClientSerializer, HealthProgramSerializer, EnrollmentSerializer
+from api.models import Client, HealthProgram, Enrollment
+
+pytestmark = pytest.mark.django_db
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+class TestFastSerializers:
+    """Test cases for the values()-based read serializers."""
+
+    def test_client_output_matches(self, enrolled_client, client_object, completed_program):
+        """Test client rows, including nested enrollments, render identically."""
+        queryset = Client.objects.all()
+        expected = ClientSerializer(queryset, many=True).data
+        fast = client_fast_serializer.serialize(client_fast_serializer.get_queryset(queryset))
+
+        assert render(fast) == render(expected)
+        assert len(fast[0]['programs']) == 1
+
+    def test_program_output_matches(self, enrolled_client, health_program, completed_program):
+        """Test program rows, including the enrolled count, render identically."""
+        queryset = HealthProgram.objects.all()
+        expected = HealthProgramSerializer(queryset, many=True).data
+        fast = program_fast_serializer.serialize(program_fast_serializer.get_queryset(queryset))
+
+        assert render(fast) == render(expected)
+        assert {item['enrolled_clients'] for item in fast} == {0, 1}
+
+    def test_enrollment_output_matches(self, enrolled_client):
+        """Test enrollment rows render identically."""
+        queryset = Enrollment.objects.all()
+        expected = EnrollmentSerializer(queryset, many=True).data
+        fast = enrollment_fast_serializer.serialize(enrollment_fast_serializer.get_queryset(queryset))
+
+        assert render(fast) == render(expected)
+
+    def test_nested_rows_use_one_query(self, enrolled_client):
+        """Test nested enrollments are fetched with a single extra query."""
+        with CaptureQueriesContext(connection) as queries:
+            client_fast_serializer.serialize(client_fast_serializer.get_queryset(Client.objects.all()))
+
+        assert len(queries) == 2
+
+    def test_list_endpoint_matches_model_serializer(self, authenticated_doctor_client, enrolled_client, settings):
+        """Test the list endpoint returns the same body with the fast path on or off."""
+        url = reverse('client-list')
+
+        settings.FAST_READ_SERIALIZERS = True
+        fast_response = authenticated_doctor_client.get(url)
+        settings.FAST_READ_SERIALIZERS = False
+        standard_response = authenticated_doctor_client.get(url)
+
+        assert fast_response.status_code == 200
+        assert fast_response.content == standard_response.content
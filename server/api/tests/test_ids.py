@@ -0,0 +1,54 @@
+import random
+import time
+
+import pytest
+from api import ids
+from api.ids import uuid7, uuid7_at, uuid7_timestamp
+from api.models import Client
+
+
+def test_uuid7_layout_and_timestamp():
+    """Test keys are RFC 9562 version 7 UUIDs carrying the current time."""
+    before = time.time_ns() // 1_000_000
+    key = uuid7()
+
+    assert key.version == 7
+    assert key.variant == 'specified in RFC 4122'
+    assert before <= uuid7_timestamp(key) <= time.time_ns() // 1_000_000 + 1
+
+
+def test_uuid7_strictly_increasing_when_clock_stalls(monkeypatch):
+    """Test keys keep increasing within a millisecond and when the clock goes backwards."""
+    clock = iter([5_000_000_000_000] * 5000 + [4_000_000_000_000] * 10)
+    monkeypatch.setattr(ids.time, 'time_ns', lambda: next(clock))
+    monkeypatch.setattr(ids, '_last_ms', 0)
+
+    keys = [uuid7() for _ in range(5010)]
+
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+    # The 12-bit counter overflows into the next millisecond rather than repeating
+    assert uuid7_timestamp(keys[-1]) > 5_000_000
+
+
+def test_uuid7_at_is_reproducible():
+    """Test keys built from a seeded generator are reproducible and ordered by timestamp."""
+    first = [uuid7_at(ms, random.Random(ms)) for ms in (1_000, 2_000, 3_000)]
+
+    assert first == [uuid7_at(ms, random.Random(ms)) for ms in (1_000, 2_000, 3_000)]
+    assert first == sorted(first)
+    with pytest.raises(ValueError):
+        uuid7_timestamp('6f1c5d5e-1c2b-4d4e-9f00-1a2b3c4d5e6f')
+
+
+@pytest.mark.django_db
+def test_models_use_time_ordered_keys(client_object, health_program):
+    """Test new rows get version 7 keys that sort in creation order."""
+    later = Client.objects.create(
+        first_name='Later', last_name='Client', date_of_birth=client_object.date_of_birth, gender='female',
+        contact_number='0700000000', email='later@example.com', address='1 Test Street',
+        emergency_contact='0700000001',
+    )
+
+    assert client_object.pk.version == health_program.pk.version == 7
+    assert later.pk > client_object.pk
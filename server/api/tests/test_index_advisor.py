@@ -0,0 +1,41 @@
+import pytest
+from api.benchmarks.datasets import seed_dataset
+from api.db.advisor import IndexAdvisor, default_scenarios, ordering_warnings
+
+
+@pytest.fixture
+def report(db):
+    seed_dataset(clients=300, programs=10)
+    return IndexAdvisor(default_scenarios(), runs=1, min_rows=100).run()
+
+
+def test_every_scenario_is_explained(report):
+    """Test each viewset filter and ordering runs and yields an explained query."""
+    scenarios = {result['scenario'] for result in report['queries']}
+
+    assert {'clients ?name=', 'clients ?min_age=', 'programs ?ordering=-start_date'} <= scenarios
+    assert all(result['execution_ms'] >= 0 for result in report['queries'])
+
+
+def test_proposes_indexes_for_unindexed_orderings(report):
+    """Test sorting clients by an unindexed column proposes an index with a measured gain."""
+    proposals = {(proposal['table'], tuple(proposal['columns'])): proposal for proposal in report['add']}
+
+    proposal = proposals[('api_client', ('created_at',))]
+    assert proposal['model_index'] == "models.Index(fields=['created_at'])"
+    assert proposal['before_ms'] > 0 and proposal['after_ms'] > 0
+
+
+def test_flags_redundant_foreign_key_index(report):
+    """Test an index that prefixes a unique constraint is proposed for dropping."""
+    reasons = {candidate['index']: candidate['reason'] for candidate in report['drop']}
+
+    assert any(
+        name.startswith('api_enrollment_client_id') and reason.startswith('prefix of')
+        for name, reason in reasons.items()
+    )
+
+
+def test_default_orderings_have_tie_breakers():
+    """Test paginated viewsets order by a unique column last."""
+    assert ordering_warnings() == []
@@ -0,0 +1,183 @@
+import csv
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from api.jobs import (
+    JobCancelled, JobRun, WorkerPool, cancel, claim, enqueue, execute, requeue_stale, schedule_due, task,
+)
+from api.models import Job, JobSchedule
+
+
+@task(name='tests.noop')
+def noop(run, value=None):
+    return {'value': value}
+
+
+@task(name='tests.flaky', max_attempts=3)
+def flaky(run):
+    raise RuntimeError('temporary failure')
+
+
+@task(name='tests.steps')
+def steps(run, count=4):
+    for step in range(count):
+        run.progress(step / count, f'step {step}')
+    return count
+
+
+@pytest.mark.django_db
+class TestJobQueue:
+    """Test cases for claiming, running and retrying background jobs."""
+
+    def test_claim_order_follows_priority_then_due_time(self):
+        """Test higher priority jobs are claimed first and future jobs are not claimed."""
+        later = enqueue(noop, args={'value': 'later'}, run_at=timezone.now() + timedelta(hours=1))
+        low = enqueue(noop, args={'value': 'low'})
+        high = enqueue('tests.noop', args={'value': 'high'}, priority=5)
+
+        assert [claim('w1').pk, claim('w1').pk, claim('w1')] == [high.pk, low.pk, None]
+        high.refresh_from_db()
+        assert (high.status, high.worker, high.attempts) == (Job.RUNNING, 'w1', 1)
+        assert Job.objects.get(pk=later.pk).status == Job.QUEUED
+
+    def test_failures_retry_with_backoff_then_fail(self, settings):
+        """Test a failing job is requeued with growing delays until its attempts run out."""
+        settings.JOB_RETRY_BACKOFF_SECONDS = 10
+        job = enqueue(flaky)
+        delays = []
+        for _ in range(3):
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            started = timezone.now()
+            execute(claim('w1'))
+            job.refresh_from_db()
+            delays.append((job.run_at - started).total_seconds())
+
+        assert job.status == Job.FAILED
+        assert job.attempts == 3
+        assert 'temporary failure' in job.error
+        assert 5 <= delays[0] <= 10.5 and 10 <= delays[1] <= 20.5
+
+    def test_progress_is_recorded_and_cancel_stops_the_task(self):
+        """Test progress reports update the job and raise once it is cancelled."""
+        enqueue(steps, args={'count': 4})
+        job = claim('w1')
+        JobRun(job).progress(0.25, 'quarter')
+        job.refresh_from_db()
+        assert (job.progress, job.progress_message) == (0.25, 'quarter')
+
+        assert cancel(job)
+        with pytest.raises(JobCancelled):
+            JobRun(job).progress(0.5)
+        execute(job)
+        job.refresh_from_db()
+        assert job.status == Job.CANCELLED
+        assert not cancel(job)
+
+    def test_stale_running_jobs_are_requeued(self, settings):
+        """Test jobs whose worker stopped sending heartbeats go back to the queue."""
+        settings.JOB_STALE_SECONDS = 60
+        enqueue(noop)
+        job = claim('w1')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=5))
+
+        assert requeue_stale() == 1
+        assert claim('w2').pk == job.pk
+
+    def test_schedules_enqueue_once_per_interval(self, settings):
+        """Test a periodic job is queued when due and not again until its next run."""
+        settings.JOB_SCHEDULES = {'noop': {'task': 'tests.noop', 'every': 600}}
+        now = timezone.now()
+
+        assert len(schedule_due(now)) == 1
+        assert schedule_due(now + timedelta(minutes=5)) == []
+        assert len(schedule_due(now + timedelta(minutes=10))) == 1
+        assert JobSchedule.objects.get().next_run_at == now + timedelta(minutes=20)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_locked_jobs_are_skipped():
+    """Test a job locked by one worker's claim is skipped by another instead of waiting."""
+    first, second = enqueue(noop), enqueue(noop)
+    locked, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        with transaction.atomic():
+            Job.objects.select_for_update().get(pk=first.pk)
+            locked.set()
+            release.wait(5)
+        connection.close()
+
+    holder = threading.Thread(target=hold_lock)
+    holder.start()
+    locked.wait(5)
+    try:
+        assert claim('w2').pk == second.pk
+    finally:
+        release.set()
+        holder.join()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_pool_runs_jobs_in_processes(settings):
+    """Test the pool's worker processes run every queued job."""
+    settings.JOB_POLL_SECONDS = 0.1
+    settings.JOB_SCHEDULES = {}
+    for index in range(6):
+        enqueue(noop, args={'value': index})
+    pool = WorkerPool(processes=2)
+
+    def stop_when_done():
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline and Job.objects.exclude(status=Job.SUCCEEDED).exists():
+            time.sleep(0.1)
+        pool.stop.set()
+        connection.close()
+
+    watcher = threading.Thread(target=stop_when_done)
+    watcher.start()
+    pool.run()
+    watcher.join()
+
+    assert sorted(Job.objects.values_list('result__value', flat=True)) == list(range(6))
+    assert set(Job.objects.values_list('status', flat=True)) == {Job.SUCCEEDED}
+
+
+@pytest.mark.django_db(transaction=True)
+class TestJobEndpoints:
+    """Test cases for the job status API."""
+
+    def test_staff_queue_and_follow_an_export(self, authenticated_admin_client, client_object, settings, tmp_path):
+        """Test an export queued through the API runs and reports its result."""
+        settings.JOB_EXPORT_DIR = str(tmp_path)
+        response = authenticated_admin_client.post(
+            reverse('job-list'), {'task': 'api.tasks.export_clients', 'args': {}}, format='json'
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+        call_command('run_workers', burst=True)
+
+        job = authenticated_admin_client.get(reverse('job-detail', args=[response.data['id']])).data
+        assert (job['status'], job['progress'], job['result']['rows']) == (Job.SUCCEEDED, 1.0, 1)
+        with open(job['result']['path']) as export:
+            assert list(csv.reader(export))[1][0] == str(client_object.id)
+
+    def test_unknown_task_rejected_and_cancel(self, authenticated_admin_client):
+        """Test only registered tasks can be queued and finished jobs cannot be cancelled."""
+        response = authenticated_admin_client.post(reverse('job-list'), {'task': 'os.system'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        job = enqueue(noop)
+        assert authenticated_admin_client.post(reverse('job-cancel', args=[job.pk])).data['status'] == Job.CANCELLED
+        response = authenticated_admin_client.post(reverse('job-cancel', args=[job.pk]))
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+    def test_jobs_are_staff_only(self, authenticated_doctor_client):
+        """Test non-staff users cannot see or queue jobs."""
+        assert authenticated_doctor_client.get(reverse('job-list')).status_code == status.HTTP_403_FORBIDDEN
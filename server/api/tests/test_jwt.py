@@ -0,0 +1,151 @@
+import time
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+from api.signed_tokens import JWTAuthentication
+from api.models import RevokedToken
+from api.revocation import BloomFilter, RevocationList, revocations
+
+
+@pytest.fixture(autouse=True)
+def fresh_revocations():
+    revocations.reset()
+    yield
+    revocations.reset()
+
+
+def bearer(token):
+    return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """Test every added value is found and unseen values rarely are."""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f'revoked-{i}')
+
+    assert all(f'revoked-{i}' in bloom for i in range(1000))
+    false_positives = sum(f'live-{i}' in bloom for i in range(10000))
+    assert false_positives < 300
+    assert len(bloom.bits) < 1300
+
+
+@pytest.mark.django_db
+class TestSignedTokens:
+    """Test cases for stateless access tokens, refresh rotation and revocation."""
+
+    def test_obtain_pair_and_authenticate_without_queries(
+        self, api_client, user_admin, settings, django_assert_num_queries
+    ):
+        """Test an access token authenticates with no database query once the filter is synced."""
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        user_admin.set_password('secret-password')
+        user_admin.save()
+        response = api_client.post(
+            reverse('token_obtain_pair'), {'email': user_admin.email, 'password': 'secret-password'}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        request = APIRequestFactory().get('/', **bearer(response.data['access']))
+        revocations.sync(force=True)
+
+        with django_assert_num_queries(0):
+            user, _ = JWTAuthentication().authenticate(request)
+
+        assert str(user.pk) == str(user_admin.pk)
+        assert user.is_staff and user.is_superuser
+        api_client.credentials(**bearer(response.data['access']))
+        assert api_client.get(reverse('healthprogram-list')).status_code == status.HTTP_200_OK
+
+    def test_refresh_rotates_and_rejects_reuse(self, api_client, user_doctor):
+        """Test a refresh token returns a new pair and cannot be used a second time."""
+        refresh = str(RefreshToken.for_user(user_doctor))
+
+        first = api_client.post(reverse('token_refresh'), {'refresh': refresh})
+        assert first.status_code == status.HTTP_200_OK
+        assert first.data['refresh'] != refresh
+
+        replay = api_client.post(reverse('token_refresh'), {'refresh': refresh})
+        assert replay.status_code == status.HTTP_401_UNAUTHORIZED
+        assert api_client.post(reverse('token_refresh'), {'refresh': first.data['refresh']}).status_code == 200
+
+    def test_logout_revokes_access_and_refresh_tokens(self, api_client, user_doctor):
+        """Test logging out revokes both tokens here and, after a sync, in other processes."""
+        refresh = RefreshToken.for_user(user_doctor)
+        access = refresh.access_token
+        api_client.credentials(**bearer(access))
+
+        response = api_client.post(reverse('logout'), {'refresh': str(refresh)})
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert api_client.get(reverse('healthprogram-list')).status_code == status.HTTP_401_UNAUTHORIZED
+        assert RevokedToken.objects.count() == 2
+        other_process = RevocationList()
+        assert other_process.is_revoked(access['jti']) is True
+        assert other_process.is_revoked(refresh['jti']) is True
+
+    def test_verify_refuses_revoked_and_rotated_tokens(self, api_client, user_doctor):
+        """Test verify accepts a live token and refuses one revoked by logout or spent by a refresh."""
+        refresh = RefreshToken.for_user(user_doctor)
+        access = refresh.access_token
+        verify = reverse('token_verify')
+        assert api_client.post(verify, {'token': str(access)}).status_code == status.HTTP_200_OK
+        assert api_client.post(verify, {'token': str(refresh)}).status_code == status.HTTP_200_OK
+
+        rotated = api_client.post(reverse('token_refresh'), {'refresh': str(refresh)})
+        assert api_client.post(verify, {'token': str(refresh)}).status_code == status.HTTP_401_UNAUTHORIZED
+        assert api_client.post(verify, {'token': rotated.data['refresh']}).status_code == status.HTTP_200_OK
+
+        api_client.credentials(**bearer(access))
+        api_client.post(reverse('logout'), {'refresh': rotated.data['refresh']})
+        api_client.credentials()
+        assert api_client.post(verify, {'token': str(access)}).status_code == status.HTTP_401_UNAUTHORIZED
+        assert api_client.post(verify, {'token': rotated.data['refresh']}).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_sync_reads_new_revocations_and_rebuild_drops_expired(self, user_doctor, settings):
+        """Test new revocations arrive at the next sync and expired ones leave at the next rebuild."""
+        settings.JWT_REVOCATION_SYNC_SECONDS = 60
+        other = RevocationList()
+        other.sync()
+        expired = RefreshToken.for_user(user_doctor)
+        live = RefreshToken.for_user(user_doctor)
+        revocations.revoke(expired['jti'], expired['exp'])
+        revocations.revoke(live['jti'], live['exp'])
+
+        assert other.is_revoked(live['jti']) is False
+        other.sync(force=True)
+        assert other.is_revoked(live['jti']) is True
+
+        RevokedToken.objects.filter(jti=expired['jti']).update(expires_at=timezone.now() - timedelta(seconds=1))
+        other.built_at = time.monotonic() - settings.JWT_REVOCATION_REBUILD_SECONDS
+        other.sync(force=True)
+        assert other.filter.count == 1
+        assert other.is_revoked(live['jti']) is True
+
+    def test_sync_reads_rows_that_commit_out_of_order(self, settings):
+        """Test revocations whose IDs were skipped by earlier syncs are still read once they commit."""
+        expires_at = timezone.now() + timedelta(hours=1)
+        first = RevokedToken.objects.create(jti='first', expires_at=expires_at)
+        RevokedToken.objects.create(id=first.id + 2, jti='third', expires_at=expires_at)
+        other = RevocationList()
+        other.sync(force=True)
+        RevokedToken.objects.create(id=first.id + 5, jti='sixth', expires_at=expires_at)
+        other.sync(force=True)
+        assert {first.id + 1, first.id + 3, first.id + 4} <= set(other.gaps)
+
+        # Rows committed late, below IDs both the rebuild and the incremental sync already passed
+        RevokedToken.objects.create(id=first.id + 1, jti='second', expires_at=expires_at)
+        RevokedToken.objects.create(id=first.id + 4, jti='fifth', expires_at=expires_at)
+        other.sync(force=True)
+        assert other.is_revoked('second') is True
+        assert other.is_revoked('fifth') is True
+        assert first.id + 3 in other.gaps
+        assert first.id + 1 not in other.gaps and first.id + 4 not in other.gaps
+
+        settings.JWT_REVOCATION_GAP_SECONDS = 0
+        other.sync(force=True)
+        assert other.gaps == {}
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from api.loadtest import ASGITransport, HTTPConnection, LoadRunner, Stats, ensure_accounts, load_data, parse_mix
+from core.asgi import application
+
+
+class TestLoadRunner:
+    """Test cases for the load generator."""
+
+    def test_parse_mix(self):
+        """Test scenario weights are parsed and unknown scenarios rejected."""
+        assert parse_mix('search=3, enroll=1') == {'search': 3.0, 'enroll': 1.0}
+        with pytest.raises(ValueError):
+            parse_mix('search=3,delete=1')
+
+    def test_stats_report(self):
+        """Test percentiles and error breakdowns are reported per endpoint."""
+        stats = Stats()
+        stats.started, stats.finished = 0.0, 2.0
+        for latency in (0.01, 0.02, 0.03, 0.04):
+            stats.record('search', latency, status=200)
+        stats.record('enroll', 0.05, status=500)
+        stats.record('enroll', 0.5, error='TimeoutError')
+
+        report = stats.report()
+
+        assert report['endpoints']['search']['requests'] == 4
+        assert report['endpoints']['search']['throughput_rps'] == 2.0
+        assert report['endpoints']['search']['p50_ms'] == pytest.approx(20.0)
+        assert report['endpoints']['enroll']['error_rate'] == 1.0
+        assert report['endpoints']['enroll']['errors'] == {'TimeoutError': 1}
+        assert report['overall']['requests'] == 6
+
+    @pytest.mark.django_db(transaction=True)
+    def test_closed_loop_against_asgi_app(self, settings, client_object, health_program):
+        """Test simulated clinicians exercise every scenario in-process without server errors."""
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        runner = LoadRunner(
+            ASGITransport(application), ensure_accounts(2), load_data(),
+            mix=parse_mix('login=1,search=1,profile=1,enroll=1,programs=1'), duration=1.5, seed=1,
+        )
+
+        report = asyncio.run(runner.closed_loop(users=4, think_time=0.05))
+
+        assert set(report['endpoints']) == {'login', 'search', 'profile', 'enroll', 'programs'}
+        assert report['overall']['error_rate'] == 0
+        assert report['endpoints']['enroll']['statuses'].get('201') == 1
+
+    def test_http_connection_reads_chunked_responses(self):
+        """Test the socket client decodes chunked bodies and reuses its connection."""
+        connections = []
+
+        async def handle(reader, writer):
+            connections.append(writer)
+            while await reader.readuntil(b'\r\n\r\n'):
+                writer.write(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+                             b'7\r\n{"ok": \r\n5\r\ntrue}\r\n0\r\n\r\n')
+                await writer.drain()
+
+        async def run():
+            server = await asyncio.start_server(handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            connection = HTTPConnection('127.0.0.1', port, timeout=5)
+            responses = [await connection.request('GET', '/api/v1/programs/') for _ in range(2)]
+            await connection.close()
+            server.close()
+            return responses
+
+        responses = asyncio.run(run())
+
+        assert [response.json() for response in responses] == [{'ok': True}] * 2
+        assert len(connections) == 1
@@ -0,0 +1,142 @@
+import multiprocessing
+
+import pytest
+from django.db import connections
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+from rest_framework.exceptions import Throttled
+from api import metrics
+from api.exceptions import custom_exception_handler
+
+
+def sample(name, *labels):
+    """The merged value of one sample; a histogram's is its observation count"""
+    value = metrics.registry.collect().get(name, {}).get(labels, 0)
+    return sum(value[:-1]) if isinstance(value, list) else value
+
+
+@pytest.mark.django_db
+class TestRequestMetrics:
+    """Test cases for the metrics recorded per request and their exposition."""
+
+    def test_requests_are_counted_by_route_and_status(self, authenticated_doctor_client, health_program):
+        """Test a request is counted with its URL pattern, status, latency and queries."""
+        before = sample('api_requests_total', 'GET', 'healthprogram-list', '200')
+        latency = sample('api_request_duration_seconds', 'GET', 'healthprogram-list')
+
+        authenticated_doctor_client.get('/api/v1/programs/')
+
+        assert sample('api_requests_total', 'GET', 'healthprogram-list', '200') == before + 1
+        assert sample('api_request_duration_seconds', 'GET', 'healthprogram-list') == latency + 1
+        queries = metrics.registry.collect()['api_db_queries_per_request'][('healthprogram-list',)]
+        assert queries[0] < sum(queries[:-1]), "the list request made no queries"
+        assert sample('api_db_query_duration_seconds', 'default') > 0
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_exposition_format(self, api_client):
+        """Test /metrics answers in the Prometheus text format with cumulative buckets."""
+        api_client.get('/api/v1/nowhere/')
+
+        response = api_client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        body = response.content.decode()
+
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert '# TYPE api_request_duration_seconds histogram' in body
+        assert 'api_requests_total{method="GET",route="unmatched",status="404"}' in body
+        assert 'api_request_duration_seconds_bucket{method="GET",route="unmatched",le="+Inf"}' in body
+        assert 'api_requests_in_flight 1' in body
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_token_is_required_when_configured(self, api_client):
+        """Test scrapes must present METRICS_TOKEN once it is set."""
+        assert api_client.get('/metrics').status_code == 401
+        assert api_client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').status_code == 200
+
+    def test_refused_without_a_token_unless_debugging(self, api_client):
+        """Test /metrics is not public when METRICS_TOKEN is unset, except with DEBUG on."""
+        assert api_client.get('/metrics').status_code == 403
+        with override_settings(DEBUG=True):
+            assert api_client.get('/metrics').status_code == 200
+
+    def test_streamed_response_is_measured_until_its_body_closes(self, authenticated_doctor_client, enrolled_client):
+        """Test a streamed list stays in flight, and is not yet counted, until its body is closed."""
+        before = sample('api_requests_total', 'GET', 'client-list', '200')
+        in_flight = metrics.in_flight.value
+
+        response = authenticated_doctor_client.get('/api/v1/clients/', {'stream': 'true'})
+        assert response.streaming
+        assert sample('api_requests_total', 'GET', 'client-list', '200') == before
+        assert metrics.in_flight.value == in_flight + 1
+        b''.join(response.streaming_content)
+        response.close()
+
+        assert sample('api_requests_total', 'GET', 'client-list', '200') == before + 1
+        assert metrics.in_flight.value == in_flight
+
+    def test_throttles_and_enrollments(self, enrolled_client):
+        """Test throttle refusals are counted per route and enrollments as they are created."""
+        request = RequestFactory().get('/api/v1/clients/search/')
+        request.resolver_match = resolve('/api/v1/clients/search/')
+        before = sample('api_throttled_requests_total', 'client-search')
+
+        custom_exception_handler(Throttled(wait=1), {'request': request})
+
+        assert sample('api_throttled_requests_total', 'client-search') == before + 1
+        assert sample('api_enrollments_created_total') >= 1
+
+
+def record_and_wait(ready, release):
+    metrics.requests.inc('GET', 'client-list', '200', amount=3)
+    metrics.in_flight.inc()
+    metrics.registry.flush()
+    ready.set()
+    release.wait(30)
+
+
+def test_workers_are_merged_and_exited_workers_kept(tmp_path):
+    """Test a scrape sums live workers, reads their in-flight gauges and keeps the counts of exited ones."""
+    context = multiprocessing.get_context('fork')
+    ready, release = context.Event(), context.Event()
+    with override_settings(METRICS_DIR=str(tmp_path)):
+        worker = context.Process(target=record_and_wait, args=(ready, release))
+        worker.start()
+        try:
+            assert ready.wait(30)
+            assert sample('api_requests_total', 'GET', 'client-list', '200') >= 3
+            live = metrics.registry.collect()
+            assert live['api_requests_in_flight'][()] == 1
+        finally:
+            release.set()
+            worker.join(30)
+
+        exited = metrics.registry.collect()
+        assert exited['api_requests_total'][('GET', 'client-list', '200')] == (
+            live['api_requests_total'][('GET', 'client-list', '200')]
+        )
+        assert exited['api_requests_in_flight'][()] == 0
+        assert not (tmp_path / f'{worker.pid}.json').exists()
+        assert (tmp_path / metrics.EXITED).exists()
+        # Folded once: a second scrape counts the exited worker the same
+        assert metrics.registry.collect()['api_requests_total'] == exited['api_requests_total']
+
+
+@pytest.mark.django_db
+class TestProbes:
+    """Test cases for the liveness and readiness endpoints."""
+
+    def test_liveness_and_readiness(self, api_client):
+        """Test both probes answer without authentication."""
+        assert api_client.get('/healthz').json() == {'status': 'ok'}
+        response = api_client.get('/readyz')
+        assert response.status_code == 200 and response.json()['database'] == 'ok'
+
+    def test_not_ready_without_the_database(self, api_client, monkeypatch):
+        """Test readiness fails with 503 when the primary database cannot be queried."""
+        def refuse(*args, **kwargs):
+            raise ConnectionError('database is down')
+
+        monkeypatch.setattr(connections['default'], 'cursor', refuse)
+
+        response = api_client.get('/readyz')
+        assert response.status_code == 503
+        assert response.json() == {'status': 'unavailable'}
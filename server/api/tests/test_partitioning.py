@@ -0,0 +1,129 @@
+from datetime import date, timedelta
+import pytest
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from api.db.partitioning import extend_range_partitions, partition_enrollments, partition_info
+from api.models import Enrollment, HealthProgram
+
+
+def scanned_partitions(queryset):
+    """Return the enrollment partitions the plan for ``queryset`` reads"""
+    plan = queryset.explain()
+    return {word for word in plan.split() if word.startswith('api_enrollment_')}
+
+
+@pytest.mark.django_db
+class TestHashPartitioning:
+    """Test cases for partitioning enrollments by program."""
+
+    def test_rows_and_api_survive_the_swap(self, authenticated_doctor_client, enrolled_client, health_program):
+        """Test existing enrollments are kept and still served through the API."""
+        partition_enrollments('hash', partitions=4)
+
+        info = partition_info()
+        assert info['strategy'] == 'hash'
+        assert len(info['partitions']) == 4
+        assert Enrollment.objects.filter(client=enrolled_client, program=health_program).exists()
+
+        response = authenticated_doctor_client.get(reverse('client-detail', args=[enrolled_client.id]))
+        assert response.status_code == status.HTTP_200_OK
+        assert [program['program_id'] for program in response.data['programs']] == [str(health_program.id)]
+
+        response = authenticated_doctor_client.get(reverse('healthprogram-clients', args=[health_program.id]))
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_archive_views_follow_the_new_table(self, authenticated_doctor_client, enrolled_client, health_program):
+        """Test the live-and-archived views are rebuilt on the partitioned table, so the old one can be dropped."""
+        with connection.cursor() as cursor:
+            # Run the fixtures' deferred foreign key checks, which would block dropping the old table
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        partition_enrollments('hash', partitions=2, drop_old=True)
+
+        response = authenticated_doctor_client.get(
+            reverse('client-detail', args=[enrolled_client.id]), {'include_archived': 'true'}
+        )
+        assert [program['program_id'] for program in response.data['programs']] == [str(health_program.id)]
+
+    def test_client_program_pairs_stay_unique(self, enrolled_client, health_program):
+        """Test the database still rejects a second enrollment in the same program."""
+        partition_enrollments('hash', partitions=4)
+
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Enrollment.objects.create(
+                client=enrolled_client, program=health_program, enrollment_date=timezone.now().date()
+            )
+
+    def test_clients_can_be_deleted_while_the_old_table_is_kept(self, enrolled_client, health_program):
+        """Test the kept unpartitioned table no longer references clients or programs."""
+        partition_enrollments('hash', partitions=2)
+
+        enrolled_client.delete()
+        health_program.delete()
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            cursor.execute('SELECT COUNT(*) FROM api_enrollment_unpartitioned')
+            assert cursor.fetchone()[0] == 1
+        assert not Enrollment.objects.exists()
+
+    def test_program_filter_is_pruned(self, enrolled_client, health_program):
+        """Test filtering by program reads a single partition."""
+        partition_enrollments('hash', partitions=4)
+
+        assert len(scanned_partitions(Enrollment.objects.filter(program=health_program))) == 1
+
+    def test_dry_run_changes_nothing(self):
+        """Test a dry run returns the SQL without partitioning the table."""
+        statements = partition_enrollments('hash', partitions=2, dry_run=True)
+
+        assert any('PARTITION BY HASH (program_id)' in sql for sql in statements)
+        assert partition_info()['strategy'] is None
+
+
+@pytest.mark.django_db
+class TestRangePartitioning:
+    """Test cases for partitioning enrollments by enrollment date."""
+
+    def test_date_filter_is_pruned(self, enrolled_client, health_program):
+        """Test filtering by enrollment month reads that month's partition."""
+        old_program = HealthProgram.objects.create(name='Old Program', start_date=date(2020, 1, 1))
+        Enrollment.objects.create(client=enrolled_client, program=old_program, enrollment_date=date(2020, 3, 15))
+        partition_enrollments('range', interval='month', ahead=2)
+
+        march = Enrollment.objects.filter(enrollment_date__gte=date(2020, 3, 1), enrollment_date__lt=date(2020, 4, 1))
+        assert scanned_partitions(march) == {'api_enrollment_2020_03'}
+        assert march.get().program == old_program
+        assert Enrollment.objects.count() == 2
+
+    def test_client_program_pairs_stay_unique(self, enrolled_client, health_program):
+        """Test the pair trigger rejects a second enrollment in the same program on another date."""
+        partition_enrollments('range', interval='year', ahead=1)
+
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Enrollment.objects.create(client=enrolled_client, program=health_program, enrollment_date=date(2020, 1, 1))
+        other = HealthProgram.objects.create(name='Other Program', start_date=date(2020, 1, 1))
+        Enrollment.objects.create(client=enrolled_client, program=other, enrollment_date=date(2020, 1, 1))
+
+    def test_extend_moves_rows_out_of_default(self, enrolled_client, health_program):
+        """Test new partitions take over matching rows from the default partition."""
+        partition_enrollments('range', interval='year', ahead=0)
+        future = timezone.now().date() + timedelta(days=400)
+        Enrollment.objects.filter(client=enrolled_client).update(enrollment_date=future)
+
+        created = extend_range_partitions(ahead=2)
+
+        assert f'api_enrollment_{future.year}' in created
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM api_enrollment_default')
+            assert cursor.fetchone()[0] == 0
+        assert Enrollment.objects.get(client=enrolled_client).enrollment_date == future
+
+    def test_command_reports_partitions(self, capsys):
+        """Test the management command partitions the table and lists the partitions."""
+        call_command('partition_enrollments', strategy='range', interval='year', ahead=1)
+
+        output = capsys.readouterr().out
+        assert 'Partitioned by range' in output
+        assert 'api_enrollment_default' in output
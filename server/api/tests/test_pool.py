@@ -0,0 +1,174 @@
+import threading
+import pytest
+import psycopg2.extensions
+from django.db import connection, connections
+from django.db.utils import load_backend
+from django.urls import reverse
+from rest_framework import status
+from api.db.pool import ConnectionPool, PoolTimeout
+from api.exceptions import ServiceUnavailable
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql):
+        if self.connection.dead:
+            raise psycopg2.OperationalError('server closed the connection')
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.dead = False
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class TestConnectionPool:
+    """Test cases for the connection pool."""
+
+    def test_reuses_released_connections(self):
+        """Test a released connection is handed out again instead of opening a new one."""
+        pool = ConnectionPool(max_size=2)
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+
+        assert pool.acquire(FakeConnection) is first
+        assert pool.stats()['created'] == 1
+
+    def test_rolls_back_open_transactions_on_release(self):
+        """Test connections are returned without an open transaction."""
+        pool = ConnectionPool(max_size=1)
+        conn = pool.acquire(FakeConnection)
+        conn.status = psycopg2.extensions.TRANSACTION_STATUS_INERROR
+        pool.release(conn)
+
+        assert conn.rollbacks == 1
+        assert pool.acquire(FakeConnection) is conn
+
+    def test_pre_ping_replaces_dead_connections(self):
+        """Test a connection that fails its health check is discarded."""
+        pool = ConnectionPool(max_size=1)
+        dead = pool.acquire(FakeConnection)
+        pool.release(dead)
+        dead.dead = True
+
+        fresh = pool.acquire(FakeConnection)
+        assert fresh is not dead
+        assert dead.closed
+        assert pool.stats()['failed_pings'] == 1
+        assert pool.stats()['size'] == 1
+
+    def test_wait_timeout_when_exhausted(self):
+        """Test callers time out when every connection is in use."""
+        pool = ConnectionPool(max_size=1, wait_timeout=0.05)
+        pool.acquire(FakeConnection)
+
+        with pytest.raises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        assert pool.stats()['timeouts'] == 1
+
+    def test_waiter_gets_released_connection(self):
+        """Test a waiting caller receives a connection released by another thread."""
+        pool = ConnectionPool(max_size=1, wait_timeout=2)
+        held = pool.acquire(FakeConnection)
+        timer = threading.Timer(0.05, pool.release, args=(held,))
+        timer.start()
+
+        assert pool.acquire(FakeConnection) is held
+        timer.join()
+
+    def test_idle_timeout_keeps_min_size(self):
+        """Test idle connections expire down to the minimum size."""
+        pool = ConnectionPool(min_size=1, max_size=3, idle_timeout=0)
+        connections = [pool.acquire(FakeConnection) for _ in range(3)]
+        for conn in connections:
+            pool.release(conn)
+
+        stats = pool.stats()
+        assert stats['size'] == 1
+        assert stats['idle'] == 1
+        assert sum(conn.closed for conn in connections) == 2
+
+    def test_prefills_min_size(self):
+        """Test the pool opens its minimum number of connections on first use."""
+        pool = ConnectionPool(min_size=3, max_size=5)
+        pool.acquire(FakeConnection)
+
+        assert pool.stats()['size'] == 3
+        assert pool.stats()['idle'] == 2
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPooledBackend:
+    """Test cases for the pooling PostgreSQL backend."""
+
+    def make_wrapper(self, **pool):
+        settings_dict = {**connection.settings_dict, 'ENGINE': 'api.db.postgresql', 'POOL': pool}
+        wrapper = load_backend('api.db.postgresql').DatabaseWrapper(settings_dict, alias=f'pooled-{id(pool)}')
+        # connection_created receivers (django.contrib.postgres) look the alias up in ``connections``
+        connections[wrapper.alias] = wrapper
+        self.aliases.append(wrapper.alias)
+        return wrapper
+
+    def setup_method(self):
+        self.aliases = []
+
+    def teardown_method(self):
+        for alias in self.aliases:
+            del connections[alias]
+
+    def test_close_returns_connection_to_pool(self):
+        """Test closing a Django connection keeps the server connection for reuse."""
+        wrapper = self.make_wrapper(MAX_SIZE=2)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+
+        wrapper.ensure_connection()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            assert cursor.fetchone() == (1,)
+        assert wrapper.connection is raw
+        wrapper.close()
+        wrapper.connection_pool.close_all()
+
+    def test_exhausted_pool_raises_service_unavailable(self):
+        """Test a pool wait timeout surfaces as ServiceUnavailable."""
+        first = self.make_wrapper(MAX_SIZE=1, WAIT_TIMEOUT=0.05)
+        first.ensure_connection()
+        second = load_backend('api.db.postgresql').DatabaseWrapper(first.settings_dict, alias=first.alias)
+
+        with pytest.raises(ServiceUnavailable):
+            second.ensure_connection()
+        first.close()
+        first.connection_pool.close_all()
+
+
+@pytest.mark.django_db
+def test_pool_stats_endpoint_requires_admin(authenticated_doctor_client):
+    """Test pool statistics are only shown to staff."""
+    response = authenticated_doctor_client.get(reverse('db-pool'))
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,67 @@
+import io
+import uuid
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from api.renderers import FastJSONRenderer, FastJSONParser
+
+pytestmark = pytest.mark.django_db
+
+
+class TestFastJSONRenderer:
+    """Test cases for the orjson-backed renderer and parser."""
+
+    def test_output_matches_json_renderer(self):
+        """Test native and passthrough types render like DRF's JSONRenderer."""
+        data = {
+            'id': uuid.uuid4(),
+            'created_at': datetime(2025, 4, 1, 8, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'start_date': date(2025, 4, 1),
+            'amount': Decimal('12.50'),
+            'label': _('Active'),
+            'notes': 'line\u2028break',
+            'nested': [{1: None, 'ok': True}],
+        }
+
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_indent_from_accept_header(self):
+        """Test an indent parameter produces pretty-printed output."""
+        rendered = FastJSONRenderer().render({'a': 1}, 'application/json; indent=2')
+        assert rendered == b'{\n  "a": 1\n}'
+
+    def test_parser(self):
+        """Test the parser decodes bodies and reports malformed JSON."""
+        parser = FastJSONParser()
+        assert parser.parse(io.BytesIO(b'{"program_id": "abc"}')) == {'program_id': 'abc'}
+
+        with pytest.raises(ParseError):
+            parser.parse(io.BytesIO(b'{"program_id": '))
+
+
+class TestStreamingListResponses:
+    """Test cases for incrementally rendered list responses."""
+
+    def test_streamed_body_matches_buffered(self, authenticated_doctor_client, enrolled_client, settings):
+        """Test a streamed page has the same bytes as the buffered page."""
+        settings.STREAMING_CHUNK_SIZE = 1
+        url = reverse('client-list')
+
+        buffered = authenticated_doctor_client.get(url)
+        streamed = authenticated_doctor_client.get(url, {'stream': 'true'})
+
+        assert streamed.streaming
+        assert b''.join(streamed.streaming_content) == buffered.content
+
+    def test_streaming_enabled_by_setting(self, authenticated_doctor_client, health_program, settings):
+        """Test the setting turns streaming on unless the request opts out."""
+        settings.STREAMING_LIST_RESPONSES = True
+        url = reverse('healthprogram-list')
+
+        assert authenticated_doctor_client.get(url).streaming
+        assert not authenticated_doctor_client.get(url, {'stream': 'false'}).streaming
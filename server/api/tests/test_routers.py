@@ -0,0 +1,135 @@
+import json
+
+import pytest
+from django.db import connections, router
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from api.db.routers import ReplicaLagMonitor, ReplicaRouter, replica_reads
+from api.models import Client, Enrollment, HealthProgram
+
+REPLICA = 'replica_test'
+
+
+class LaggingMonitor(ReplicaLagMonitor):
+    def __init__(self, lag):
+        super().__init__(max_lag=5, check_interval=0)
+        self.fixed_lag = lag
+
+    def measure(self, alias):
+        return self.fixed_lag
+
+
+@pytest.fixture(scope='class')
+def replica_alias(django_db_setup, django_db_blocker):
+    """Register an in-memory SQLite database standing in for a replica."""
+    connections.settings[REPLICA] = connections.configure_settings({
+        'default': connections.settings['default'],
+        REPLICA: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+    })[REPLICA]
+    with django_db_blocker.unblock():
+        with connections[REPLICA].schema_editor() as editor:
+            for model in (HealthProgram, Client, Enrollment):
+                editor.create_model(model)
+            # Operator class indexes are PostgreSQL-only; the stand-in just needs the tables
+            editor.deferred_sql = [sql for sql in editor.deferred_sql if '_pattern_ops' not in str(sql)]
+    yield REPLICA
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.settings[REPLICA]
+
+
+@pytest.fixture
+def sqlite_replica(monkeypatch, replica_alias):
+    """Give the stand-in replica its own rows and route replica reads to it."""
+    HealthProgram.objects.using(replica_alias).create(
+        name='Replica Program', description='Only on the replica', start_date=timezone.now().date()
+    )
+
+    def use_monitor(monitor=None):
+        monkeypatch.setattr(router, 'routers', [ReplicaRouter(replicas=[replica_alias], monitor=monitor)])
+
+    use_monitor()
+    return use_monitor
+
+
+def program_names(api_client):
+    response = api_client.get(reverse('healthprogram-list'))
+    assert response.status_code == status.HTTP_200_OK
+    return {program['name'] for program in response.data['results']}
+
+
+class TestReplicaRouter:
+    """Test cases for routing decisions."""
+
+    @pytest.fixture
+    def install(self, monkeypatch):
+        def install(replicas, lag):
+            replica_router = ReplicaRouter(replicas=replicas, monitor=LaggingMonitor(lag))
+            monkeypatch.setattr(router, 'routers', [replica_router])
+            return replica_router
+        return install
+
+    def test_reads_use_replica_only_when_allowed(self, install):
+        """Test reads go to a replica inside replica_reads() and to the primary otherwise."""
+        replica_router = install(['replica_1'], lag=0)
+
+        assert replica_router.db_for_read(Client) is None
+        with replica_reads():
+            assert replica_router.db_for_read(Client) == 'replica_1'
+            assert replica_router.db_for_write(Client) == 'default'
+
+    def test_lagging_replicas_fail_over_to_primary(self, install):
+        """Test reads fall back to the primary when replica lag exceeds the threshold."""
+        replica_router = install(['replica_1'], lag=30)
+
+        with replica_reads():
+            assert replica_router.db_for_read(Client) == 'default'
+
+    def test_round_robin_per_block_and_no_migrations_on_replicas(self, install):
+        """Test each block keeps one replica, blocks take turns, and replicas never receive migrations."""
+        replica_router = install(['replica_1', 'replica_2'], lag=0)
+
+        chosen = []
+        for _ in range(4):
+            with replica_reads():
+                reads = {replica_router.db_for_read(Client) for _ in range(3)}
+            assert len(reads) == 1
+            chosen.extend(reads)
+        assert set(chosen) == {'replica_1', 'replica_2'}
+        assert replica_router.allow_migrate('replica_1', 'api') is False
+        assert replica_router.allow_migrate('default', 'api') is None
+
+
+@pytest.mark.usefixtures('replica_alias')
+@pytest.mark.django_db(databases=['default', REPLICA])
+class TestReplicaReads:
+    """Test cases for replica reads through the API."""
+
+    def test_list_reads_from_replica(self, authenticated_doctor_client, health_program, sqlite_replica):
+        """Test list requests are served from the replica."""
+        assert program_names(authenticated_doctor_client) == {'Replica Program'}
+
+    def test_streamed_list_reads_from_replica(self, authenticated_doctor_client, health_program, sqlite_replica):
+        """Test a streamed list reads its rows from the replica, not just its count."""
+        response = authenticated_doctor_client.get(reverse('healthprogram-list'), {'stream': 'true'})
+
+        assert response.streaming
+        body = json.loads(b''.join(response.streaming_content))
+        assert body['count'] == 1
+        assert {program['name'] for program in body['results']} == {'Replica Program'}
+
+    def test_read_your_writes_stays_on_primary(self, authenticated_doctor_client, health_program, sqlite_replica):
+        """Test a user reads from the primary right after their own write."""
+        response = authenticated_doctor_client.patch(
+            reverse('healthprogram-detail', kwargs={'pk': health_program.id}), {'capacity': 5}, format='json'
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        assert program_names(authenticated_doctor_client) == {health_program.name}
+
+    def test_lagging_replica_serves_from_primary(self, authenticated_doctor_client, health_program, sqlite_replica):
+        """Test list requests fail over to the primary when the replica lags."""
+        sqlite_replica(LaggingMonitor(60))
+
+        assert program_names(authenticated_doctor_client) == {health_program.name}
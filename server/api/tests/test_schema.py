@@ -0,0 +1,99 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from api import schema
+
+
+@pytest.fixture
+def artifact_dir(settings, tmp_path):
+    """Point the schema artifact at a temporary directory, with nothing held in memory."""
+    settings.SCHEMA_ARTIFACT_DIR = str(tmp_path)
+    schema.reset()
+    yield tmp_path
+    schema.reset()
+
+
+@pytest.mark.django_db
+class TestSchemaArtifact:
+    """Test cases for serving the precomputed OpenAPI schema."""
+
+    def test_generated_on_first_use_and_revalidated_with_etag(self, authenticated_doctor_client, artifact_dir):
+        """Test the first request writes the artifact and a matching If-None-Match gets a 304."""
+        url = reverse('schema-json', kwargs={'format': '.json'})
+
+        response = authenticated_doctor_client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == schema.artifact_path('json').read_bytes()
+        assert '/clients/' in json.loads(response.content)['paths']
+        assert 'private' in response['Cache-Control']
+        etag = response['ETag']
+        assert etag.startswith('"')
+        response = authenticated_doctor_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        yaml = authenticated_doctor_client.get(reverse('schema-json', kwargs={'format': '.yaml'}))
+        assert yaml.content == schema.artifact_path('yaml').read_bytes()
+        assert yaml['ETag'] != etag
+
+    def test_compressed_schema_revalidates_with_its_own_etag(self, authenticated_doctor_client, artifact_dir):
+        """Test gzip clients get the same strong, coding-specific ETag on the 200 and the 304."""
+        url = reverse('schema-json', kwargs={'format': '.json'})
+        identity_etag = authenticated_doctor_client.get(url)['ETag']
+
+        response = authenticated_doctor_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['ETag'] == identity_etag[:-1] + '-gzip"'
+
+        revalidated = authenticated_doctor_client.get(
+            url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+        assert revalidated['ETag'] == response['ETag']
+
+    def test_served_from_the_artifact(self, authenticated_doctor_client, artifact_dir):
+        """Test a deployed artifact is served as written, for the raw schema and the UI's schema fetch."""
+        call_command('generate_schema')
+        path = schema.artifact_path('json')
+        document = json.loads(path.read_text())
+        document['info']['title'] = 'Deployed'
+        path.write_text(json.dumps(document))
+
+        response = authenticated_doctor_client.get(reverse('schema-swagger-ui'), {'format': 'openapi'})
+
+        assert json.loads(response.content)['info']['title'] == 'Deployed'
+        assert authenticated_doctor_client.get(reverse('schema-redoc')).status_code == status.HTTP_200_OK
+
+    def test_check_reports_a_stale_artifact(self, artifact_dir):
+        """Test --check passes for a fresh artifact and fails once it differs from the code."""
+        call_command('generate_schema')
+        call_command('generate_schema', check=True)
+
+        schema.artifact_path('yaml').write_text('swagger: "2.0"\n')
+        with pytest.raises(SystemExit):
+            call_command('generate_schema', check=True)
+
+    def test_artifact_of_other_code_is_not_served(self, authenticated_doctor_client, artifact_dir):
+        """Test an artifact written for other code is ignored and removed when the current one is written."""
+        stale = artifact_dir / 'openapi-v1-000000000000.json'
+        stale.write_text('{"swagger": "2.0", "paths": {}}')
+
+        response = authenticated_doctor_client.get(reverse('schema-json', kwargs={'format': '.json'}))
+
+        assert '/clients/' in json.loads(response.content)['paths']
+        assert not stale.exists()
+        assert schema.artifact_path('json').name.startswith('openapi-v1-')
+
+    def test_artifact_name_follows_url_settings(self, settings, artifact_dir):
+        """Test settings that add or remove URLs give the artifact a different name."""
+        before = schema.artifact_path('json')
+        settings.API_DOCS_ENABLED = not settings.API_DOCS_ENABLED
+
+        assert schema.artifact_path('json') != before
+
+    def test_requires_authentication(self, api_client, artifact_dir):
+        """Test anonymous users cannot read the schema."""
+        response = api_client.get(reverse('schema-json', kwargs={'format': '.json'}))
+        assert response.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,103 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+from django.conf import settings
+from api.serving import MemoryWatchdog, gunicorn_options, is_running, read_pid, rolling_reload
+
+
+class TestServeOptions:
+    """Test cases for the gunicorn configuration used by serve."""
+
+    def test_defaults_preload_and_recycle_workers(self):
+        """Test the app is preloaded and workers are replaced after a jittered number of requests."""
+        options = gunicorn_options(workers=3)
+
+        assert options['preload_app'] is True
+        assert (options['workers'], options['worker_class'], options['threads']) == (3, 'sync', 1)
+        assert options['max_requests'] == settings.SERVE_MAX_REQUESTS
+        assert options['max_requests_jitter'] == settings.SERVE_MAX_REQUESTS_JITTER
+
+    def test_worker_classes(self):
+        """Test threaded and ASGI workers map to gunicorn's classes and unknown ones are refused."""
+        assert gunicorn_options(worker_class='threads', threads=8)['threads'] == 8
+        assert gunicorn_options(worker_class='asgi')['worker_class'] == 'uvicorn.workers.UvicornWorker'
+        with pytest.raises(ValueError):
+            gunicorn_options(worker_class='eventlet')
+
+    def test_memory_watchdog_fires_once_over_the_limit(self):
+        """Test the watchdog reports a process over its memory limit and then stops."""
+        fired = threading.Event()
+        watchdog = MemoryWatchdog(limit=1, on_exceeded=fired.set, interval=0.01)
+        watchdog.start()
+
+        assert fired.wait(5)
+        watchdog.join(5)
+        assert not watchdog.is_alive()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_rolling_reload_keeps_serving(tmp_path):
+    """Test a rolling reload replaces the master and workers while every request still gets a response."""
+    port, pidfile = free_port(), str(tmp_path / 'serve.pid')
+    server = subprocess.Popen(
+        [sys.executable, 'manage.py', 'serve', '--bind', f'127.0.0.1:{port}', '--workers', '2',
+         '--pidfile', pidfile, '--graceful-timeout', '5'],
+        cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f'http://127.0.0.1:{port}/api/v1/programs/'
+    statuses, errors, stop = [], [], threading.Event()
+
+    def request():
+        try:
+            urllib.request.urlopen(url, timeout=10)
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def load():
+        while not stop.is_set():
+            try:
+                statuses.append(request())
+            except OSError as e:
+                errors.append(e)
+
+    new = None
+    try:
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                request()
+                break
+            except OSError:
+                time.sleep(0.2)
+        old = read_pid(pidfile)
+        client = threading.Thread(target=load)
+        client.start()
+
+        new = rolling_reload(pidfile, timeout=30)
+        server.wait(10)
+        time.sleep(0.5)
+        stop.set()
+        client.join()
+
+        assert new != old and is_running(new)
+        assert statuses and set(statuses) == {401}
+        assert errors == []
+    finally:
+        stop.set()
+        for pid in (new, server.pid):
+            if pid and is_running(pid):
+                os.kill(pid, signal.SIGTERM)
+        server.wait(10)
@@ -0,0 +1,56 @@
+import pytest
+from django.core.management import call_command
+from api.startup import PHASE_MARKER, package_totals, parse_import_times, profile_startup, warm_up
+
+IMPORT_TIMES = f"""import time: self [us] | cumulative | imported package
+import time:       120 |        120 | _io
+{PHASE_MARKER} apps
+import time:       300 |        300 |     yaml.error
+import time:      1000 |       1300 |   yaml
+import time:       200 |       1500 | drf_yasg
+"""
+
+
+class TestImportTimes:
+    """Test cases for parsing and summarising -X importtime output."""
+
+    def test_entries_are_charged_to_their_phase(self):
+        """Test each import is parsed with its phase, depth and timings."""
+        imports = parse_import_times(IMPORT_TIMES.splitlines())
+
+        assert [(entry['phase'], entry['module'], entry['depth']) for entry in imports] == [
+            ('interpreter', '_io', 0), ('apps', 'yaml.error', 2), ('apps', 'yaml', 1), ('apps', 'drf_yasg', 0),
+        ]
+        assert imports[2]['cumulative_us'] == 1300
+        assert package_totals(imports)[0] == ('yaml', 0.0013)
+
+
+class TestColdStart:
+    """Test cases for profiling start-up in a fresh interpreter."""
+
+    def test_disabled_subsystems_are_not_imported(self):
+        """Test turning off docs, signed tokens and the admin keeps their modules out of the process."""
+        # django.contrib.admin itself is imported by rest_framework.schemas, but the admin site is not built
+        optional = {'drf_yasg', 'rest_framework_simplejwt', 'api.admin'}
+        default = profile_startup(warm_up=True)
+        slim = profile_startup(env={'API_DOCS_ENABLED': 'False', 'JWT_ENABLED': 'False', 'ADMIN_ENABLED': 'False'})
+
+        assert [phase['name'] for phase in default['phases']] == ['settings', 'apps', 'handler', 'urls', 'warm-up']
+        loaded = {module for phase in default['phases'] for module in phase['modules']}
+        assert optional <= loaded
+        # The schema views are only imported by the first docs request
+        assert 'api.schema' not in loaded
+        assert not optional & {module for phase in slim['phases'] for module in phase['modules']}
+
+    def test_command_reports_phases(self, capsys):
+        """Test the command prints the phase and module tables."""
+        call_command('startup_profile', top=3)
+
+        output = capsys.readouterr().out
+        assert 'urls' in output and 'Modules by cumulative import time' in output
+
+
+@pytest.mark.django_db
+def test_warm_up_primes_each_step():
+    """Test warm-up runs every step, including opening the database connection."""
+    assert set(warm_up()) == {'urls', 'rest_framework', 'models', 'serializers', 'database'}
@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from api.models import ChangeLog, HealthProgram
+from api.sync import decode_token, encode_token, prune_changes
+
+# Changes only become visible once their transaction has committed
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def sync(api_client, since=None, **params):
+    if since:
+        params['since'] = since
+    response = api_client.get(reverse('sync-changes'), params)
+    assert response.status_code == status.HTTP_200_OK
+    return response.data
+
+
+def changed(data):
+    return {(change['resource'], change['id'], change['deleted']) for change in data['changes']}
+
+
+class TestSyncChanges:
+    """Test cases for the delta sync endpoint."""
+
+    def test_token_round_trip(self):
+        """Test sync tokens decode to the position they encode."""
+        assert decode_token(encode_token(123456, 42)) == (123456, 42)
+
+    def test_initial_sync_then_no_changes(self, authenticated_doctor_client, enrolled_client, health_program):
+        """Test a full sync returns every row and its token then yields nothing."""
+        data = sync(authenticated_doctor_client)
+
+        assert ('clients', str(enrolled_client.id), False) in changed(data)
+        assert ('programs', str(health_program.id), False) in changed(data)
+        assert {change['resource'] for change in data['changes']} == {'clients', 'programs', 'enrollments'}
+        assert data['has_more'] is False
+
+        again = sync(authenticated_doctor_client, data['next'])
+        assert again['changes'] == []
+        assert again['next'] == data['next']
+
+    def test_updates_are_collapsed(self, authenticated_doctor_client, client_object):
+        """Test several updates to one row come back as its latest state."""
+        token = sync(authenticated_doctor_client)['next']
+        client_object.first_name = 'Renamed'
+        client_object.save()
+        client_object.last_name = 'Twice'
+        client_object.save()
+
+        data = sync(authenticated_doctor_client, token)
+        assert len(data['changes']) == 1
+        assert data['changes'][0]['data']['first_name'] == 'Renamed'
+        assert data['changes'][0]['data']['last_name'] == 'Twice'
+
+    def test_deletes_return_tombstones(self, authenticated_doctor_client, enrolled_client):
+        """Test deleted rows, including cascades, are returned as tombstones."""
+        token = sync(authenticated_doctor_client)['next']
+        enrollment_id = str(enrolled_client.enrollments.get().id)
+        client_id = str(enrolled_client.id)
+        enrolled_client.delete()
+
+        data = sync(authenticated_doctor_client, token)
+        assert changed(data) == {('clients', client_id, True), ('enrollments', enrollment_id, True)}
+        assert all(change['data'] is None for change in data['changes'])
+
+    def test_bulk_writes_are_captured(self, authenticated_doctor_client, health_program):
+        """Test writes that bypass model save() are still logged."""
+        token = sync(authenticated_doctor_client)['next']
+        HealthProgram.objects.filter(pk=health_program.pk).update(capacity=10)
+
+        data = sync(authenticated_doctor_client, token)
+        assert data['changes'][0]['data']['capacity'] == 10
+
+    def test_pages_with_limit(self, authenticated_doctor_client, client_object, health_program):
+        """Test changes are paged and resuming from next returns the rest."""
+        first = sync(authenticated_doctor_client, limit=1)
+        assert len(first['changes']) == 1
+        assert first['has_more'] is True
+
+        second = sync(authenticated_doctor_client, first['next'], limit=10)
+        assert len(second['changes']) == ChangeLog.objects.count() - 1
+        assert second['has_more'] is False
+
+    def test_invalid_token_returns_400(self, authenticated_doctor_client):
+        """Test malformed tokens are rejected."""
+        response = authenticated_doctor_client.get(reverse('sync-changes'), {'since': 'not-a-token'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_pruning_keeps_live_rows_and_expires_old_tokens(self, authenticated_doctor_client, enrolled_client):
+        """Test pruning drops tombstones and superseded entries, and tokens behind them must resync."""
+        old_token = sync(authenticated_doctor_client)['next']
+        program = enrolled_client.enrollments.get().program
+        program.capacity = 10
+        program.save()
+        enrollment_id = enrolled_client.enrollments.get().id
+        enrolled_client.enrollments.all().delete()
+        latest_token = sync(authenticated_doctor_client, old_token)['next']
+        ChangeLog.objects.update(changed_at=timezone.now() - timedelta(days=31))
+
+        assert prune_changes(retention_days=30) == 3
+        assert not ChangeLog.objects.filter(object_id=enrollment_id).exists()
+        assert ChangeLog.objects.filter(object_id=program.id).count() == 1
+        full = sync(authenticated_doctor_client)
+        assert changed(full) == {('clients', str(enrolled_client.id), False), ('programs', str(program.id), False)}
+
+        response = authenticated_doctor_client.get(reverse('sync-changes'), {'since': old_token})
+        assert response.status_code == status.HTTP_410_GONE
+        assert sync(authenticated_doctor_client, latest_token)['changes'] == []
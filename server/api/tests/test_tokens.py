@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from api.models import AuthToken
+from api.tokens import LastUseRecorder, hash_key, issue_token, prune_expired
+
+
+@pytest.fixture
+def fast_hashing(settings):
+    settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+@pytest.mark.django_db
+class TestTokenStore:
+    """Test cases for hashed, expiring API tokens."""
+
+    def test_login_issues_hashed_token(self, api_client, user_doctor, fast_hashing):
+        """Test login returns a key that is only stored as its digest and authenticates requests."""
+        user_doctor.set_password('secret-password')
+        user_doctor.save()
+
+        response = api_client.post(reverse('login'), {'email': user_doctor.email, 'password': 'secret-password'})
+
+        key = response.data['token']
+        token = AuthToken.objects.get()
+        assert token.digest == hash_key(key) != key
+        assert len(token.digest) == 64
+        api_client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        assert api_client.get(reverse('healthprogram-list')).status_code == status.HTTP_200_OK
+
+    def test_expired_token_rejected(self, api_client, user_doctor):
+        """Test tokens past their expiry no longer authenticate."""
+        key, token = issue_token(user_doctor)
+        AuthToken.objects.filter(pk=token.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        api_client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+
+        response = api_client.get(reverse('healthprogram-list'))
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_expiry_is_earlier_of_lifetime_and_idle_timeout(self, user_doctor, settings):
+        """Test a new token expires after the idle timeout, capped by the absolute lifetime."""
+        settings.AUTH_TOKEN_IDLE_SECONDS = 3600
+        settings.AUTH_TOKEN_TTL_SECONDS = 7200
+        _, token = issue_token(user_doctor)
+        assert token.expires_at == token.created + timedelta(hours=1)
+
+        recorder = LastUseRecorder()
+        recorder.touch(token, now=token.created + timedelta(minutes=90))
+        recorder.flush()
+
+        token.refresh_from_db()
+        assert token.expires_at == token.created + timedelta(hours=2)
+
+    def test_last_use_written_in_batches(self, user_doctor, django_assert_num_queries, settings):
+        """Test recent uses are skipped and queued uses are written with one bulk update."""
+        settings.AUTH_TOKEN_TOUCH_SECONDS = 60
+        recorder = LastUseRecorder()
+        tokens = [issue_token(user_doctor)[1] for _ in range(3)]
+        later = timezone.now() + timedelta(minutes=5)
+
+        with django_assert_num_queries(0):
+            recorder.touch(tokens[0])
+            for token in tokens:
+                recorder.touch(token, now=later)
+        with django_assert_num_queries(1):
+            assert recorder.flush() == 3
+
+        assert set(AuthToken.objects.values_list('last_used', flat=True)) == {later}
+
+    def test_logout_revokes_token(self, api_client, user_doctor):
+        """Test logging out deletes the token used."""
+        key, _ = issue_token(user_doctor)
+        api_client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+
+        assert api_client.post(reverse('logout')).status_code == status.HTTP_204_NO_CONTENT
+        assert not AuthToken.objects.exists()
+
+    def test_prune_deletes_only_expired_tokens_in_batches(self, user_doctor):
+        """Test pruning removes every expired token across several batches and keeps live ones."""
+        live = issue_token(user_doctor)[1]
+        expired = [issue_token(user_doctor)[1] for _ in range(5)]
+        AuthToken.objects.filter(pk__in=[token.pk for token in expired]).update(
+            expires_at=timezone.now() - timedelta(days=1)
+        )
+
+        assert prune_expired(batch_size=2) == 5
+        assert list(AuthToken.objects.values_list('pk', flat=True)) == [live.pk]
+        call_command('prune_tokens')
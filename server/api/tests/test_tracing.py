@@ -0,0 +1,126 @@
+import json
+
+import pytest
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from api import tracing
+from api.tracing import RotatingFileExporter, parse_traceparent
+
+PARENT = '00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01'
+
+
+def read_traces(path):
+    with open(path) as lines:
+        return [json.loads(line)['resourceSpans'][0]['scopeSpans'][0]['spans'] for line in lines]
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    """Export traces to a file of their own, with every request sampled and the middleware installed"""
+    path = tmp_path / 'traces.jsonl'
+    monkeypatch.setattr(tracing, 'exporter', RotatingFileExporter(str(path), 0, 0, 'test'))
+    middleware = ['api.middleware.TracingMiddleware', *settings.MIDDLEWARE]
+    with override_settings(MIDDLEWARE=middleware, TRACING_SAMPLE_RATE=1.0):
+        yield path
+
+
+class TestTraceparent:
+    """Test cases for reading W3C traceparent headers."""
+
+    def test_valid_and_invalid_headers(self):
+        """Test the IDs and sampled flag are read and malformed or all-zero IDs are refused."""
+        assert parse_traceparent(PARENT) == ('4bf92f3577b34da6a3ce929d0e0e4736', '00f067aa0ba902b7', True)
+        assert parse_traceparent(PARENT[:-2] + '00')[2] is False
+        assert parse_traceparent('00-' + '0' * 32 + '-00f067aa0ba902b7-01') is None
+        assert parse_traceparent('garbage') is None
+
+
+@pytest.mark.django_db
+class TestRequestTraces:
+    """Test cases for the span tree recorded for a sampled request."""
+
+    def test_client_list_span_tree(self, authenticated_doctor_client, enrolled_client, trace_file):
+        """Test a client list records nested middleware, DRF, query, serialization and render spans."""
+        with connection.execute_wrapper(tracing.trace_query):
+            response = authenticated_doctor_client.get('/api/v1/clients/', {'stream': 'false'})
+
+        [spans] = read_traces(trace_file)
+        by_id = {span['spanId']: span for span in spans}
+        names = [span['name'] for span in spans]
+        root = spans[0]
+        assert root['name'] == 'GET client-list' and 'parentSpanId' not in root
+        assert response['traceresponse'] == f"00-{root['traceId']}-{root['spanId']}-01"
+        assert all(span['traceId'] == root['traceId'] for span in spans)
+        assert all(span['parentSpanId'] in by_id for span in spans[1:])
+        for name in ('middleware SecurityMiddleware', 'view', 'authenticate', 'check_permissions',
+                     'ClientViewSet.list', 'filter_queryset', 'serialize', 'render'):
+            assert name in names
+        query = next(span for span in spans if span['name'] == 'db SELECT')
+        assert any(attribute['key'] == 'db.query.text' for attribute in query['attributes'])
+        # Queries run while paginating or serializing nest under those steps
+        assert by_id[query['parentSpanId']]['name'] in ('paginate_queryset', 'serialize')
+
+    def test_streamed_list_keeps_body_spans(self, authenticated_doctor_client, enrolled_client, trace_file):
+        """Test a streamed list is exported once its body closes, with the spans made while streaming."""
+        with connection.execute_wrapper(tracing.trace_query):
+            response = authenticated_doctor_client.get('/api/v1/clients/', {'stream': 'true'})
+            assert response.streaming and not trace_file.exists()
+            b''.join(response.streaming_content)
+            response.close()
+
+        [spans] = read_traces(trace_file)
+        by_id = {span['spanId']: span for span in spans}
+        root = spans[0]
+        serialize = next(span for span in spans if span['name'] == 'serialize')
+        assert any(by_id[span['parentSpanId']] is serialize for span in spans if span['name'] == 'db SELECT')
+        assert int(root['endTimeUnixNano']) >= int(serialize['endTimeUnixNano'])
+
+    def test_sampled_parent_is_joined(self, authenticated_doctor_client, trace_file):
+        """Test a trusted sampled traceparent is traced under the caller's trace even when the sample rate is 0."""
+        with override_settings(TRACING_SAMPLE_RATE=0.0, TRACING_TRUST_TRACEPARENT=True):
+            authenticated_doctor_client.get('/api/v1/programs/', HTTP_TRACEPARENT=PARENT)
+
+        [spans] = read_traces(trace_file)
+        assert spans[0]['traceId'] == '4bf92f3577b34da6a3ce929d0e0e4736'
+        assert spans[0]['parentSpanId'] == '00f067aa0ba902b7'
+
+    def test_untrusted_parent_keeps_its_trace_id_but_not_its_sampling(
+        self, authenticated_doctor_client, trace_file
+    ):
+        """Test an untrusted sampled traceparent is sampled at the local rate, under the caller's trace ID."""
+        with override_settings(TRACING_SAMPLE_RATE=0.0):
+            response = authenticated_doctor_client.get('/api/v1/programs/', HTTP_TRACEPARENT=PARENT)
+
+        assert not trace_file.exists()
+        assert response['traceresponse'].startswith('00-4bf92f3577b34da6a3ce929d0e0e4736-')
+
+        authenticated_doctor_client.get('/api/v1/programs/', HTTP_TRACEPARENT=PARENT[:-2] + '00')
+        [spans] = read_traces(trace_file)
+        assert spans[0]['traceId'] == '4bf92f3577b34da6a3ce929d0e0e4736'
+
+    def test_unsampled_parent_is_not_recorded(self, authenticated_doctor_client, trace_file):
+        """Test a trusted unsampled traceparent records nothing but keeps the trace ID in the response."""
+        with override_settings(TRACING_SAMPLE_RATE=1.0, TRACING_TRUST_TRACEPARENT=True):
+            response = authenticated_doctor_client.get('/api/v1/programs/', HTTP_TRACEPARENT=PARENT[:-2] + '00')
+
+        assert not trace_file.exists()
+        assert response['traceresponse'].startswith('00-4bf92f3577b34da6a3ce929d0e0e4736-')
+        assert response['traceresponse'].endswith('-00')
+
+
+def test_export_file_rotates(tmp_path):
+    """Test the exporter rotates at its size limit and keeps only the configured number of old files."""
+    path = tmp_path / 'traces.jsonl'
+    exporter = RotatingFileExporter(str(path), max_bytes=600, backups=2, service_name='test')
+    for number in range(12):
+        trace = tracing.Trace(f'{number:032x}')
+        trace.add(tracing.Span('GET client-list', None, tracing.KIND_SERVER))
+        exporter.export(trace)
+
+    assert sorted(p.name for p in tmp_path.iterdir() if p.name.startswith('traces.jsonl')) == [
+        'traces.jsonl', 'traces.jsonl.1', 'traces.jsonl.2', 'traces.jsonl.lock',
+    ]
+    for name in ('traces.jsonl', 'traces.jsonl.1'):
+        assert path.with_name(name).stat().st_size <= 600
+        assert read_traces(path.with_name(name))
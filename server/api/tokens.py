@@ -0,0 +1,118 @@
+"""
+Token lifecycle: issuing hashed keys, expiry, batched last-use writes
+and pruning.
+
+A token is valid until ``expires_at``, the earlier of its absolute
+lifetime (``AUTH_TOKEN_TTL_SECONDS`` after login) and its idle timeout
+(``AUTH_TOKEN_IDLE_SECONDS`` after last use). Recording every use would
+turn each authenticated read into a write, so ``recorder`` queues uses
+in memory and writes them with one bulk update per
+``AUTH_TOKEN_TOUCH_SECONDS``. A token's idle expiry can therefore lag
+its true last use by up to that interval.
+"""
+import hashlib
+import secrets
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AuthToken
+
+
+def hash_key(key):
+    """Return the stored digest of a token key"""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def token_expiry(created, last_used):
+    return min(
+        created + timedelta(seconds=settings.AUTH_TOKEN_TTL_SECONDS),
+        last_used + timedelta(seconds=settings.AUTH_TOKEN_IDLE_SECONDS),
+    )
+
+
+def issue_token(user):
+    """Create a token for ``user``; returns the key, which is not stored, and the token"""
+    key = secrets.token_urlsafe(32)
+    now = timezone.now()
+    token = AuthToken.objects.create(
+        digest=hash_key(key), user=user, created=now, last_used=now, expires_at=token_expiry(now, now)
+    )
+    return key, token
+
+
+def get_token(key):
+    """Return the unexpired token for ``key`` with its user, or None"""
+    token = AuthToken.objects.select_related('user').filter(digest=hash_key(key)).first()
+    if token is None or token.expires_at <= timezone.now():
+        return None
+    return token
+
+
+def revoke_token(token):
+    AuthToken.objects.filter(digest=token.digest).delete()
+
+
+class LastUseRecorder:
+    """
+    Queue token uses and write them in bulk.
+
+    A token is only queued once its stored ``last_used`` is a touch
+    interval old, so a busy token costs at most one write per interval,
+    and the queue is flushed by the first use after the interval passes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.flushed_at = time.monotonic()
+
+    def touch(self, token, now=None):
+        now = now or timezone.now()
+        interval = settings.AUTH_TOKEN_TOUCH_SECONDS
+        if (now - token.last_used).total_seconds() < interval:
+            return
+        with self.lock:
+            self.pending[token.digest] = (token, now)
+            due = time.monotonic() - self.flushed_at >= interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write queued last-use times and extended expiries; returns the number of tokens written"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.flushed_at = time.monotonic()
+        tokens = []
+        for token, used in pending.values():
+            token.last_used = used
+            token.expires_at = token_expiry(token.created, used)
+            tokens.append(token)
+        if tokens:
+            AuthToken.objects.bulk_update(tokens, ['last_used', 'expires_at'], batch_size=500)
+        return len(tokens)
+
+
+recorder = LastUseRecorder()
+
+
+def prune_expired(batch_size=1000, pause=0.0):
+    """
+    Delete expired tokens ``batch_size`` at a time, each batch in its own
+    short statement so pruning never holds long locks; returns the number
+    deleted. ``pause`` seconds between batches limit the load it adds.
+    """
+    deleted = 0
+    while True:
+        batch = list(
+            AuthToken.objects.filter(expires_at__lte=timezone.now())
+            .order_by().values_list('digest', flat=True)[:batch_size]
+        )
+        if not batch:
+            return deleted
+        deleted += AuthToken.objects.filter(digest__in=batch).delete()[0]
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,389 @@
+"""
+Request tracing with head-based sampling, exported as OTLP JSON.
+
+Whether a request is traced is decided once, when it arrives, with
+probability ``TRACING_SAMPLE_RATE``. A request carrying a W3C
+``traceparent`` header joins the caller's trace; its sampled flag is
+only followed with ``TRACING_TRUST_TRACEPARENT``, since otherwise any
+client could have every one of its requests traced. A sampled request records a tree of spans: the
+request itself, each middleware below ``TracingMiddleware``, REST
+framework's authentication, permission and throttle checks, filtering,
+pagination, serialization, rendering and every database query. For any
+other request ``span()`` returns a shared no-op context manager, so
+instrumented code costs a context variable lookup.
+
+The response carries the trace ID in a ``traceresponse`` header. When the
+request ends its spans are appended to ``TRACING_FILE`` as one line of
+OTLP/JSON (an ``ExportTraceServiceRequest``, the format the OpenTelemetry
+Collector's ``otlpjsonfile`` receiver reads). The file is rotated at
+``TRACING_FILE_MAX_BYTES``, keeping ``TRACING_FILE_BACKUPS`` old files;
+workers writing the same file take a lock to append and rotate, and
+reopen it when another worker has rotated it.
+
+Middleware spans are made by replacing the ``get_response`` of each
+middleware instance, found by following the ``__wrapped__`` attribute
+Django sets on the handler around each middleware. The chain is walked
+once, when ``TracingMiddleware`` is created, and the walk stops at any
+middleware that does not keep ``get_response``.
+"""
+import contextlib
+import contextvars
+import fcntl
+import functools
+import json
+import os
+import random
+import re
+import threading
+import time
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+
+from .db.wrappers import install_execute_wrapper
+from .streaming import when_body_closes
+
+TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+SAMPLED = 0x01
+
+# OTLP span kinds and status codes
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+STATUS_ERROR = 2
+
+NOT_TRACED = contextlib.nullcontext()
+
+_trace = contextvars.ContextVar('tracing_trace', default=None)
+_span = contextvars.ContextVar('tracing_span', default=None)
+
+
+class Span:
+    """One timed operation of a trace"""
+
+    __slots__ = ('name', 'kind', 'span_id', 'parent_id', 'start', 'end', 'attributes', 'error')
+
+    def __init__(self, name, parent_id, kind=KIND_INTERNAL, attributes=None):
+        self.name = name
+        self.kind = kind
+        self.span_id = f'{random.getrandbits(64):016x}'
+        self.parent_id = parent_id
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = attributes or {}
+        self.error = None
+
+    def as_otlp(self, trace_id):
+        span = {
+            'traceId': trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end or self.start),
+            'attributes': [otlp_attribute(key, value) for key, value in self.attributes.items()],
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        if self.error:
+            span['status'] = {'code': STATUS_ERROR, 'message': self.error}
+        return span
+
+
+class Trace:
+    """The spans of one sampled request, in the order they started"""
+
+    def __init__(self, trace_id, parent_id=None):
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.spans = []
+        self.dropped = 0
+
+    def add(self, span):
+        if len(self.spans) < settings.TRACING_MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+
+class SpanScope:
+    """Context manager recording a span of the current trace"""
+
+    __slots__ = ('trace', 'span', 'token')
+
+    def __init__(self, trace, name, kind, attributes):
+        parent = _span.get()
+        self.trace = trace
+        self.span = Span(name, parent.span_id if parent else trace.parent_id, kind, attributes)
+
+    def __enter__(self):
+        self.trace.add(self.span)
+        self.token = _span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.end = time.time_ns()
+        if exc_type is not None:
+            self.span.error = f'{exc_type.__name__}: {exc}'
+        _span.reset(self.token)
+
+
+def span(name, kind=KIND_INTERNAL, **attributes):
+    """A span of the current request's trace, or a no-op when it is not sampled"""
+    trace = _trace.get()
+    if trace is None:
+        return NOT_TRACED
+    return SpanScope(trace, name, kind, attributes)
+
+
+def traced(handler, name, **attributes):
+    """Wrap the callable ``handler`` (sync or async) so each call is a span"""
+    if iscoroutinefunction(handler):
+        async def call(*args, **kwargs):
+            with span(name, **attributes):
+                return await handler(*args, **kwargs)
+    else:
+        def call(*args, **kwargs):
+            with span(name, **attributes):
+                return handler(*args, **kwargs)
+    return call
+
+
+def otlp_attribute(key, value):
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+
+def parse_traceparent(header):
+    """(trace ID, parent span ID, sampled) from a W3C traceparent header, or None if it is invalid"""
+    match = TRACEPARENT.match(header.strip().lower()) if header else None
+    if match is None:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    if trace_id == '0' * 32 or parent_id == '0' * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & SAMPLED)
+
+
+def start_request(request):
+    """
+    Decide whether to trace ``request`` and open its root span. Returns
+    the state ``finish_request`` needs; the trace ID is kept for the
+    response header even when the request is not sampled.
+    """
+    parent = parse_traceparent(request.META.get('HTTP_TRACEPARENT'))
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id = f'{random.getrandbits(128):032x}', None
+    if parent is None or not settings.TRACING_TRUST_TRACEPARENT:
+        sampled = random.random() < settings.TRACING_SAMPLE_RATE
+    if not sampled:
+        return trace_id, None, None, None
+
+    trace = Trace(trace_id, parent_id)
+    token = _trace.set(trace)
+    scope = SpanScope(trace, request.method, KIND_SERVER, {
+        'http.request.method': request.method,
+        'url.path': request.path,
+    })
+    scope.__enter__()
+    return trace_id, trace, token, scope
+
+
+def finish_request(request, response, state, error=None):
+    """
+    Close the root span, export a sampled trace and add the ``traceresponse``
+    header. A streamed body is still to be produced, with spans of its own,
+    so its trace is closed and exported when the body is closed instead.
+    """
+    trace_id, trace, token, scope = state
+    if trace is not None:
+        root = scope.span
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            root.name = f'{request.method} {match.view_name}'
+            root.attributes['http.route'] = match.route
+        if response is not None:
+            root.attributes['http.response.status_code'] = response.status_code
+            if response.status_code >= 500:
+                root.error = f'HTTP {response.status_code}'
+        if error is not None:
+            scope.__exit__(type(error), error, error.__traceback__)
+        elif response is not None and response.streaming:
+            # The body's iterator carries its own copy of the context, so the variables can be reset now
+            _span.reset(scope.token)
+            when_body_closes(response, functools.partial(finish_streamed, trace, root))
+        else:
+            scope.__exit__(None, None, None)
+        _trace.reset(token)
+        if root.end is not None:
+            export_trace(trace)
+    if response is not None:
+        span_id = scope.span.span_id if trace is not None else '0' * 16
+        response['traceresponse'] = f'00-{trace_id}-{span_id}-{SAMPLED if trace is not None else 0:02x}'
+    return response
+
+
+def export_trace(trace):
+    if trace.dropped:
+        trace.spans[0].attributes['tracing.dropped_spans'] = trace.dropped
+    exporter.export(trace)
+
+
+def finish_streamed(trace, root):
+    root.end = time.time_ns()
+    export_trace(trace)
+
+
+def instrument_middleware(get_response):
+    """
+    Wrap ``get_response`` and every middleware below it so each call is a
+    span; the innermost span covers URL resolution, the view and rendering.
+    """
+    handler = traced(get_response, middleware_name(get_response))
+    current = getattr(get_response, '__wrapped__', None)
+    while current is not None and not hasattr(current, '__func__') and hasattr(current, 'get_response'):
+        inner = current.get_response
+        current.get_response = traced(inner, middleware_name(inner))
+        current = getattr(inner, '__wrapped__', None)
+    return handler
+
+
+def middleware_name(handler):
+    wrapped = getattr(handler, '__wrapped__', handler)
+    if hasattr(wrapped, '__func__'):
+        # BaseHandler._get_response: everything inside the middleware
+        return 'view'
+    return f'middleware {type(wrapped).__name__}'
+
+
+def trace_query(execute, sql, params, many, context):
+    """Database execute wrapper recording each query of a sampled request as a span"""
+    if _trace.get() is None:
+        return execute(sql, params, many, context)
+    connection = context['connection']
+    operation = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else 'QUERY'
+    with span(f'db {operation}', KIND_CLIENT, **{
+        'db.system': connection.vendor,
+        'db.namespace': connection.settings_dict.get('NAME') or '',
+        'db.query.text': sql[:settings.TRACING_MAX_STATEMENT_LENGTH],
+        'db.alias': connection.alias,
+    }):
+        return execute(sql, params, many, context)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    install_execute_wrapper(connection, trace_query)
+
+
+class RotatingFileExporter:
+    """
+    Append traces as OTLP/JSON lines to ``path``, rotating it to
+    ``path.1`` ... ``path.<backups>`` when it passes ``max_bytes``.
+    """
+
+    def __init__(self, path, max_bytes, backups, service_name):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.resource = {'attributes': [otlp_attribute('service.name', service_name)]}
+        self.lock = threading.Lock()
+        self.file = None
+        self.pid = None
+
+    def export(self, trace):
+        line = json.dumps({'resourceSpans': [{
+            'resource': self.resource,
+            'scopeSpans': [{
+                'scope': {'name': __name__},
+                'spans': [span.as_otlp(trace.trace_id) for span in trace.spans],
+            }],
+        }]}, separators=(',', ':')) + '\n'
+        self.write(line.encode())
+
+    def write(self, data):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(f'{self.path}.lock', 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                self._open()
+                if self.max_bytes and os.fstat(self.file.fileno()).st_size + len(data) > self.max_bytes:
+                    self._rotate()
+                self.file.write(data)
+                self.file.flush()
+
+    def _open(self):
+        """Open the file, or reopen it if it was rotated by another process or this one forked"""
+        if self.file is not None and self.pid == os.getpid():
+            try:
+                if os.stat(self.path).st_ino == os.fstat(self.file.fileno()).st_ino:
+                    return
+            except FileNotFoundError:
+                pass
+            self.file.close()
+        self.file = open(self.path, 'ab')
+        self.pid = os.getpid()
+
+    def _rotate(self):
+        self.file.close()
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{index}'):
+                os.replace(f'{self.path}.{index}', f'{self.path}.{index + 1}')
+        if self.backups:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.truncate(self.path, 0)
+        self.file = open(self.path, 'ab')
+
+
+class TracedViewMixin:
+    """Record the steps of REST framework's dispatch as spans of the request's trace"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # The handler runs after initial(); wrap this view instance's copy of it
+        method = request.method.lower()
+        handler = getattr(self, method, None)
+        if handler is not None and _trace.get() is not None:
+            action = getattr(self, 'action', None) or method
+            setattr(self, method, traced(handler, f'{type(self).__name__}.{action}'))
+
+    def perform_authentication(self, request):
+        with span('authenticate'):
+            super().perform_authentication(request)
+
+    def check_permissions(self, request):
+        with span('check_permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with span('check_object_permissions'):
+            super().check_object_permissions(request, obj)
+
+    def check_throttles(self, request):
+        with span('check_throttles'):
+            super().check_throttles(request)
+
+    def filter_queryset(self, queryset):
+        with span('filter_queryset'):
+            return super().filter_queryset(queryset)
+
+    def paginate_queryset(self, queryset):
+        with span('paginate_queryset'):
+            return super().paginate_queryset(queryset)
+
+    def get_object(self):
+        with span('get_object'):
+            return super().get_object()
+
+
+exporter = RotatingFileExporter(
+    settings.TRACING_FILE, settings.TRACING_FILE_MAX_BYTES, settings.TRACING_FILE_BACKUPS,
+    settings.TRACING_SERVICE_NAME,
+)
@@ -1,48 +1,49 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import HealthProgramViewSet, ClientViewSet,RegisterView,LoginView
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from .views import HealthProgramViewSet, ClientViewSet,JobViewSet,RegisterView,LoginView,LogoutView,BatchView,SyncChangesView,DatabasePoolView,EventStreamTokenView
+from .startup import lazy_view
 # from .views import EmailTokenObtainPairView
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-    TokenVerifyView,
-)
 
 # Create a router and register our viewsets
 router = DefaultRouter()
 router.register(r'programs', HealthProgramViewSet)
 router.register(r'clients', ClientViewSet)
-
-# Schema view for API documentation
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Health Information System API",
-        default_version='v1',
-        description="API for managing health programs and clients",
-        terms_of_service="https://www.yourapp.com/terms/",
-        contact=openapi.Contact(email="contact@yourapp.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.IsAuthenticated,),
-)
+router.register(r'jobs', JobViewSet)
 
 urlpatterns = [
     # API endpoints
     path('', include(router.urls)),
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('sync/changes/', SyncChangesView.as_view(), name='sync-changes'),
+    path('events/token/', EventStreamTokenView.as_view(), name='events-token'),
+    path('system/db-pool/', DatabasePoolView.as_view(), name='db-pool'),
     
 
     # Authentication endpoints
     path('auth/login/', LoginView.as_view(), name='login'),
+    path('auth/logout/', LogoutView.as_view(), name='logout'),
     path('auth/register/', RegisterView.as_view(), name='register'),
-    path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('auth/verify/', TokenVerifyView.as_view(), name='token_verify'),
-    
-    # API documentation
-    path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
+
+# Signed token endpoints
+if settings.JWT_ENABLED:
+    from rest_framework_simplejwt.views import (
+        TokenObtainPairView,
+        TokenRefreshView,
+        TokenVerifyView,
+    )
+
+    urlpatterns += [
+        path('auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+        path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+        path('auth/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    ]
+
+# API documentation, loaded with drf_yasg on the first request for it
+if settings.API_DOCS_ENABLED:
+    urlpatterns += [
+        path('swagger<format>/', lazy_view('api.schema.schema_json_view'), name='schema-json'),
+        path('swagger/', lazy_view('api.schema.swagger_ui_view'), name='schema-swagger-ui'),
+        path('redoc/', lazy_view('api.schema.redoc_view'), name='schema-redoc'),
+    ]
@@ -1,45 +1,207 @@
-from rest_framework import viewsets, permissions, status, filters,generics
+from rest_framework import viewsets, permissions, status, filters,generics, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
-from .models import HealthProgram, Client, Enrollment
+from django.db.models import Prefetch, Q
+from .models import HealthProgram, Client, Enrollment, Job, HealthProgramRecord
 from .serializers import (
     HealthProgramSerializer, ClientSerializer, 
-    EnrollmentSerializer, ClientEnrollmentSerializer
+    EnrollmentSerializer, ClientEnrollmentSerializer, JobSerializer,
+    HealthProgramRecordSerializer, ClientWithArchiveSerializer, RestoreProgramsSerializer
 )
 from rest_framework import status, views, permissions
 from .permissions import IsAuthenticated
 from .pagination import StandardResultsSetPagination
-from .filters import ClientFilter, ProgramFilter
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from .filters import ClientFilter, ProgramFilter, ProgramRecordFilter
+from .docs import openapi, swagger_auto_schema
 from .serializers import UserRegistrationSerializer
-from rest_framework_simplejwt.views import TokenObtainPairView
 # from .serializers import CustomTokenObtainPairSerializer
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import get_user_model, authenticate
-from rest_framework_simplejwt.tokens import RefreshToken
 import json
 
 # from django.contrib.auth import get_user_model, authenticate
 # from rest_framework import status, views, permissions
 # from rest_framework.response import Response
-from .models import AuthToken
+from .tokens import issue_token, revoke_token
+from .jobs import cancel as cancel_job
+from .archive import restore_programs
 from .serializers import UserSerializer
+from .fast_serializers import (
+    client_fast_serializer, program_fast_serializer,
+    client_with_archive_fast_serializer, program_record_fast_serializer,
+)
+from django.conf import settings
+from django.urls import reverse
+from itertools import islice
+from .batch import BatchExecutor
+from .expansion import ExpandableViewMixin
+from .tracing import TracedViewMixin, span
+from .sync import decode_token, fetch_changes
+from .events import stream_token
+from .db.pool import pool_stats
+from .db.routers import disable_replica_reads, enable_replica_reads, record_write, wrote_recently
+from contextvars import copy_context
+from rest_framework.permissions import SAFE_METHODS
+from .serializers import BatchRequestSerializer
 
 User = get_user_model()
 
-class HealthProgramViewSet(viewsets.ModelViewSet):
+
+def chunked(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``"""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def with_current_context(iterable):
+    """
+    Iterate ``iterable`` inside a copy of the current context.
+
+    Streamed bodies are consumed after the view returns; this keeps them
+    under the same context variables (such as replica routing) as the view.
+    The context is copied here, when the response is built, not on the
+    first read of the body.
+    """
+    return run_in_context(copy_context(), iter(iterable))
+
+
+def run_in_context(context, iterator):
+    while True:
+        try:
+            yield context.run(next, iterator)
+        except StopIteration:
+            return
+
+
+class ReplicaReadMixin:
+    """
+    Serve ``replica_actions`` from a read replica.
+
+    Users who changed something within the read-your-writes window keep
+    reading from the primary, as do all unsafe requests.
+    """
+    replica_actions = ('list', 'retrieve', 'search')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            self.action in self.replica_actions
+            and request.method in SAFE_METHODS
+            and not wrote_recently(request.user)
+        ):
+            self._replica_reads = enable_replica_reads()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        token = getattr(self, '_replica_reads', None)
+        if token is not None:
+            self._replica_reads = None
+            disable_replica_reads(token)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            record_write(getattr(request, 'user', None))
+        return response
+
+
+class ArchiveReadMixin:
+    """
+    Read live and archived rows together when a safe request passes
+    ``include_archived=true``. ``with_archived`` holds the view attributes
+    (queryset, serializers, filters, expansions) used for those requests.
+    """
+    with_archived = {}
+
+    def initial(self, request, *args, **kwargs):
+        if request.method in SAFE_METHODS and request.query_params.get('include_archived') == 'true':
+            for name, value in self.with_archived.items():
+                setattr(self, name, value)
+        super().initial(request, *args, **kwargs)
+
+class FastListMixin:
+    """Serve list-style responses through a compiled values() serializer"""
+    fast_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.list_response(
+            queryset, self.get_serializer_class(), self.fast_serializer, self.get_expand()
+        )
+
+    def get_expand(self):
+        """Return the requested expansions; none unless a view supports them"""
+        return {}
+
+    def list_response(self, queryset, serializer_class, fast_serializer=None, expand=None):
+        """Paginate and serialize ``queryset``, preferring the fast path when enabled"""
+        # Expanded documents need the related instances, so they take the regular path
+        if fast_serializer is not None and settings.FAST_READ_SERIALIZERS and not expand:
+            queryset = fast_serializer.get_queryset(queryset)
+            serialize_rows = fast_serializer.serialize
+            name = f'{serializer_class.__name__} (fast)'
+        else:
+            options = {'expand': expand} if expand else {}
+
+            def serialize_rows(rows):
+                return serializer_class(rows, many=True, **options).data
+            name = serializer_class.__name__
+
+        def serialize(rows):
+            with span('serialize', serializer=name):
+                return serialize_rows(rows)
+
+        if self.should_stream():
+            rows = self.paginator.paginate_queryset_lazily(queryset, self.request, view=self)
+            if rows is not None:
+                chunk_size = settings.STREAMING_CHUNK_SIZE
+                chunks = chunked(rows.iterator(chunk_size=chunk_size), chunk_size)
+                return self.paginator.get_streaming_response(
+                    with_current_context(serialize(chunk) for chunk in chunks),
+                    self.request.accepted_renderer,
+                )
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize(page))
+
+        return Response(serialize(queryset))
+
+    def should_stream(self):
+        """Stream list bodies when enabled and the client accepted plain JSON"""
+        requested = self.request.query_params.get('stream')
+        enabled = settings.STREAMING_LIST_RESPONSES if requested is None else requested == 'true'
+        renderer = self.request.accepted_renderer
+        return (
+            enabled
+            and renderer.format == 'json'
+            and not renderer.get_indent(self.request.accepted_media_type, {})
+            and hasattr(self.paginator, 'get_streaming_response')
+        )
+
+
+class HealthProgramViewSet(TracedViewMixin, ArchiveReadMixin, ReplicaReadMixin, ExpandableViewMixin, FastListMixin, viewsets.ModelViewSet):
     """ViewSet for managing health programs"""
-    queryset = HealthProgram.objects.all()
+    queryset = HealthProgram.objects.with_enrolled_counts()
     serializer_class = HealthProgramSerializer
+    fast_serializer = program_fast_serializer
+    expandable = {
+        'clients': lambda: [Prefetch(
+            'clients',
+            queryset=Client.objects.only('id', 'first_name', 'last_name')[:settings.EXPAND_MAX_ITEMS],
+            to_attr='expanded_clients',
+        )],
+    }
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = ProgramFilter
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'start_date', 'status', 'created_at']
+    with_archived = {
+        'queryset': HealthProgramRecord.objects.with_enrolled_counts(),
+        'serializer_class': HealthProgramRecordSerializer,
+        'fast_serializer': program_record_fast_serializer,
+        'filterset_class': ProgramRecordFilter,
+    }
     
     @swagger_auto_schema(
         operation_description="Get all clients enrolled in a specific program",
@@ -50,26 +212,54 @@ class HealthProgramViewSet(viewsets.ModelViewSet):
         """Get all clients enrolled in this program"""
         program = self.get_object()
         clients = program.clients.all()
-        
-        page = self.paginate_queryset(clients)
-        if page is not None:
-            serializer = ClientSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-            
-        serializer = ClientSerializer(clients, many=True)
-        return Response(serializer.data)
+        return self.list_response(clients, ClientSerializer, client_fast_serializer)
 
+    @swagger_auto_schema(
+        operation_description="Move archived programs, with their enrollments, back to the live tables",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={'ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING))},
+            required=['ids'],
+        ),
+        responses={200: "Numbers of programs and enrollments restored", 400: "Bad request"}
+    )
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def restore(self, request):
+        """Restore archived programs in bulk"""
+        serializer = RestoreProgramsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(restore_programs(serializer.validated_data['ids']), status=status.HTTP_200_OK)
 
-class ClientViewSet(viewsets.ModelViewSet):
+
+class ClientViewSet(TracedViewMixin, ArchiveReadMixin, ReplicaReadMixin, ExpandableViewMixin, FastListMixin, viewsets.ModelViewSet):
     """ViewSet for managing clients"""
     queryset = Client.objects.all()
     serializer_class = ClientSerializer
+    fast_serializer = client_fast_serializer
+    expandable = {
+        'programs': lambda: ['enrollments'],
+        'programs.program': lambda: [Prefetch(
+            'enrollments__program',
+            queryset=HealthProgram.objects.with_enrolled_counts(),
+        )],
+    }
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = ClientFilter
     search_fields = ['first_name', 'last_name', 'email', 'contact_number']
     ordering_fields = ['first_name', 'last_name', 'registration_date', 'created_at']
+    with_archived = {
+        'serializer_class': ClientWithArchiveSerializer,
+        'fast_serializer': client_with_archive_fast_serializer,
+        'expandable': {
+            'programs': lambda: ['all_enrollments'],
+            'programs.program': lambda: [Prefetch(
+                'all_enrollments__program',
+                queryset=HealthProgramRecord.objects.with_enrolled_counts(),
+            )],
+        },
+    }
     
     @swagger_auto_schema(
         operation_description="Search for clients by name, email, or contact number",
@@ -78,6 +268,11 @@ class ClientViewSet(viewsets.ModelViewSet):
                 'query', openapi.IN_QUERY, 
                 description="Search term", 
                 type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'expand', openapi.IN_QUERY,
+                description="Related resources to embed, e.g. programs.program",
+                type=openapi.TYPE_STRING
             )
         ],
         responses={200: ClientSerializer(many=True)}
@@ -92,20 +287,13 @@ class ClientViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
             
-        clients = Client.objects.filter(
+        clients = self.get_queryset().filter(
             Q(first_name__icontains=query) |
             Q(last_name__icontains=query) |
             Q(email__icontains=query) |
             Q(contact_number__icontains=query)
         )
-        
-        page = self.paginate_queryset(clients)
-        if page is not None:
-            serializer = ClientSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-            
-        serializer = ClientSerializer(clients, many=True)
-        return Response(serializer.data)
+        return self.list_response(clients, self.get_serializer_class(), self.fast_serializer, self.get_expand())
     
     @swagger_auto_schema(
         operation_description="Enroll a client in a health program",
@@ -133,29 +321,117 @@ class ClientViewSet(viewsets.ModelViewSet):
     
 
 
-class RegisterView(generics.CreateAPIView):
-    """View for user registration"""
-    serializer_class = UserRegistrationSerializer
-    permission_classes = [permissions.AllowAny]
-    
+class BatchView(TracedViewMixin, views.APIView):
+    """Run several API requests in one round trip"""
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Run a list of sub-requests against the API and return each status and body",
+        request_body=BatchRequestSerializer,
+        responses={200: "Per-request status and body", 400: "Bad request"}
+    )
     def post(self, request, *args, **kwargs):
-        serializer = self.serializer_class(data=request.data)
-        if serializer.is_valid():
-            user = serializer.save()
-            
-            # Return a success response
-            return Response({
-                "message": "User registered successfully",
-                "user": {
-                    "id": user.id,
-                    "email": user.email,
-                    "first_name": user.first_name,
-                    "last_name": user.last_name
-                }
-            }, status=status.HTTP_201_CREATED)
-        
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
+        serializer = BatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        api_root = reverse('batch')[:-len('batch/')]
+        executor = BatchExecutor(
+            request, api_root, type(self), max_workers=settings.BATCH_MAX_WORKERS
+        )
+        responses = executor.execute(
+            serializer.validated_data['requests'],
+            parallel=serializer.validated_data['parallel'],
+        )
+        return Response({'responses': responses}, status=status.HTTP_200_OK)
+
+
+class SyncChangesView(TracedViewMixin, views.APIView):
+    """Incremental changes to clients, programs and enrollments for offline copies"""
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Return rows created, updated or deleted since a sync token. "
+            "Omit 'since' for a full initial sync and resume from 'next' while 'has_more' is true."
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                'since', openapi.IN_QUERY,
+                description="Token returned as 'next' by the previous call",
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'limit', openapi.IN_QUERY,
+                description="Maximum number of changes to return",
+                type=openapi.TYPE_INTEGER
+            )
+        ],
+        responses={200: "Changes, the next token and whether more remain", 400: "Bad request"}
+    )
+    def get(self, request, *args, **kwargs):
+        since = request.query_params.get('since')
+        try:
+            limit = int(request.query_params.get('limit', settings.SYNC_PAGE_SIZE))
+        except ValueError:
+            limit = settings.SYNC_PAGE_SIZE
+        limit = max(1, min(limit, settings.SYNC_MAX_PAGE_SIZE))
+
+        changes = fetch_changes(decode_token(since) if since else None, limit)
+        return Response(changes, status=status.HTTP_200_OK)
+
+
+class EventStreamTokenView(TracedViewMixin, views.APIView):
+    """Short-lived tokens for opening the event stream from a browser EventSource"""
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Issue a signed token to pass as '?token=' to the event stream, "
+            "valid for EVENTS_TOKEN_SECONDS"
+        ),
+        responses={200: "The token and its lifetime in seconds"}
+    )
+    def post(self, request, *args, **kwargs):
+        return Response(
+            {'token': stream_token(request.user), 'expires_in': settings.EVENTS_TOKEN_SECONDS},
+            status=status.HTTP_200_OK,
+        )
+
+
+class JobViewSet(TracedViewMixin, mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """Queue background jobs and follow their status and progress (staff only)"""
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = StandardResultsSetPagination
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['status', 'task']
+    ordering_fields = ['id', 'priority', 'run_at', 'created_at']
+
+    @swagger_auto_schema(
+        operation_description="Cancel a queued or running job; a running task stops at its next progress report",
+        responses={200: JobSerializer, 409: "The job has already finished"}
+    )
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        job = self.get_object()
+        if not cancel_job(job):
+            return Response({'detail': f"Job is already {job.status}."}, status=status.HTTP_409_CONFLICT)
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data, status=status.HTTP_200_OK)
+
+class DatabasePoolView(TracedViewMixin, views.APIView):
+    """Utilization of this process's database connection pools"""
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Return connection pool size, utilization and wait counters for this worker",
+        responses={200: "Pool statistics keyed by alias/database"}
+    )
+    def get(self, request, *args, **kwargs):
+        return Response({'pools': pool_stats()}, status=status.HTTP_200_OK)
+
+
 # class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
     
 #     username_field = User.USERNAME_FIELD  # This should be 'email' based on your User model
@@ -195,7 +471,7 @@ class RegisterView(generics.CreateAPIView):
 #             )
             
 #         return Response(serializer.validated_data, status=status.HTTP_200_OK)
-class RegisterView(generics.CreateAPIView):
+class RegisterView(TracedViewMixin, generics.CreateAPIView):
     """View for user registration"""
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
@@ -205,13 +481,14 @@ class RegisterView(generics.CreateAPIView):
         if serializer.is_valid():
             user = serializer.save()
             
-            # Create or get auth token
-            token, created = Token.objects.get_or_create(user=user)
+            # Issue an auth token
+            key, token = issue_token(user)
             
             # Return a success response with token
             return Response({
                 "message": "User registered successfully",
-                "token": token.key,
+                "token": key,
+                "expires_at": token.expires_at,
                 "user": {
                     "id": user.id,
                     "email": user.email,
@@ -222,7 +499,7 @@ class RegisterView(generics.CreateAPIView):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class LoginView(views.APIView):
+class LoginView(TracedViewMixin, views.APIView):
     """Simple login view using Django's built-in authentication"""
     permission_classes = [permissions.AllowAny]
     
@@ -252,14 +529,31 @@ class LoginView(views.APIView):
                 status=status.HTTP_401_UNAUTHORIZED
             )
         
-        # Create or get auth token
-        token, created = Token.objects.get_or_create(user=user)
+        # Issue a new auth token; only its digest is stored, so keys cannot be handed out again
+        key, token = issue_token(user)
         
         # Get user data
         user_data = UserSerializer(user).data
         
         # Success response
         return Response({
-            'token': token.key,
+            'token': key,
+            'expires_at': token.expires_at,
             'user': user_data
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+
+class LogoutView(TracedViewMixin, views.APIView):
+    """Revoke the token the request authenticated with, and the refresh token if one is posted"""
+    
+    def post(self, request, *args, **kwargs):
+        if hasattr(request.auth, 'digest'):
+            revoke_token(request.auth)
+        if settings.JWT_ENABLED:
+            # Imported here so simplejwt is only loaded where signed tokens are enabled
+            from .signed_tokens import TokenError, revoke_signed_tokens
+            try:
+                revoke_signed_tokens(request.auth, request.data.get('refresh'))
+            except TokenError as exc:
+                return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
@@ -2,6 +2,10 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests to ``settings.EVENTS_PATH`` are served by the server-sent events
+app in ``api.events``; everything else goes to Django. With
+``WARM_UP_ON_STARTUP`` set, the process is warmed up (see ``api.startup``)
+before it takes requests.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +17,22 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup so the app registry is ready
+from django.conf import settings  # noqa: E402
+from api.events import EventStreamApp  # noqa: E402
+
+events_application = EventStreamApp()
+
+if settings.WARM_UP_ON_STARTUP:
+    from api.startup import warm_up
+
+    # Requests use connections opened in the sync-to-async worker thread, not this one
+    warm_up(connect=False)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == settings.EVENTS_PATH:
+        return await events_application(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -12,28 +13,42 @@ DEBUG = os.environ.get('DJANGO_DEBUG', 'False') == 'True'
 
 ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', '*').split(',')
 
+# Optional subsystems. Disabled ones are neither installed nor imported, so workers start faster
+ADMIN_ENABLED = os.environ.get('ADMIN_ENABLED', 'True') == 'True'
+API_DOCS_ENABLED = os.environ.get('API_DOCS_ENABLED', 'True') == 'True'
+JWT_ENABLED = os.environ.get('JWT_ENABLED', 'True') == 'True'
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', 'False') == 'True'
+
+# Prime URL resolvers, model metadata and serializer fields as each worker starts (api.startup)
+WARM_UP_ON_STARTUP = os.environ.get('WARM_UP_ON_STARTUP', 'True') == 'True'
+
 # Application definition
 INSTALLED_APPS = [
-    'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third-party apps
     'rest_framework',
-    'rest_framework.authtoken',  # Add this for token authentication
     'corsheaders',
     'django_filters',
-    'drf_yasg',
     
     # Local apps
     'api',
 ]
 
+if ADMIN_ENABLED:
+    INSTALLED_APPS.insert(0, 'django.contrib.admin')
+if API_DOCS_ENABLED:
+    INSTALLED_APPS.insert(INSTALLED_APPS.index('api'), 'drf_yasg')
+
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -43,6 +58,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if TRACING_ENABLED:
+    MIDDLEWARE.insert(0, 'api.middleware.TracingMiddleware')
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -82,7 +100,7 @@ AUTH_USER_MODEL = 'api.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -93,6 +111,15 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.StandardResultsSetPagination',
     'DEFAULT_THROTTLE_CLASSES': [
         'rest_framework.throttling.AnonRateThrottle',
@@ -105,6 +132,42 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'api.exceptions.custom_exception_handler',
 }
 
+# Serve list endpoints through the values()-based serializers in api.fast_serializers
+FAST_READ_SERIALIZERS = os.environ.get('FAST_READ_SERIALIZERS', 'True') == 'True'
+
+# Stream paginated list bodies chunk by chunk (override per request with ?stream=true|false)
+STREAMING_LIST_RESPONSES = os.environ.get('STREAMING_LIST_RESPONSES', 'False') == 'True'
+STREAMING_CHUNK_SIZE = int(os.environ.get('STREAMING_CHUNK_SIZE', '50'))
+
+# Compound documents (?expand=): deepest relation path and to-many items embedded per parent
+EXPAND_MAX_DEPTH = int(os.environ.get('EXPAND_MAX_DEPTH', '2'))
+EXPAND_MAX_ITEMS = int(os.environ.get('EXPAND_MAX_ITEMS', '50'))
+
+# Delta sync: changes returned per page by default and at most
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', '500'))
+SYNC_MAX_PAGE_SIZE = int(os.environ.get('SYNC_MAX_PAGE_SIZE', '2000'))
+# Tombstones and superseded change log entries are pruned after SYNC_RETENTION_DAYS; clients whose
+# token is older must sync again from scratch (410 Gone)
+SYNC_RETENTION_DAYS = int(os.environ.get('SYNC_RETENTION_DAYS', '30'))
+
+# Server-sent events (served by core/asgi.py). Use api.events.PostgresChannel with several processes.
+EVENTS_PATH = os.environ.get('EVENTS_PATH', '/api/v1/events/')
+EVENTS_CHANNEL = os.environ.get('EVENTS_CHANNEL', 'api.events.LocalChannel')
+EVENTS_MAX_PENDING = int(os.environ.get('EVENTS_MAX_PENDING', '100'))
+EVENTS_HEARTBEAT_SECONDS = float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', '15'))
+# Lifetime of the signed ?token= a browser EventSource connects with
+EVENTS_TOKEN_SECONDS = int(os.environ.get('EVENTS_TOKEN_SECONDS', '60'))
+
+# Response compression (br and zstd are used only when brotli/zstandard are installed)
+COMPRESSION_CODECS = os.environ.get('COMPRESSION_CODECS', 'br,zstd,gzip,deflate').split(',')
+COMPRESSION_LEVELS = {'br': 4, 'zstd': 3, 'gzip': 6, 'deflate': 6}
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_CACHE_MAX_BYTES = int(os.environ.get('COMPRESSION_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+
+# Batch endpoint limits
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', '20'))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', '4'))
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only, change in production
 CORS_ALLOW_CREDENTIALS = True
@@ -129,17 +192,139 @@ CORS_ALLOW_HEADERS = [
 ]
 
 # Database
+# Pooled connections (api.db.postgresql): connections go back to a per-process pool after each request
+DB_POOL = os.environ.get('DB_POOL', 'False') == 'True'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'api.db.postgresql' if DB_POOL else 'django.db.backends.postgresql',
         'NAME': os.environ.get('DB_NAME', 'healthinfo'),
         'USER': os.environ.get('DB_USER', 'admin'),
         'PASSWORD': os.environ.get('DB_PASSWORD', 'admin'),
         'HOST': os.environ.get('DB_HOST', 'localhost'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', '1')),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            'IDLE_TIMEOUT': float(os.environ.get('DB_POOL_IDLE_TIMEOUT', '300')),
+            'WAIT_TIMEOUT': float(os.environ.get('DB_POOL_WAIT_TIMEOUT', '5')),
+            'PRE_PING': os.environ.get('DB_POOL_PRE_PING', 'True') == 'True',
+        },
     }
 }
 
+# Read replicas as comma-separated host[:port]. List, retrieve and search reads go to a replica
+# lagging less than REPLICA_MAX_LAG_SECONDS; users who just wrote read from the primary for
+# REPLICA_READ_YOUR_WRITES_SECONDS (use a shared cache with several processes).
+DATABASE_REPLICAS = []
+for index, address in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    replica_host, _, replica_port = address.strip().partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['api.db.routers.ReplicaRouter']
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '5'))
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', '2'))
+REPLICA_READ_YOUR_WRITES_SECONDS = float(os.environ.get('REPLICA_READ_YOUR_WRITES_SECONDS', '10'))
+
+# API tokens expire AUTH_TOKEN_TTL_SECONDS after login or AUTH_TOKEN_IDLE_SECONDS after last use,
+# whichever is first. Last-use times are written in bulk at most every AUTH_TOKEN_TOUCH_SECONDS.
+AUTH_TOKEN_TTL_SECONDS = int(os.environ.get('AUTH_TOKEN_TTL_SECONDS', str(30 * 24 * 3600)))
+AUTH_TOKEN_IDLE_SECONDS = int(os.environ.get('AUTH_TOKEN_IDLE_SECONDS', str(7 * 24 * 3600)))
+AUTH_TOKEN_TOUCH_SECONDS = int(os.environ.get('AUTH_TOKEN_TOUCH_SECONDS', '60'))
+
+# Signed (JWT) tokens: short-lived access tokens verified without the database, refresh tokens
+# usable once (each refresh returns a new one)
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(seconds=int(os.environ.get('JWT_ACCESS_TOKEN_SECONDS', '300'))),
+    'REFRESH_TOKEN_LIFETIME': timedelta(seconds=int(os.environ.get('JWT_REFRESH_TOKEN_SECONDS', str(7 * 24 * 3600)))),
+    'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'api.signed_tokens.AccessTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.signed_tokens.RotatingTokenRefreshSerializer',
+    'TOKEN_VERIFY_SERIALIZER': 'api.signed_tokens.RevocationAwareTokenVerifySerializer',
+}
+if JWT_ENABLED:
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].insert(0, 'api.signed_tokens.JWTAuthentication')
+
+# Revoked token IDs are read into each process's filter at most every JWT_REVOCATION_SYNC_SECONDS
+# and the filter is rebuilt without expired IDs every JWT_REVOCATION_REBUILD_SECONDS
+JWT_REVOCATION_SYNC_SECONDS = float(os.environ.get('JWT_REVOCATION_SYNC_SECONDS', '5'))
+JWT_REVOCATION_REBUILD_SECONDS = float(os.environ.get('JWT_REVOCATION_REBUILD_SECONDS', '3600'))
+JWT_REVOCATION_CAPACITY = int(os.environ.get('JWT_REVOCATION_CAPACITY', '100000'))
+# Revocation IDs skipped by a sync are read again for this long, in case their transaction commits late
+JWT_REVOCATION_GAP_SECONDS = float(os.environ.get('JWT_REVOCATION_GAP_SECONDS', '60'))
+
+# Background jobs (api.jobs, run with `manage.py run_workers`). Failed jobs are retried after
+# JOB_RETRY_BACKOFF_SECONDS, doubling per attempt up to JOB_RETRY_BACKOFF_MAX_SECONDS; running jobs
+# without a heartbeat for JOB_STALE_SECONDS are queued again.
+JOB_TASK_MODULES = ['api.tasks']
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', '1'))
+JOB_RETRY_BACKOFF_SECONDS = float(os.environ.get('JOB_RETRY_BACKOFF_SECONDS', '10'))
+JOB_RETRY_BACKOFF_MAX_SECONDS = float(os.environ.get('JOB_RETRY_BACKOFF_MAX_SECONDS', '3600'))
+JOB_STALE_SECONDS = float(os.environ.get('JOB_STALE_SECONDS', '300'))
+JOB_EXPORT_DIR = os.environ.get('JOB_EXPORT_DIR', str(BASE_DIR / 'exports'))
+# Periodic jobs: name -> task, interval in seconds and optional args/priority
+JOB_SCHEDULES = {
+    'prune-tokens': {'task': 'api.tasks.prune_tokens', 'every': 3600, 'priority': -10},
+    'prune-changes': {'task': 'api.tasks.prune_changes', 'every': 24 * 3600, 'priority': -10},
+    'archive-programs': {'task': 'api.tasks.archive_programs', 'every': 24 * 3600, 'priority': -10},
+}
+
+# Completed programs that ended more than ARCHIVE_RETENTION_DAYS ago move to the archive tables,
+# with their enrollments, ARCHIVE_BATCH_SIZE programs per transaction
+ARCHIVE_RETENTION_DAYS = int(os.environ.get('ARCHIVE_RETENTION_DAYS', '365'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '100'))
+
+# OpenAPI schema artifact, written by `manage.py generate_schema` (or on first use) and served with
+# ETags; clients may reuse it for SCHEMA_CACHE_SECONDS before revalidating
+SCHEMA_ARTIFACT_DIR = os.environ.get('SCHEMA_ARTIFACT_DIR', str(BASE_DIR / 'schema'))
+SCHEMA_CACHE_SECONDS = int(os.environ.get('SCHEMA_CACHE_SECONDS', '300'))
+
+# `manage.py serve` (api.serving): gunicorn with the app preloaded in the master. SERVE_WORKER_CLASS is
+# sync, threads (SERVE_THREADS per worker) or asgi. Workers are replaced after SERVE_MAX_REQUESTS
+# (+ up to SERVE_MAX_REQUESTS_JITTER) requests or above SERVE_WORKER_MAX_MEMORY_MB (0 for no limit)
+SERVE_BIND = os.environ.get('SERVE_BIND', '0.0.0.0:8000')
+SERVE_WORKERS = int(os.environ.get('SERVE_WORKERS', str(2 * (os.cpu_count() or 1) + 1)))
+SERVE_WORKER_CLASS = os.environ.get('SERVE_WORKER_CLASS', 'sync')
+SERVE_THREADS = int(os.environ.get('SERVE_THREADS', '4'))
+SERVE_TIMEOUT = int(os.environ.get('SERVE_TIMEOUT', '30'))
+SERVE_GRACEFUL_TIMEOUT = int(os.environ.get('SERVE_GRACEFUL_TIMEOUT', '30'))
+SERVE_KEEPALIVE = int(os.environ.get('SERVE_KEEPALIVE', '5'))
+SERVE_MAX_REQUESTS = int(os.environ.get('SERVE_MAX_REQUESTS', '10000'))
+SERVE_MAX_REQUESTS_JITTER = int(os.environ.get('SERVE_MAX_REQUESTS_JITTER', '1000'))
+SERVE_WORKER_MAX_MEMORY_MB = int(os.environ.get('SERVE_WORKER_MAX_MEMORY_MB', '512'))
+SERVE_PIDFILE = os.environ.get('SERVE_PIDFILE', str(BASE_DIR / 'serve.pid'))
+
+# Prometheus metrics at /metrics (api.metrics). Processes sharing METRICS_DIR write snapshots there at
+# most every METRICS_FLUSH_SECONDS and a scrape merges them; serve creates one for its workers if unset.
+# Scrapes must send "Authorization: Bearer <METRICS_TOKEN>"; unless DEBUG is on, /metrics is refused
+# until METRICS_TOKEN is set.
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', '5'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_LATENCY_BUCKETS = [
+    float(bound) for bound in
+    os.environ.get('METRICS_LATENCY_BUCKETS', '0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10').split(',')
+]
+
+# Request tracing (api.tracing), installed with TRACING_ENABLED. TRACING_SAMPLE_RATE of requests are traced,
+# unless TRACING_TRUST_TRACEPARENT lets a traceparent header's sampled flag decide; traces are appended as
+# OTLP/JSON lines to TRACING_FILE, rotated at TRACING_FILE_MAX_BYTES keeping TRACING_FILE_BACKUPS files
+TRACING_SAMPLE_RATE = float(os.environ.get('TRACING_SAMPLE_RATE', '0.01'))
+TRACING_TRUST_TRACEPARENT = os.environ.get('TRACING_TRUST_TRACEPARENT', 'False') == 'True'
+TRACING_FILE = os.environ.get('TRACING_FILE', str(BASE_DIR / 'traces' / 'traces.jsonl'))
+TRACING_FILE_MAX_BYTES = int(os.environ.get('TRACING_FILE_MAX_BYTES', str(50 * 2 ** 20)))
+TRACING_FILE_BACKUPS = int(os.environ.get('TRACING_FILE_BACKUPS', '5'))
+TRACING_MAX_SPANS = int(os.environ.get('TRACING_MAX_SPANS', '1000'))
+TRACING_MAX_STATEMENT_LENGTH = int(os.environ.get('TRACING_MAX_STATEMENT_LENGTH', '2000'))
+TRACING_SERVICE_NAME = os.environ.get('TRACING_SERVICE_NAME', 'health-information-api')
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -2,6 +2,8 @@
 WSGI config for core project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
+With ``WARM_UP_ON_STARTUP`` set, each worker is warmed up (see ``api.startup``)
+before it takes requests.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
@@ -14,3 +16,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Imported after setup so the app registry is ready
+from django.conf import settings  # noqa: E402
+
+if settings.WARM_UP_ON_STARTUP:
+    from api.startup import warm_up
+
+    warm_up()